@@ -0,0 +1,433 @@
+"""Benchmarks of WebM verification on locally generated fixture WebMs"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+from test_webm._plan import run_plan
+from test_webm._webm_format import WebmFormat
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# Compliant encoding settings, tuned for encoding speed rather than quality
+VIDEO_ARGS = [
+    "-c:v",
+    "libvpx-vp9",
+    "-pix_fmt",
+    "yuv420p",
+    "-deadline",
+    "realtime",
+    "-cpu-used",
+    "8",
+    "-row-mt",
+    "1",
+    "-crf",
+    "40",
+    "-b:v",
+    "0",
+    "-color_primaries",
+    "bt709",
+    "-color_trc",
+    "bt709",
+    "-colorspace",
+    "bt709",
+]
+
+AUDIO_ARGS = ["-c:a", "libopus", "-b:a", "192k", "-ar", "48000", "-ac", "2"]
+
+CLEAN_ARGS = ["-map_metadata", "-1", "-map_chapters", "-1"]
+
+# Pink noise with a seed is deterministic, and loudnorm brings it near the target
+NORMALIZED_AUDIO = "anoisesrc=color=pink:seed=1:amplitude=0.2,loudnorm=I=-16:TP=-2"
+
+# The sine source has an amplitude of 1/8, so this is a full scale tone
+LOUD_AUDIO = "sine=frequency=440:sample_rate=48000,volume=7"
+
+CHAPTERS = """;FFMETADATA1
+[CHAPTER]
+TIMEBASE=1/1000
+START=0
+END=1000
+title=Intro
+"""
+
+
+def lavfi_inputs(duration, height, audio=NORMALIZED_AUDIO):
+    """Get the FFmpeg input arguments of a test pattern and an audio source
+
+    :param duration: the length of the fixture in seconds
+    :type duration: int
+
+    :param height: the height of the video
+    :type height: int
+
+    :param audio: the lavfi audio source
+    :type audio: str
+
+    :return: the input arguments
+    :rtype: list
+    """
+    width = height * 16 // 9 // 2 * 2
+    return [
+        "-f",
+        "lavfi",
+        "-i",
+        f"testsrc2=size={width}x{height}:rate=24000/1001:duration={duration}",
+        "-f",
+        "lavfi",
+        "-i",
+        f"{audio},atrim=duration={duration}",
+    ]
+
+
+def fixture_commands(lengths, heights):
+    """Get the FFmpeg arguments of each fixture by name
+
+    Compliant fixtures are generated for each length and height.
+    Non-compliant variants are generated from the shortest, lowest resolution fixture.
+
+    :param lengths: the lengths of the fixtures in seconds
+    :type lengths: list
+
+    :param heights: the heights of the fixtures
+    :type heights: list
+
+    :return: the arguments of each fixture, without the output path
+    :rtype: dict
+    """
+    commands = {}
+
+    for length, height in itertools.product(lengths, heights):
+        commands[f"compliant-{height}p-{length}s"] = (
+            lavfi_inputs(length, height) + VIDEO_ARGS + AUDIO_ARGS + CLEAN_ARGS
+        )
+
+    length, height = min(lengths), min(heights)
+
+    commands["wrong-codec"] = (
+        lavfi_inputs(length, height)
+        + ["-c:v", "libvpx", "-deadline", "realtime", "-cpu-used", "8"]
+        + ["-c:a", "libvorbis", "-ar", "48000", "-ac", "2"]
+        + CLEAN_ARGS
+    )
+
+    commands["extra-streams"] = (
+        lavfi_inputs(length, height)
+        + ["-map", "0:v", "-map", "1:a", "-map", "1:a"]
+        + VIDEO_ARGS
+        + AUDIO_ARGS
+        + CLEAN_ARGS
+    )
+
+    commands["chapters"] = (
+        lavfi_inputs(length, height)
+        + ["-i", os.path.join(FIXTURE_DIR, "chapters.txt")]
+        + ["-map", "0:v", "-map", "1:a", "-map_chapters", "2", "-map_metadata", "-1"]
+        + VIDEO_ARGS
+        + AUDIO_ARGS
+    )
+
+    commands["loud-audio"] = (
+        lavfi_inputs(length, height, LOUD_AUDIO) + VIDEO_ARGS + AUDIO_ARGS + CLEAN_ARGS
+    )
+
+    return commands
+
+
+def generate_fixtures(lengths, heights):
+    """Generate the fixtures that don't exist yet
+
+    :param lengths: the lengths of the fixtures in seconds
+    :type lengths: list
+
+    :param heights: the heights of the fixtures
+    :type heights: list
+
+    :return: the path of each fixture by name
+    :rtype: dict
+    """
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+
+    with open(os.path.join(FIXTURE_DIR, "chapters.txt"), "w", encoding="utf-8") as f:
+        f.write(CHAPTERS)
+
+    fixtures = {}
+    for name, args in fixture_commands(lengths, heights).items():
+        path = os.path.join(FIXTURE_DIR, f"{name}.webm")
+        if not os.path.exists(path):
+            print(f"Generating fixture '{name}'...", file=sys.stderr)
+            partial = path + ".part"
+            subprocess.run(
+                ["ffmpeg", "-v", "error", "-y", "-threads", "1"]
+                + args
+                + ["-f", "webm", partial],
+                check=True,
+            )
+            os.replace(partial, path)
+        fixtures[name] = path
+
+    return fixtures
+
+
+def time_call(function, repeat):
+    """Time repeated calls of the function
+
+    :param function: the function being timed
+    :type function: callable
+
+    :param repeat: the number of calls
+    :type repeat: int
+
+    :return: the minimum and median time of the calls in seconds
+    :rtype: dict
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return {"min": min(times), "median": statistics.median(times)}
+
+
+# Each loader of each source is timed, including the alternative probes and engines
+def benchmark_sources(fixtures, repeat):
+    """Time the loaders of the WebmFormat sources for each fixture
+
+    :param fixtures: the path of each fixture by name
+    :type fixtures: dict
+
+    :param repeat: the number of calls of each loader
+    :type repeat: int
+
+    :return: the times of each loader by fixture
+    :rtype: dict
+    """
+    loaders = dict.fromkeys(
+        itertools.chain(
+            WebmFormat.source_loaders.values(),
+            WebmFormat.probes.values(),
+            WebmFormat.loudness_engines.values(),
+        )
+    )
+
+    results = {}
+    for name, path in fixtures.items():
+        print(f"Timing sources of '{name}'...", file=sys.stderr)
+        results[name] = {}
+        for loader in loaders:
+            try:
+                results[name][loader] = time_call(
+                    lambda loader=loader, path=path: run_plan(
+                        getattr(WebmFormat, loader)(path)
+                    ),
+                    repeat,
+                )
+            except Exception as exc:  # pylint: disable=broad-except
+                results[name][loader] = {"error": repr(exc)}
+
+    return results
+
+
+def benchmark_main(fixtures, counts, jobs, repeat):
+    """Time full runs of the verifier over increasing numbers of files
+
+    :param fixtures: the path of each fixture by name
+    :type fixtures: dict
+
+    :param counts: the numbers of files verified per run
+    :type counts: list
+
+    :param jobs: the number of files to verify in parallel
+    :type jobs: int
+
+    :param repeat: the number of runs of each count
+    :type repeat: int
+
+    :return: the times of each count
+    :rtype: dict
+    """
+    results = {}
+    for count in counts:
+        print(f"Timing runs of {count} files...", file=sys.stderr)
+        files = list(itertools.islice(itertools.cycle(fixtures.values()), count))
+        command = [sys.executable, "-m", "test_webm", "--loglevel", "error"]
+        command += ["--jobs", str(jobs), "--report", "jsonl", "--report-file"]
+        command += [os.devnull, "--"] + files
+
+        times = time_call(
+            lambda command=command: subprocess.run(
+                command, stdout=subprocess.DEVNULL, check=False
+            ),
+            repeat,
+        )
+        times["per_file"] = times["median"] / count
+        results[str(count)] = times
+
+    return results
+
+
+def environment():
+    """Get a description of the environment that the benchmarks ran in
+
+    :return: the versions of Python and FFmpeg and the platform
+    :rtype: dict
+    """
+    ffmpeg_version = subprocess.run(
+        ["ffmpeg", "-version"], capture_output=True, text=True, check=True
+    ).stdout.split("\n", 1)[0]
+    return {
+        "python": platform.python_version(),
+        "ffmpeg": ffmpeg_version,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def flatten(results, prefix=""):
+    """Get the times of the results keyed by a dotted path
+
+    :param results: the results of a benchmark run
+    :type results: dict
+
+    :param prefix: the path of the results
+    :type prefix: str
+
+    :return: the time of each metric by path
+    :rtype: dict
+    """
+    metrics = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            metrics.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, float):
+            metrics[f"{prefix}{key}"] = value
+    return metrics
+
+
+def compare(baseline, results, threshold):
+    """Print the change of each metric against an earlier run
+
+    :param baseline: the results of the earlier run
+    :type baseline: dict
+
+    :param results: the results of this run
+    :type results: dict
+
+    :param threshold: the relative slowdown that counts as a regression
+    :type threshold: float
+
+    :return: whether any metric regressed
+    :rtype: bool
+    """
+    before = flatten({"sources": baseline["sources"], "main": baseline["main"]})
+    after = flatten({"sources": results["sources"], "main": results["main"]})
+
+    regressed = False
+    for metric in sorted(before.keys() & after.keys()):
+        if not metric.endswith((".median", ".per_file")) or before[metric] <= 0:
+            continue
+        change = after[metric] / before[metric] - 1
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressed = True
+        print(
+            f"{metric:<70} {before[metric]:10.4f}s {after[metric]:10.4f}s "
+            f"{change:+8.1%}{flag}"
+        )
+
+    return regressed
+
+
+def main():
+    """Benchmark WebM verification on locally generated fixture WebMs"""
+    parser = argparse.ArgumentParser(
+        prog="benchmark",
+        description="Benchmark WebM verification on locally generated fixture WebMs",
+    )
+
+    parser.add_argument(
+        "--lengths",
+        nargs="+",
+        default=[10, 60],
+        type=int,
+        help="The lengths of the compliant fixtures in seconds",
+    )
+
+    parser.add_argument(
+        "--heights",
+        nargs="+",
+        default=[360, 720],
+        type=int,
+        help="The heights of the compliant fixtures",
+    )
+
+    parser.add_argument(
+        "--counts",
+        nargs="+",
+        default=[1, 4, 16],
+        type=int,
+        help="The numbers of files verified per full run",
+    )
+
+    parser.add_argument(
+        "--jobs",
+        default=os.cpu_count() or 1,
+        type=int,
+        help="The number of files to verify in parallel in full runs",
+    )
+
+    parser.add_argument(
+        "--repeat",
+        default=3,
+        type=int,
+        help="The number of times each benchmark is run",
+    )
+
+    parser.add_argument(
+        "--output",
+        default="benchmark.json",
+        help="The path of the JSON results",
+    )
+
+    parser.add_argument(
+        "--compare",
+        metavar="BASELINE",
+        help="The path of the JSON results of an earlier run to compare with",
+    )
+
+    parser.add_argument(
+        "--threshold",
+        default=0.1,
+        type=float,
+        help="The relative slowdown that counts as a regression",
+    )
+
+    args = parser.parse_args()
+
+    fixtures = generate_fixtures(args.lengths, args.heights)
+
+    results = {
+        "environment": environment(),
+        "fixtures": {name: os.path.getsize(path) for name, path in fixtures.items()},
+        "sources": benchmark_sources(fixtures, args.repeat),
+        "main": benchmark_main(fixtures, args.counts, args.jobs, args.repeat),
+    }
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    if args.compare is not None:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        sys.exit(1 if compare(baseline, results, args.threshold) else 0)
+
+
+if __name__ == "__main__":
+    main()
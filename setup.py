@@ -27,4 +27,7 @@ setup(
     install_requires=[
         "packaging",
     ],
+    extras_require={
+        "numpy": ["numpy"],
+    },
 )
@@ -0,0 +1,23 @@
+"""Verify WebM(s) Against /r/AnimeThemes Encoding Standards"""
+
+import logging
+
+from ._api import Result, averify, verify
+from ._process import Limits, set_limits
+from ._rules import RuleResult
+from ._test_group import TestGroup
+from ._webm_format import WebmFormat
+
+__all__ = [
+    "Limits",
+    "Result",
+    "RuleResult",
+    "TestGroup",
+    "WebmFormat",
+    "averify",
+    "set_limits",
+    "verify",
+]
+
+# Applications configure logging, the library only logs to the test_webm loggers
+logging.getLogger(__name__).addHandler(logging.NullHandler())
@@ -1,20 +1,191 @@
 """Verify WebM(s) Against /r/AnimeThemes Encoding Standards"""
 
 import argparse
+import itertools
 import logging
 import os
 import shutil
+import sqlite3
 import sys
-import unittest
 
+from ._discovery import discover_files
+from ._http import is_url
+from ._loudness import require_numpy
+from ._process import Limits, set_limits
+from ._profile import ProfileReporter
+from ._queue import WorkQueue, work, write_status
+from ._report import REPORTERS, Reporter, TextReporter
+from ._runner import verify_files
 from ._test_group import TestGroup
-from ._utils import file_arg_type
+from ._utils import (
+    non_negative_float_arg_type,
+    path_arg_type,
+    positive_int_arg_type,
+    stage_timeout_arg_type,
+)
+from ._watch import WatchService, serve, watch
 from ._webm_format import WebmFormat
 
 
 def main():
     """Verify WebM(s) Against /r/AnimeThemes Encoding Standards"""
     # Load/Validate Arguments
+    args = parse_args()
+
+    # Machine-readable reports on stdout must not be interleaved with text output
+    machine_report_on_stdout = args.report != "text" and args.report_file == "-"
+
+    # Logging Config
+    logging.basicConfig(
+        stream=sys.stderr if machine_report_on_stdout else sys.stdout,
+        level=logging.getLevelName(args.loglevel.upper()),
+        format="%(levelname)s: %(message)s",
+    )
+
+    check_dependencies(args)
+    check_args(args)
+
+    format_options = {
+        "cache": args.cache,
+        "cache_hash": args.cache_hash,
+        "loudness_engine": args.loudness_engine,
+        "probe": args.probe,
+        "single_pass": args.single_pass,
+        "motion_full": args.motion_full,
+    }
+
+    # Limits are set before any thread or worker starts, so that all of them inherit it
+    set_limits(
+        Limits(
+            timeout=args.timeout,
+            stage_timeouts=dict(args.stage_timeout or []),
+            nice=args.nice,
+            ionice=args.ionice,
+            workers=args.jobs,
+            pin_cpus=args.pin_cpus,
+            max_memory=args.max_memory * 1024 * 1024 if args.max_memory else None,
+            max_decoders=args.max_decoders,
+            max_probes=args.max_probes,
+        )
+    )
+
+    reporters = open_reporters(args, machine_report_on_stdout)
+
+    try:
+        success = run(args, format_options, reporters)
+    finally:
+        for reporter in reporters:
+            reporter.close()
+
+    sys.exit(0 if success else 1)
+
+
+def check_dependencies(args):
+    """Exit if FFmpeg, FFprobe or the NumPy needed by the arguments is not installed
+
+    :param args: the parsed arguments
+    :type args: argparse.Namespace
+    """
+    # Env Check: Check that dependencies are installed
+    if shutil.which("ffmpeg") is None:
+        logging.error("FFmpeg is required")
+        sys.exit()
+
+    if shutil.which("ffprobe") is None:
+        logging.error("FFprobe is required")
+        sys.exit()
+
+    if args.loudness_engine != "loudnorm":
+        try:
+            require_numpy()
+        except ImportError as exc:
+            logging.error(exc)
+            sys.exit()
+
+    if "motion" in args.groups:
+        try:
+            require_numpy("The motion group")
+        except ImportError as exc:
+            logging.error(exc)
+            sys.exit()
+
+
+def check_args(args):
+    """Exit if the arguments are invalid or conflict with each other
+
+    :param args: the parsed arguments
+    :type args: argparse.Namespace
+    """
+    if args.single_pass and args.loudness_engine != "loudnorm":
+        logging.error("Single-pass mode measures loudness with loudnorm")
+        sys.exit()
+
+    if args.profile_prom is not None and not os.path.isdir(
+        os.path.dirname(os.path.abspath(args.profile_prom))
+    ):
+        logging.error("Directory of '%s' does not exist", args.profile_prom)
+        sys.exit()
+
+    if args.watch is not None and not os.path.isdir(args.watch):
+        logging.error("Directory '%s' does not exist", args.watch)
+        sys.exit()
+
+    queue_path = args.queue_seed or args.queue_work or args.queue_status
+    if queue_path is not None and args.watch is not None:
+        logging.error("Watch mode can't be used with a work queue")
+        sys.exit()
+
+    if args.lease_timeout <= 0:
+        logging.error("Lease timeout must be positive")
+        sys.exit()
+
+    if args.timeout is not None and args.timeout <= 0:
+        logging.error("Timeout must be positive")
+        sys.exit()
+
+    if args.nice is not None and not 0 <= args.nice <= 19:
+        logging.error("Niceness must be from 0 to 19")
+        sys.exit()
+
+
+def open_reporters(args, machine_report_on_stdout):
+    """Open the reporters selected by the arguments, exiting if the report can't be opened
+
+    :param args: the parsed arguments
+    :type args: argparse.Namespace
+
+    :param machine_report_on_stdout: whether a machine-readable report is on stdout
+    :type machine_report_on_stdout: bool
+
+    :return: the reporters
+    :rtype: list
+    """
+    # The text report is kept on stdout unless a machine-readable report replaces it
+    try:
+        reporters = [Reporter.open(args.report, args.report_file)]
+    except OSError as exc:
+        logging.error("Could not open report: %s", exc)
+        sys.exit()
+
+    if args.report != "text" and not machine_report_on_stdout:
+        reporters.insert(0, TextReporter(sys.stdout))
+
+    if args.profile or args.profile_prom is not None:
+        profile_stream = sys.stderr if machine_report_on_stdout else sys.stdout
+        reporters.append(
+            ProfileReporter(profile_stream if args.profile else None, args.profile_prom)
+        )
+
+    return reporters
+
+
+# The arguments are parsed apart from their validation, which needs logging configured
+def parse_args():
+    """Parse the command line arguments
+
+    :return: the parsed arguments
+    :rtype: argparse.Namespace
+    """
     parser = argparse.ArgumentParser(
         prog="test_webm",
         description="Verify WebM(s) Against /r/AnimeThemes Encoding Standards",
@@ -24,9 +195,72 @@ def main():
     parser.add_argument(
         "file",
         nargs="*",
-        default=[f for f in os.listdir(".") if f.endswith(".webm")],
-        type=file_arg_type,
-        help="The WebM(s) to verify",
+        type=path_arg_type,
+        help="The WebM(s), directories or glob patterns to verify",
+    )
+
+    parser.add_argument(
+        "--recursive",
+        action="store_true",
+        help="Find WebMs in subdirectories of directories and '**' glob patterns",
+    )
+
+    parser.add_argument(
+        "--from-file",
+        help="Read NUL or newline separated paths of WebMs from a file, '-' for stdin",
+    )
+
+    parser.add_argument(
+        "--watch",
+        metavar="DIR",
+        help="Verify new or changed WebMs in the directory until interrupted",
+    )
+
+    parser.add_argument(
+        "--settle",
+        default=2.0,
+        type=non_negative_float_arg_type,
+        help="Seconds a watched file must be unchanged before it is verified",
+    )
+
+    parser.add_argument(
+        "--listen",
+        metavar="[HOST:]PORT",
+        help="Serve an HTTP endpoint to submit paths and fetch results in watch mode",
+    )
+
+    queue_modes = parser.add_mutually_exclusive_group()
+
+    queue_modes.add_argument(
+        "--queue-seed",
+        metavar="DB",
+        help="Queue the WebMs in a shared work queue for --queue-work and exit",
+    )
+
+    queue_modes.add_argument(
+        "--queue-work",
+        metavar="DB",
+        help="Verify WebMs leased from a shared work queue until every job is finished",
+    )
+
+    queue_modes.add_argument(
+        "--queue-status",
+        metavar="DB",
+        help="Print the progress of a shared work queue and exit",
+    )
+
+    parser.add_argument(
+        "--lease-timeout",
+        default=600.0,
+        type=float,
+        help="Seconds a queued job stays leased to a worker that stops renewing it",
+    )
+
+    parser.add_argument(
+        "--max-attempts",
+        default=3,
+        type=positive_int_arg_type,
+        help="The number of leases of a queued job before it's given up as an error",
     )
 
     parser.add_argument(
@@ -40,57 +274,252 @@ def main():
     parser.add_argument(
         "--groups",
         nargs="*",
-        default=[group.value for group in TestGroup],
+        default=[group.value for group in TestGroup if group.default],
         choices=[group.value for group in TestGroup],
         help="Select groups of tests to run",
     )
 
-    args = parser.parse_args()
+    parser.add_argument(
+        "--jobs",
+        default=os.cpu_count() or 1,
+        type=positive_int_arg_type,
+        help="The number of files to verify in parallel",
+    )
 
-    # Logging Config
-    logging.basicConfig(
-        stream=sys.stdout,
-        level=logging.getLevelName(args.loglevel.upper()),
-        format="%(levelname)s: %(message)s",
+    parser.add_argument(
+        "--cache",
+        help="The path of a persistent cache of probe results",
     )
 
-    # Env Check: Check that dependencies are installed
-    if shutil.which("ffmpeg") is None:
-        logging.error("FFmpeg is required")
-        sys.exit()
+    parser.add_argument(
+        "--cache-hash",
+        action="store_true",
+        help="Also key cache entries on a hash of the file contents",
+    )
 
-    if shutil.which("ffprobe") is None:
-        logging.error("FFprobe is required")
-        sys.exit()
+    parser.add_argument(
+        "--loudness-engine",
+        default="loudnorm",
+        choices=list(WebmFormat.loudness_engines),
+        help="The engine that measures loudness stats",
+    )
+
+    parser.add_argument(
+        "--probe",
+        default="ffprobe",
+        choices=list(WebmFormat.probes),
+        help="The reader of container format and stream information",
+    )
+
+    parser.add_argument(
+        "--single-pass",
+        action="store_true",
+        help="Collect audio packets and loudness in one FFmpeg run, with metadata\n"
+        "read from the headers",
+    )
+
+    parser.add_argument(
+        "--motion-full",
+        action="store_true",
+        help="Compare every frame in the motion group rather than sampled windows",
+    )
+
+    parser.add_argument(
+        "--fail-fast",
+        action="store_true",
+        help="Run tests of header metadata first, and skip tests that demux or decode\n"
+        "the file once a cheaper test has failed",
+    )
+
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        metavar="SECONDS",
+        help="Seconds a probe or decoder may run before its process group is killed",
+    )
+
+    parser.add_argument(
+        "--stage-timeout",
+        action="append",
+        type=stage_timeout_arg_type,
+        metavar="STAGE=SECONDS",
+        help="Seconds the probes or decoders of a profiled stage may run,\n"
+        "overriding --timeout",
+    )
+
+    parser.add_argument(
+        "--nice",
+        type=int,
+        help="The niceness of the verification processes, from 0 to 19",
+    )
+
+    parser.add_argument(
+        "--ionice",
+        type=int,
+        choices=range(8),
+        metavar="LEVEL",
+        help="The best-effort I/O priority of the verification processes, from 0 to 7",
+    )
+
+    parser.add_argument(
+        "--pin-cpus",
+        action="store_true",
+        help="Pin each worker process to its own share of the CPUs",
+    )
+
+    parser.add_argument(
+        "--max-memory",
+        type=positive_int_arg_type,
+        metavar="MIB",
+        help="The limit on the address space of each probe or decoder in MiB",
+    )
+
+    parser.add_argument(
+        "--max-decoders",
+        type=positive_int_arg_type,
+        help="The number of FFmpeg processes run at once across all workers",
+    )
+
+    parser.add_argument(
+        "--max-probes",
+        type=positive_int_arg_type,
+        help="The number of FFprobe processes run at once across all workers",
+    )
+
+    parser.add_argument(
+        "--report",
+        default="text",
+        choices=list(REPORTERS),
+        help="The format of the report of results, written as each file completes",
+    )
+
+    parser.add_argument(
+        "--report-file",
+        default="-",
+        help="The path of the report, '-' for stdout",
+    )
+
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print a per-stage breakdown of time and resource usage after the run",
+    )
+
+    parser.add_argument(
+        "--profile-prom",
+        metavar="PATH",
+        help="Write per-stage metrics to a Prometheus textfile after the run",
+    )
+
+    return parser.parse_args()
+
+
+def run(args, format_options, reporters):
+    """Verify the WebM(s) selected by the arguments
+
+    :param args: the parsed arguments
+    :type args: argparse.Namespace
+
+    :param format_options: the keyword arguments of WebmFormat
+    :type format_options: dict
+
+    :param reporters: the reporters the results of each file are written to
+    :type reporters: list
+
+    :return: whether all tests passed for all files
+    :rtype: bool
+    """
+    queue_path = args.queue_seed or args.queue_work or args.queue_status
+    if queue_path is not None:
+        return run_queue(args, queue_path, format_options, reporters)
 
-    if not args.file:
+    if args.watch is not None:
+        service = WatchService(
+            args.groups,
+            args.jobs,
+            args.loglevel,
+            format_options,
+            reporters,
+            fail_fast=args.fail_fast,
+        )
+        try:
+            if args.listen is not None:
+                serve(service, args.listen)
+            watch(args.watch, service, args.settle)
+        finally:
+            service.shutdown()
+        return True
+
+    # Files are verified as they are discovered, so we only peek at the first one here
+    files = discover_files(args.file, args.recursive, args.from_file)
+    first_file = next(files, None)
+
+    if first_file is None:
         logging.error("No WebMs to verify")
         sys.exit()
 
     logging.info("Verifying files...")
 
-    for file in args.file:
-        logging.info("Using file '%s'...", file)
+    return verify_files(
+        itertools.chain([first_file], files),
+        args.groups,
+        args.jobs,
+        args.loglevel,
+        format_options,
+        reporters,
+        args.fail_fast,
+    )
+
+
+def run_queue(args, queue_path, format_options, reporters):
+    """Seed, work on or report the progress of the shared work queue
 
-        webm_format = WebmFormat(file)
+    :param args: the parsed arguments
+    :type args: argparse.Namespace
 
-        # dump formats and stream information on debug
-        if logging.root.isEnabledFor(logging.DEBUG):
-            webm_format.debug_dump()
+    :param queue_path: the path of the SQLite database of the queue
+    :type queue_path: str
 
-        logging.info("Running Tests...")
-        test_loader = unittest.TestLoader()
-        suite = unittest.TestSuite()
+    :param format_options: the keyword arguments of WebmFormat
+    :type format_options: dict
 
-        for group in args.groups:
-            test_group = TestGroup.value_of(group)
-            test_class = test_group.test_class
-            test_names = test_loader.getTestCaseNames(test_class)
+    :param reporters: the reporters the results of each file are written to
+    :type reporters: list
+
+    :return: whether all tests passed for the files verified by this worker
+    :rtype: bool
+    """
+    try:
+        queue = WorkQueue(queue_path, args.lease_timeout, args.max_attempts)
+    except sqlite3.Error as exc:
+        logging.error("Could not open queue '%s': %s", queue_path, exc)
+        sys.exit()
+
+    try:
+        if args.queue_status is not None:
+            write_status(sys.stdout, queue)
+            return True
 
-            for test_name in test_names:
-                suite.addTest(test_class(test_name, webm_format))
+        if args.queue_work is not None:
+            return work(
+                queue,
+                args.groups,
+                args.jobs,
+                args.loglevel,
+                format_options,
+                reporters,
+                args.fail_fast,
+            )
 
-        unittest.TextTestRunner().run(suite)
+        # Paths are made absolute, as workers on other hosts have other working directories
+        files = discover_files(args.file, args.recursive, args.from_file)
+        queued = queue.seed(
+            file if is_url(file) else os.path.abspath(file) for file in files
+        )
+        logging.info("Queued %d files in '%s'", queued, queue_path)
+        return True
+    finally:
+        queue.close()
 
 
 if __name__ == "__main__":
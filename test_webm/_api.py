@@ -0,0 +1,132 @@
+"""Verification of a WebM as a library call, with sync and asyncio entry points"""
+
+import time
+
+from ._rules import Evaluation, compile_rules
+from ._test_group import TestGroup
+from ._webm_format import WebmFormat
+
+
+class Result:
+    """The results of the tests for a file
+
+    :param file: the file being tested
+    :type file: str
+
+    :param results: the result of each rule
+    :type results: list
+
+    :param elapsed: the time spent verifying the file in seconds
+    :type elapsed: float
+    """
+
+    def __init__(self, file, results, elapsed):
+        self.file = file
+        self.results = results
+        self.elapsed = elapsed
+
+    @property
+    def success(self):
+        """Whether all tests passed"""
+        return all(result.status in ("pass", "skip") for result in self.results)
+
+    @property
+    def failures(self):
+        """The results of the rules that failed or raised an error"""
+        return [result for result in self.results if result.status in ("fail", "error")]
+
+    def to_dict(self):
+        """Get the results as a dict of JSON types
+
+        :return: the results
+        :rtype: dict
+        """
+        return {
+            "file": self.file,
+            "success": self.success,
+            "time": round(self.elapsed, 6),
+            "results": [result.to_dict() for result in self.results],
+        }
+
+
+def compile_groups(groups):
+    """Get the rules of the test groups, or of the default groups if none are given
+
+    :param groups: the values of the selected test groups
+    :type groups: iterable
+
+    :return: the rules of the groups
+    :rtype: tuple
+    """
+    if groups is None:
+        groups = [group.value for group in TestGroup if group.default]
+
+    groups = tuple(groups)
+    for group in groups:
+        if TestGroup.value_of(group) is None:
+            raise ValueError(f"Unknown test group '{group}'")
+
+    return compile_rules(groups)
+
+
+# Library calls only log to the module loggers, so logging is left to the application
+def verify(file, groups=None, fail_fast=False, **format_options):
+    """Verify the file against the groups of tests
+
+    Sources of test data are loaded concurrently in worker threads.
+
+    :param file: the path or URL of the file being tested
+    :type file: str
+
+    :param groups: the values of the selected test groups, or None for the defaults
+    :type groups: iterable
+
+    :param fail_fast: whether to skip costly tests once a cheaper test has failed
+    :type fail_fast: bool
+
+    :param format_options: the keyword arguments of WebmFormat, such as probe or cache
+
+    :return: the results of the tests
+    :rtype: Result
+    """
+    start = time.perf_counter()
+    rules = compile_groups(groups)
+
+    webm_format = WebmFormat(file, **format_options)
+    evaluation = Evaluation(rules, webm_format, fail_fast)
+    for sources in evaluation:
+        webm_format.prefetch(sources)
+
+    return Result(file, evaluation.results, time.perf_counter() - start)
+
+
+# The rules are evaluated once the sources of their tier are loaded, so they don't block the loop
+async def averify(file, groups=None, fail_fast=False, **format_options):
+    """Verify the file against the groups of tests without blocking the event loop
+
+    Probes and decoders run as asyncio subprocesses, so many files can be verified
+    concurrently on one event loop.
+
+    :param file: the path or URL of the file being tested
+    :type file: str
+
+    :param groups: the values of the selected test groups, or None for the defaults
+    :type groups: iterable
+
+    :param fail_fast: whether to skip costly tests once a cheaper test has failed
+    :type fail_fast: bool
+
+    :param format_options: the keyword arguments of WebmFormat, such as probe or cache
+
+    :return: the results of the tests
+    :rtype: Result
+    """
+    start = time.perf_counter()
+    rules = compile_groups(groups)
+
+    webm_format = WebmFormat(file, **format_options)
+    evaluation = Evaluation(rules, webm_format, fail_fast)
+    for sources in evaluation:
+        await webm_format.aprefetch(sources)
+
+    return Result(file, evaluation.results, time.perf_counter() - start)
@@ -0,0 +1,205 @@
+"""A persistent cache of the sources of test data"""
+
+import functools
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+
+from ._http import head, is_url
+from ._plan import Command, run_command
+
+
+# Entries are invalidated by a different build of FFmpeg or a change to the sources
+@functools.cache
+def tool_version():
+    """Get the version of the tools that produce the sources of test data
+
+    :return: the version of the tools
+    :rtype: str
+    """
+    versions = [f"cache{ProbeCache.schema_version}"]
+
+    for tool in ["ffmpeg", "ffprobe"]:
+        version_output = run_command(Command([tool, "-version"], "tool_version"))
+        versions.append(version_output.stdout.decode("utf-8").splitlines()[0].strip())
+
+    return "; ".join(versions)
+
+
+def file_digest(path):
+    """Get the hash of the contents of the file
+
+    :param path: the absolute path of the file
+    :type path: str
+
+    :return: the hash of the contents of the file
+    :rtype: str
+    """
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "blake2b").hexdigest()
+
+
+class ProbeCache:
+    """A persistent cache of the sources of test data
+
+    Entries are keyed on the path, size, modification time and inode of the file.
+    Remote files are keyed on their URL, size, Last-Modified time and ETag.
+
+    :param path: the path of the SQLite database
+    :type path: str
+
+    :param content_hash: whether entries are also keyed on a hash of the file contents
+    :type content_hash: bool
+    """
+
+    schema_version = 1
+
+    # The number of digests of recently seen versions of files that are kept
+    digest_cache_size = 64
+
+    def __init__(self, path, content_hash=False):
+        self.path = path
+        self.content_hash = content_hash
+        self._lock = threading.Lock()
+        self._digests = {}
+        self._connection = sqlite3.connect(path, timeout=60, check_same_thread=False)
+
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS sources ("
+                "path TEXT NOT NULL, "
+                "source TEXT NOT NULL, "
+                "size INTEGER NOT NULL, "
+                "mtime_ns INTEGER NOT NULL, "
+                "inode INTEGER NOT NULL, "
+                "digest TEXT, "
+                "tool_version TEXT NOT NULL, "
+                "data TEXT NOT NULL, "
+                "PRIMARY KEY (path, source))"
+            )
+
+    # Worker processes verify many files, so the connection is reused
+    @staticmethod
+    @functools.cache
+    def open(path, content_hash=False):
+        """Get the cache at the path, opened once per process
+
+        :param path: the path of the SQLite database
+        :type path: str
+
+        :param content_hash: whether entries are also keyed on a hash of the file contents
+        :type content_hash: bool
+
+        :return: the cache
+        :rtype: ProbeCache
+        """
+        return ProbeCache(path, content_hash)
+
+    def file_key(self, file):
+        """Get the identity of the file that entries are keyed on
+
+        :param file: the file being tested
+        :type file: str
+
+        :return: the path, size, modification time, inode and digest of the file
+        :rtype: tuple
+        """
+        # The ETag stands in for the digest, as hashing would download the file
+        if is_url(file):
+            size, mtime_ns, etag = head(file)
+            return file, size, mtime_ns, 0, etag
+
+        path = os.path.abspath(file)
+        stat = os.stat(path)
+        version = (path, stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+        if not self.content_hash:
+            return *version, None
+
+        return *version, self.version_digest(version)
+
+    # Hashing is only done once per version of a file
+    def version_digest(self, version):
+        """Get the hash of the contents of a version of the file
+
+        :param version: the path, size, modification time and inode of the file
+        :type version: tuple
+
+        :return: the hash of the contents of the file
+        :rtype: str
+        """
+        with self._lock:
+            digest = self._digests.get(version)
+
+        if digest is None:
+            digest = file_digest(version[0])
+            with self._lock:
+                self._digests[version] = digest
+                while len(self._digests) > ProbeCache.digest_cache_size:
+                    del self._digests[next(iter(self._digests))]
+
+        return digest
+
+    # The key is read once per file by the caller, as it may cost a HEAD request
+    def get(self, file_key, source):
+        """Get the cached source of test data of the file
+
+        :param file_key: the identity of the file, from file_key
+        :type file_key: tuple
+
+        :param source: the name of the source
+        :type source: str
+
+        :return: the source of test data, or None if there is no valid entry
+        :rtype: dict
+        """
+        path, size, mtime_ns, inode, digest = file_key
+
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT size, mtime_ns, inode, digest, tool_version, data "
+                "FROM sources WHERE path = ? AND source = ?",
+                (path, source),
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        if row[:5] != (size, mtime_ns, inode, digest, tool_version()):
+            return None
+
+        return json.loads(row[5])
+
+    def put(self, file_key, source, data):
+        """Store the source of test data of the file
+
+        :param file_key: the identity of the file, from file_key
+        :type file_key: tuple
+
+        :param source: the name of the source
+        :type source: str
+
+        :param data: the source of test data
+        :type data: dict
+        """
+        path, size, mtime_ns, inode, digest = file_key
+
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO sources "
+                "(path, source, size, mtime_ns, inode, digest, tool_version, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    path,
+                    source,
+                    size,
+                    mtime_ns,
+                    inode,
+                    digest,
+                    tool_version(),
+                    json.dumps(data),
+                ),
+            )
@@ -0,0 +1,136 @@
+"""Lazy discovery of the WebM(s) to verify"""
+
+import argparse
+import glob
+import logging
+import os
+import sys
+
+from ._http import is_url
+from ._utils import file_arg_type, is_glob_pattern
+
+logger = logging.getLogger(__name__)
+
+
+# Directories are walked with an explicit stack so that deep trees don't recurse
+def scan_directory(directory, recursive=False):
+    """Find the WebMs in the directory as they are scanned
+
+    :param directory: the directory to scan
+    :type directory: str
+
+    :param recursive: whether subdirectories are scanned
+    :type recursive: bool
+
+    :return: the paths of the WebMs
+    :rtype: generator
+    """
+    directories = [directory]
+
+    while directories:
+        try:
+            with os.scandir(directories.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive:
+                            directories.append(entry.path)
+                    elif entry.name.endswith(".webm") and entry.is_file():
+                        yield os.path.normpath(entry.path)
+        except OSError as exc:
+            logger.error("Could not scan directory: %s", exc)
+
+
+def read_paths(stream, chunk_size=65536):
+    """Read the paths listed in the stream, separated by NUL or newline characters
+
+    The separator is NUL if one appears in the first chunk of the stream.
+
+    :param stream: the binary stream of paths
+    :type stream: io.BufferedReader
+
+    :param chunk_size: the number of bytes read at a time
+    :type chunk_size: int
+
+    :return: the paths
+    :rtype: generator
+    """
+    separator = None
+    pending = b""
+
+    while chunk := stream.read(chunk_size):
+        if separator is None:
+            separator = b"\0" if b"\0" in chunk else b"\n"
+
+        *paths, pending = (pending + chunk).split(separator)
+        for path in paths:
+            if path.strip():
+                yield os.fsdecode(path.rstrip(b"\r") if separator == b"\n" else path)
+
+    if pending.strip():
+        yield os.fsdecode(pending.rstrip(b"\r\n"))
+
+
+def read_path_list(from_file):
+    """Read the paths listed in the file, or in standard input for '-'
+
+    :param from_file: the path of the file listing the paths
+    :type from_file: str
+
+    :return: the paths
+    :rtype: generator
+    """
+    if from_file == "-":
+        yield from read_paths(sys.stdin.buffer)
+        return
+
+    with open(from_file, "rb") as stream:
+        yield from read_paths(stream)
+
+
+def discover_files(paths, recursive=False, from_file=None):
+    """Find the WebMs to verify as they are discovered
+
+    Paths may be files, directories or glob patterns.
+    If no paths are given, we will find the WebMs in the current directory.
+
+    The paths given as arguments have already been validated by argparse, so an
+    invalid one is a usage error. The paths listed in from_file are validated as they
+    are read, so an invalid one is logged and skipped while the others are verified.
+
+    :param paths: the paths given as arguments
+    :type paths: list
+
+    :param recursive: whether directories are scanned recursively
+    :type recursive: bool
+
+    :param from_file: the path of a file listing paths, or '-' for standard input
+    :type from_file: str
+
+    :return: the paths of the WebMs
+    :rtype: generator
+    """
+    if not paths and from_file is None:
+        paths = ["."]
+
+    for path in paths:
+        # URLs are passed through as is, as their queries may look like glob patterns
+        if is_url(path):
+            yield path
+        elif is_glob_pattern(path):
+            for match in glob.iglob(path, recursive=recursive):
+                if os.path.isdir(match):
+                    yield from scan_directory(match, recursive)
+                elif match.endswith(".webm"):
+                    yield match
+        elif os.path.isdir(path):
+            yield from scan_directory(path, recursive)
+        else:
+            yield path
+
+    # A list may be too long to validate before the first file is verified
+    if from_file is not None:
+        for path in read_path_list(from_file):
+            try:
+                yield file_arg_type(path)
+            except argparse.ArgumentTypeError as exc:
+                logger.error(exc)
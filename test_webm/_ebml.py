@@ -0,0 +1,998 @@
+"""A reader of the Matroska/WebM headers of the file being tested, memory-mapped or by range"""
+
+import datetime
+import math
+import mmap
+import os
+import struct
+
+from ._http import RangeBuffer, is_url, read_range
+
+# The first bytes of every EBML file
+EBML_MAGIC = b"\x1a\x45\xdf\xa3"
+
+# Element IDs, as specified by https://www.matroska.org/technical/elements.html
+EBML = 0x1A45DFA3
+DOC_TYPE = 0x4282
+SEGMENT = 0x18538067
+SEEK_HEAD = 0x114D9B74
+SEEK = 0x4DBB
+SEEK_ID = 0x53AB
+SEEK_POSITION = 0x53AC
+INFO = 0x1549A966
+TIMESTAMP_SCALE = 0x2AD7B1
+DURATION = 0x4489
+DATE_UTC = 0x4461
+TITLE = 0x7BA9
+TRACKS = 0x1654AE6B
+TRACK_ENTRY = 0xAE
+TRACK_NUMBER = 0xD7
+TRACK_UID = 0x73C5
+TRACK_TYPE = 0x83
+CODEC_ID = 0x86
+NAME = 0x536E
+LANGUAGE = 0x22B59C
+DEFAULT_DURATION = 0x23E383
+VIDEO = 0xE0
+PIXEL_WIDTH = 0xB0
+PIXEL_HEIGHT = 0xBA
+ALPHA_MODE = 0x53C0
+COLOUR = 0x55B0
+MATRIX_COEFFICIENTS = 0x55B1
+RANGE = 0x55B9
+TRANSFER_CHARACTERISTICS = 0x55BA
+PRIMARIES = 0x55BB
+AUDIO = 0xE1
+SAMPLING_FREQUENCY = 0xB5
+CHANNELS = 0x9F
+TAGS = 0x1254C367
+TAG = 0x7373
+TARGETS = 0x63C0
+TARGET_TYPE = 0x63CA
+TAG_TRACK_UID = 0x63C5
+TAG_CHAPTER_UID = 0x63C4
+TAG_ATTACHMENT_UID = 0x63C6
+SIMPLE_TAG = 0x67C8
+TAG_NAME = 0x45A3
+TAG_LANGUAGE = 0x447A
+TAG_STRING = 0x4487
+CHAPTERS = 0x1043A770
+EDITION_ENTRY = 0x45B9
+CHAPTER_ATOM = 0xB6
+CHAPTER_UID = 0x73C4
+CHAPTER_TIME_START = 0x91
+CHAPTER_TIME_END = 0x92
+CHAPTER_DISPLAY = 0x80
+CHAP_STRING = 0x85
+ATTACHMENTS = 0x1941A469
+CLUSTER = 0x1F43B675
+SIMPLE_BLOCK = 0xA3
+BLOCK_GROUP = 0xA0
+BLOCK = 0xA1
+
+# Track types
+TRACK_TYPES = {1: "video", 2: "audio", 17: "subtitle"}
+
+# Matroska codec IDs and the codec names reported by FFprobe
+CODEC_NAMES = {
+    "V_VP9": "vp9",
+    "V_VP8": "vp8",
+    "V_AV1": "av1",
+    "V_MPEG4/ISO/AVC": "h264",
+    "V_MPEGH/ISO/HEVC": "hevc",
+    "A_OPUS": "opus",
+    "A_VORBIS": "vorbis",
+    "A_FLAC": "flac",
+    "A_AAC": "aac",
+    "A_AC3": "ac3",
+    "A_MPEG/L3": "mp3",
+    "S_TEXT/WEBVTT": "webvtt",
+    "S_TEXT/UTF8": "subrip",
+    "S_TEXT/ASS": "ass",
+}
+
+# ISO/IEC 23091-4 code points, as named by FFmpeg
+COLOR_SPACES = {
+    0: "gbr",
+    1: "bt709",
+    4: "fcc",
+    5: "bt470bg",
+    6: "smpte170m",
+    7: "smpte240m",
+    8: "ycgco",
+    9: "bt2020nc",
+    10: "bt2020c",
+    11: "smpte2085",
+    12: "chroma-derived-nc",
+    13: "chroma-derived-c",
+    14: "ictcp",
+}
+COLOR_TRANSFERS = {
+    1: "bt709",
+    4: "gamma22",
+    5: "gamma28",
+    6: "smpte170m",
+    7: "smpte240m",
+    8: "linear",
+    9: "log100",
+    10: "log316",
+    11: "iec61966-2-4",
+    12: "bt1361e",
+    13: "iec61966-2-1",
+    14: "bt2020-10",
+    15: "bt2020-12",
+    16: "smpte2084",
+    17: "smpte428",
+    18: "arib-std-b67",
+}
+COLOR_PRIMARIES = {
+    1: "bt709",
+    4: "bt470m",
+    5: "bt470bg",
+    6: "smpte170m",
+    7: "smpte240m",
+    8: "film",
+    9: "bt2020",
+    10: "smpte428",
+    11: "smpte431",
+    12: "smpte432",
+    22: "jedec-p22",
+}
+COLOR_RANGES = {1: "tv", 2: "pc"}
+
+# The VP9 color spaces as mapped by the FFmpeg decoder, which overrides the container
+VP9_COLOR_SPACES = {
+    1: "bt470bg",
+    2: "bt709",
+    3: "smpte170m",
+    4: "smpte240m",
+    5: "bt2020nc",
+    7: "gbr",
+}
+
+CHANNEL_LAYOUTS = {1: "mono", 2: "stereo"}
+
+# Matroska dates are nanoseconds since the millennium
+MATROSKA_EPOCH = datetime.datetime(2001, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+class EbmlError(Exception):
+    """The file uses a structure or codec that the EBML reader can't decode"""
+
+
+class Element:  # pylint: disable=too-few-public-methods
+    """An EBML element of the file
+
+    :param element_id: the ID of the element
+    :type element_id: int
+
+    :param offset: the offset of the element header
+    :type offset: int
+
+    :param data: the offset of the element data
+    :type data: int
+
+    :param size: the size of the element data, None if unknown
+    :type size: int
+    """
+
+    def __init__(self, element_id, offset, data, size):
+        self.id = element_id
+        self.offset = offset
+        self.data = data
+        self.size = size
+
+    @property
+    def end(self):
+        """The offset after the element data"""
+        return self.data + self.size
+
+
+def read_vint(buf, pos, keep_marker=False):
+    """Read a variable length integer
+
+    :param buf: the bytes of the file
+    :type buf: mmap.mmap
+
+    :param pos: the offset of the integer
+    :type pos: int
+
+    :param keep_marker: whether the length marker is part of the value, as in element IDs
+    :type keep_marker: bool
+
+    :return: the value, None if all value bits are set, and the length of the integer
+    :rtype: tuple
+    """
+    first = buf[pos : pos + 1]
+    if not first or not first[0]:
+        raise EbmlError(f"Invalid variable length integer at offset {pos}")
+
+    length = 9 - first[0].bit_length()
+    data = buf[pos : pos + length]
+    if len(data) < length:
+        raise EbmlError(f"Truncated variable length integer at offset {pos}")
+
+    value = int.from_bytes(data, "big")
+    if keep_marker:
+        return value, length
+
+    value &= (1 << (7 * length)) - 1
+    if value == (1 << (7 * length)) - 1:
+        return None, length
+    return value, length
+
+
+def read_element(buf, pos):
+    """Read the header of the element at the offset
+
+    :param buf: the bytes of the file
+    :type buf: mmap.mmap
+
+    :param pos: the offset of the element
+    :type pos: int
+
+    :return: the element
+    :rtype: Element
+    """
+    element_id, id_length = read_vint(buf, pos, keep_marker=True)
+    size, size_length = read_vint(buf, pos + id_length)
+    return Element(element_id, pos, pos + id_length + size_length, size)
+
+
+def iter_children(buf, parent, end=None):
+    """Iterate over the child elements of the element
+
+    :param buf: the bytes of the file
+    :type buf: mmap.mmap
+
+    :param parent: the parent element
+    :type parent: Element
+
+    :param end: the offset after the last child, if the parent size is unknown
+    :type end: int
+
+    :return: the child elements
+    :rtype: generator
+    """
+    pos = parent.data
+    end = parent.end if parent.size is not None else end
+
+    while pos < end:
+        element = read_element(buf, pos)
+        if element.size is None:
+            raise EbmlError(f"Unknown size element {element.id:#x} at offset {pos}")
+        if element.end > end:
+            raise EbmlError(f"Element {element.id:#x} at offset {pos} is truncated")
+        yield element
+        pos = element.end
+
+
+def children(buf, parent):
+    """Get the child elements of the element by ID
+
+    :param buf: the bytes of the file
+    :type buf: mmap.mmap
+
+    :param parent: the parent element
+    :type parent: Element
+
+    :return: the child elements for each ID, in order
+    :rtype: dict
+    """
+    elements = {}
+    for element in iter_children(buf, parent):
+        elements.setdefault(element.id, []).append(element)
+    return elements
+
+
+def read_uint(buf, elements, element_id, default=None):
+    """Read the first unsigned integer child element with the ID
+
+    :param buf: the bytes of the file
+    :type buf: mmap.mmap
+
+    :param elements: the child elements by ID
+    :type elements: dict
+
+    :param element_id: the ID of the element
+    :type element_id: int
+
+    :param default: the value if the element doesn't exist
+    :type default: int
+
+    :return: the value of the element
+    :rtype: int
+    """
+    if element_id not in elements:
+        return default
+    element = elements[element_id][0]
+    return int.from_bytes(buf[element.data : element.end], "big")
+
+
+def read_float(buf, elements, element_id, default=None):
+    """Read the first float child element with the ID
+
+    :param buf: the bytes of the file
+    :type buf: mmap.mmap
+
+    :param elements: the child elements by ID
+    :type elements: dict
+
+    :param element_id: the ID of the element
+    :type element_id: int
+
+    :param default: the value if the element doesn't exist
+    :type default: float
+
+    :return: the value of the element
+    :rtype: float
+    """
+    if element_id not in elements:
+        return default
+    element = elements[element_id][0]
+    data = buf[element.data : element.end]
+    if len(data) == 4:
+        return struct.unpack(">f", data)[0]
+    if len(data) == 8:
+        return struct.unpack(">d", data)[0]
+    return 0.0
+
+
+def read_string(buf, elements, element_id, default=None):
+    """Read the first string child element with the ID
+
+    :param buf: the bytes of the file
+    :type buf: mmap.mmap
+
+    :param elements: the child elements by ID
+    :type elements: dict
+
+    :param element_id: the ID of the element
+    :type element_id: int
+
+    :param default: the value if the element doesn't exist
+    :type default: str
+
+    :return: the value of the element
+    :rtype: str
+    """
+    if element_id not in elements:
+        return default
+    element = elements[element_id][0]
+    data = bytes(buf[element.data : element.end])
+    return data.split(b"\0", 1)[0].decode("utf-8", "replace")
+
+
+# Port of av_reduce from libavutil, so that frame rates match FFprobe exactly
+def av_reduce(num, den, maximum):
+    """Reduce the fraction, approximating it if a term exceeds the maximum
+
+    :param num: the numerator
+    :type num: int
+
+    :param den: the denominator
+    :type den: int
+
+    :param maximum: the maximum of the numerator and denominator
+    :type maximum: int
+
+    :return: the reduced numerator and denominator
+    :rtype: tuple
+    """
+    a0_num, a0_den, a1_num, a1_den = 0, 1, 1, 0
+    gcd = math.gcd(num, den)
+    if gcd:
+        num, den = num // gcd, den // gcd
+
+    if num <= maximum and den <= maximum:
+        a1_num, a1_den = num, den
+        den = 0
+
+    while den:
+        x = num // den
+        next_den = num - den * x
+        a2_num = x * a1_num + a0_num
+        a2_den = x * a1_den + a0_den
+
+        if a2_num > maximum or a2_den > maximum:
+            if a1_num:
+                x = (maximum - a0_num) // a1_num
+            if a1_den:
+                x = min(x, (maximum - a0_den) // a1_den)
+            if den * (2 * x * a1_den + a0_den) > num * a1_den:
+                a1_num, a1_den = x * a1_num + a0_num, x * a1_den + a0_den
+            break
+
+        a0_num, a0_den = a1_num, a1_den
+        a1_num, a1_den = a2_num, a2_den
+        num, den = den, next_den
+
+    return a1_num, a1_den
+
+
+class BitReader:  # pylint: disable=too-few-public-methods
+    """A reader of the bits of a VP9 frame header, most significant bit first
+
+    :param data: the bytes of the frame
+    :type data: bytes
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+
+    def read(self, bits):
+        """Read an unsigned integer of the number of bits
+
+        :param bits: the number of bits
+        :type bits: int
+
+        :return: the value
+        :rtype: int
+        """
+        value = 0
+        for _ in range(bits):
+            byte = self.pos >> 3
+            if byte >= len(self.data):
+                raise EbmlError("Truncated VP9 frame header")
+            value = (value << 1) | ((self.data[byte] >> (7 - (self.pos & 7))) & 1)
+            self.pos += 1
+        return value
+
+
+# The pixel format is not stored in the container, so it's read from the first keyframe
+# as described by the VP9 Bitstream Specification, section 6.2
+def vp9_color_config(frame):
+    """Get the pixel format, color space and color range of a VP9 keyframe
+
+    :param frame: the bytes of the keyframe
+    :type frame: bytes
+
+    :return: the pixel format, color space and color range names
+    :rtype: tuple
+    """
+    bits = BitReader(frame)
+    if bits.read(2) != 2:
+        raise EbmlError("Invalid VP9 frame marker")
+
+    profile = bits.read(1)
+    profile |= bits.read(1) << 1
+    if profile == 3:
+        bits.read(1)
+
+    if bits.read(1):
+        raise EbmlError("First VP9 frame shows an existing frame")
+    if bits.read(1):
+        raise EbmlError("First VP9 frame is not a keyframe")
+    bits.read(2)
+
+    if bits.read(24) != 0x498342:
+        raise EbmlError("Invalid VP9 frame sync code")
+
+    bit_depth = 8
+    if profile >= 2:
+        bit_depth = 12 if bits.read(1) else 10
+
+    color_space = bits.read(3)
+    if color_space != 7:
+        color_range = bits.read(1)
+        subsampling = (bits.read(1), bits.read(1)) if profile in (1, 3) else (1, 1)
+    else:
+        color_range = 1
+        subsampling = (0, 0)
+
+    suffix = "" if bit_depth == 8 else f"{bit_depth}le"
+    if color_space == 7:
+        pix_fmt = f"gbrp{suffix}"
+    else:
+        chroma = {(0, 0): "444", (1, 0): "422", (0, 1): "440", (1, 1): "420"}
+        pix_fmt = f"yuv{chroma[subsampling]}p{suffix}"
+
+    return pix_fmt, VP9_COLOR_SPACES.get(color_space), COLOR_RANGES[color_range + 1]
+
+
+def read_ebml_header(buf):
+    """Read the EBML header and test if the document type is Matroska or WebM
+
+    :param buf: the bytes of the file
+    :type buf: mmap.mmap
+
+    :return: the offset after the EBML header
+    :rtype: int
+    """
+    header = read_element(buf, 0)
+    if header.id != EBML or header.size is None:
+        raise EbmlError("File does not start with an EBML header")
+
+    doc_type = read_string(buf, children(buf, header), DOC_TYPE, "matroska")
+    if doc_type not in ("matroska", "webm"):
+        raise EbmlError(f"Unsupported document type '{doc_type}'")
+
+    return header.end
+
+
+def segment_elements(buf, pos, seek=False, max_clusters=4):
+    """Get the top-level elements of the segment, skipping over clusters by size
+
+    :param buf: the bytes of the file
+    :type buf: mmap.mmap
+
+    :param pos: the offset of the segment
+    :type pos: int
+
+    :param seek: whether elements after the first clusters are found by the SeekHead
+        rather than by skipping over every cluster
+    :type seek: bool
+
+    :param max_clusters: the number of clusters read before seeking
+    :type max_clusters: int
+
+    :return: the top-level elements by ID
+    :rtype: dict
+    """
+    segment = read_element(buf, pos)
+    if segment.id != SEGMENT:
+        raise EbmlError("EBML header is not followed by a segment")
+
+    elements = {}
+    for element in iter_children(buf, segment, len(buf)):
+        elements.setdefault(element.id, []).append(element)
+        if seek and len(elements.get(CLUSTER, [])) == max_clusters:
+            read_seek_heads(buf, segment, elements)
+            break
+    return elements
+
+
+# Remote files are read by range, so the elements after the clusters, like Cues
+# and Tags, are found through the SeekHead instead of the header of every cluster
+def read_seek_heads(buf, segment, elements):
+    """Add the top-level elements indexed by the SeekHead that haven't been read
+
+    :param buf: the bytes of the file
+    :type buf: mmap.mmap
+
+    :param segment: the segment element
+    :type segment: Element
+
+    :param elements: the top-level elements by ID, updated in place
+    :type elements: dict
+    """
+    seen = {element.offset for found in elements.values() for element in found}
+    seek_heads = list(elements.get(SEEK_HEAD, []))
+
+    # A SeekHead may index another SeekHead, usually at the end of the file
+    while seek_heads:
+        for seek in children(buf, seek_heads.pop()).get(SEEK, []):
+            entries = children(buf, seek)
+            pos = segment.data + read_uint(buf, entries, SEEK_POSITION, 0)
+            if pos in seen:
+                continue
+
+            # The SeekID is the binary element ID, which reads like an unsigned integer
+            element = read_element(buf, pos)
+            if element.id != read_uint(buf, entries, SEEK_ID):
+                raise EbmlError(f"SeekHead entry does not match the element at {pos}")
+            if element.size is None or element.end > len(buf):
+                raise EbmlError(f"Element {element.id:#x} at offset {pos} is truncated")
+
+            seen.add(pos)
+            elements.setdefault(element.id, []).append(element)
+            if element.id == SEEK_HEAD:
+                seek_heads.append(element)
+
+
+def read_frame(buf, block):
+    """Read the track number and frame of a block
+
+    :param buf: the bytes of the file
+    :type buf: mmap.mmap
+
+    :param block: the SimpleBlock or Block element
+    :type block: Element
+
+    :return: the track number and the bytes of the frame
+    :rtype: tuple
+    """
+    track_number, length = read_vint(buf, block.data)
+    flags = buf[block.data + length + 2 : block.data + length + 3]
+    if not flags or block.data + length + 3 > block.end:
+        raise EbmlError(f"Block at offset {block.offset} is truncated")
+    if (flags[0] >> 1) & 3:
+        raise EbmlError("Laced blocks are not supported")
+    return track_number, bytes(buf[block.data + length + 3 : block.end])
+
+
+def first_frame(buf, clusters, track_number, max_clusters=4):
+    """Get the first frame of the track
+
+    :param buf: the bytes of the file
+    :type buf: mmap.mmap
+
+    :param clusters: the cluster elements
+    :type clusters: list
+
+    :param track_number: the number of the track
+    :type track_number: int
+
+    :param max_clusters: the number of clusters to search
+    :type max_clusters: int
+
+    :return: the bytes of the frame
+    :rtype: bytes
+    """
+    for cluster in clusters[:max_clusters]:
+        for element in iter_children(buf, cluster):
+            if element.id == BLOCK_GROUP:
+                element = children(buf, element).get(BLOCK, [None])[0]
+            elif element.id != SIMPLE_BLOCK:
+                continue
+            if element is None:
+                continue
+            block_track, frame = read_frame(buf, element)
+            if block_track == track_number:
+                return frame
+
+    raise EbmlError(f"No frame found for track {track_number}")
+
+
+def read_tracks(buf, tracks, clusters):
+    """Get the streams of the file, with the entries that FFprobe reports
+
+    :param buf: the bytes of the file
+    :type buf: mmap.mmap
+
+    :param tracks: the Tracks element
+    :type tracks: Element
+
+    :param clusters: the cluster elements
+    :type clusters: list
+
+    :return: the streams and the index of each stream by track UID
+    :rtype: tuple
+    """
+    streams = []
+    track_uids = {}
+
+    for entry in children(buf, tracks).get(TRACK_ENTRY, []):
+        elements = children(buf, entry)
+        track_type = read_uint(buf, elements, TRACK_TYPE)
+        codec_id = read_string(buf, elements, CODEC_ID, "")
+
+        if track_type not in TRACK_TYPES or codec_id not in CODEC_NAMES:
+            raise EbmlError(f"Unsupported track type {track_type} codec '{codec_id}'")
+
+        stream = {
+            "index": len(streams),
+            "codec_name": CODEC_NAMES[codec_id],
+            "codec_type": TRACK_TYPES[track_type],
+        }
+
+        if track_type == 1:
+            stream.update(read_video(buf, elements, clusters, stream["codec_name"]))
+        elif track_type == 2:
+            stream.update(read_audio(buf, elements))
+
+        # The demuxer defaults the language to English, as specified by Matroska
+        tags = {}
+        language = read_string(buf, elements, LANGUAGE, "eng")
+        if language != "und":
+            tags["language"] = language
+        name = read_string(buf, elements, NAME)
+        if name:
+            tags["title"] = name
+        stream["tags"] = tags
+
+        track_uids[read_uint(buf, elements, TRACK_UID)] = len(streams)
+        streams.append(stream)
+
+    return streams, track_uids
+
+
+def read_video(buf, elements, clusters, codec_name):
+    """Get the entries of a video stream
+
+    :param buf: the bytes of the file
+    :type buf: mmap.mmap
+
+    :param elements: the child elements of the TrackEntry by ID
+    :type elements: dict
+
+    :param clusters: the cluster elements
+    :type clusters: list
+
+    :param codec_name: the name of the codec
+    :type codec_name: str
+
+    :return: the entries of the stream
+    :rtype: dict
+    """
+    if VIDEO not in elements:
+        raise EbmlError("Video track has no Video element")
+
+    video = children(buf, elements[VIDEO][0])
+    if read_uint(buf, video, ALPHA_MODE, 0):
+        raise EbmlError("Video track has an alpha channel")
+
+    stream = {
+        "width": read_uint(buf, video, PIXEL_WIDTH),
+        "height": read_uint(buf, video, PIXEL_HEIGHT),
+    }
+
+    colour = children(buf, video[COLOUR][0]) if COLOUR in video else {}
+    color_range = COLOR_RANGES.get(read_uint(buf, colour, RANGE))
+    color_space = COLOR_SPACES.get(read_uint(buf, colour, MATRIX_COEFFICIENTS))
+
+    if codec_name == "vp9":
+        track_number = read_uint(buf, elements, TRACK_NUMBER)
+        pix_fmt, color_space, color_range = vp9_color_config(
+            first_frame(buf, clusters, track_number)
+        )
+    elif codec_name == "vp8":
+        pix_fmt = "yuv420p"
+    else:
+        raise EbmlError(f"Pixel format of codec '{codec_name}' is not supported")
+
+    stream["pix_fmt"] = pix_fmt
+    optional = {
+        "color_range": color_range,
+        "color_space": color_space,
+        "color_transfer": COLOR_TRANSFERS.get(
+            read_uint(buf, colour, TRANSFER_CHARACTERISTICS)
+        ),
+        "color_primaries": COLOR_PRIMARIES.get(read_uint(buf, colour, PRIMARIES)),
+    }
+    stream.update({key: value for key, value in optional.items() if value})
+
+    # The demuxer derives the frame rate from the default duration in nanoseconds
+    default_duration = read_uint(buf, elements, DEFAULT_DURATION)
+    if not default_duration:
+        raise EbmlError("Video track has no default duration")
+    num, den = av_reduce(1000000000, default_duration, 30000)
+    stream["avg_frame_rate"] = f"{num}/{den}"
+
+    return stream
+
+
+def read_audio(buf, elements):
+    """Get the entries of an audio stream
+
+    :param buf: the bytes of the file
+    :type buf: mmap.mmap
+
+    :param elements: the child elements of the TrackEntry by ID
+    :type elements: dict
+
+    :return: the entries of the stream
+    :rtype: dict
+    """
+    audio = children(buf, elements[AUDIO][0]) if AUDIO in elements else {}
+    channels = read_uint(buf, audio, CHANNELS, 1)
+
+    if channels not in CHANNEL_LAYOUTS:
+        raise EbmlError(f"Channel layout of {channels} channels is not supported")
+
+    return {
+        "sample_rate": str(int(read_float(buf, audio, SAMPLING_FREQUENCY, 8000.0))),
+        "channels": channels,
+        "channel_layout": CHANNEL_LAYOUTS[channels],
+    }
+
+
+def read_simple_tags(buf, simple_tags, metadata, prefix=None):
+    """Add simple tags to the metadata, with the keys that the demuxer uses
+
+    :param buf: the bytes of the file
+    :type buf: mmap.mmap
+
+    :param simple_tags: the SimpleTag elements
+    :type simple_tags: list
+
+    :param metadata: the metadata the tags are added to
+    :type metadata: dict
+
+    :param prefix: the prefix of the keys of the tags
+    :type prefix: str
+    """
+    for simple_tag in simple_tags:
+        elements = children(buf, simple_tag)
+        name = read_string(buf, elements, TAG_NAME)
+        if not name:
+            continue
+
+        key = f"{prefix}/{name}" if prefix else name
+        language = read_string(buf, elements, TAG_LANGUAGE, "und")
+        keys = [key] if language == "und" else [key, f"{key}-{language}"]
+
+        for tag_key in keys:
+            metadata[tag_key] = read_string(buf, elements, TAG_STRING, "")
+            read_simple_tags(buf, elements.get(SIMPLE_TAG, []), metadata, tag_key)
+
+
+def read_tags(buf, tags, format_tags, streams, track_uids):
+    """Add the tags of the file to the format and streams they target
+
+    :param buf: the bytes of the file
+    :type buf: mmap.mmap
+
+    :param tags: the Tags elements
+    :type tags: list
+
+    :param format_tags: the tags of the format
+    :type format_tags: dict
+
+    :param streams: the streams of the file
+    :type streams: list
+
+    :param track_uids: the index of each stream by track UID
+    :type track_uids: dict
+    """
+    for tag in (tag for element in tags for tag in children(buf, element).get(TAG, [])):
+        elements = children(buf, tag)
+        targets = children(buf, elements[TARGETS][0]) if TARGETS in elements else {}
+        simple_tags = elements.get(SIMPLE_TAG, [])
+
+        if TAG_ATTACHMENT_UID in targets or TAG_CHAPTER_UID in targets:
+            continue
+
+        if TAG_TRACK_UID in targets:
+            index = track_uids.get(read_uint(buf, targets, TAG_TRACK_UID))
+            if index is not None:
+                read_simple_tags(buf, simple_tags, streams[index]["tags"])
+            continue
+
+        target_type = read_string(buf, targets, TARGET_TYPE)
+        read_simple_tags(buf, simple_tags, format_tags, target_type)
+
+
+def read_chapters(buf, chapters):
+    """Get the chapters of the file
+
+    :param buf: the bytes of the file
+    :type buf: mmap.mmap
+
+    :param chapters: the Chapters elements
+    :type chapters: list
+
+    :return: the chapters
+    :rtype: list
+    """
+    entries = []
+    for edition in (
+        edition
+        for element in chapters
+        for edition in children(buf, element).get(EDITION_ENTRY, [])
+    ):
+        for atom in children(buf, edition).get(CHAPTER_ATOM, []):
+            elements = children(buf, atom)
+            start = read_uint(buf, elements, CHAPTER_TIME_START)
+            if start is None or not read_uint(buf, elements, CHAPTER_UID):
+                continue
+
+            chapter = {
+                "id": read_uint(buf, elements, CHAPTER_UID),
+                "time_base": "1/1000000000",
+                "start": start,
+                "start_time": f"{start / 1e9:.6f}",
+            }
+            end = read_uint(buf, elements, CHAPTER_TIME_END)
+            if end is not None:
+                chapter["end"] = end
+                chapter["end_time"] = f"{end / 1e9:.6f}"
+            if CHAPTER_DISPLAY in elements:
+                display = children(buf, elements[CHAPTER_DISPLAY][0])
+                chapter["tags"] = {"title": read_string(buf, display, CHAP_STRING, "")}
+            entries.append(chapter)
+
+    return entries
+
+
+# pylint: disable-next=too-many-locals
+def parse_webm_format(buf, filename, size, seek=False):
+    """Get the container format and stream information of the file
+
+    The result has the entries of FFprobe that the tests read.
+
+    :param buf: the bytes of the file
+    :type buf: mmap.mmap
+
+    :param filename: the name of the file
+    :type filename: str
+
+    :param size: the size of the file
+    :type size: int
+
+    :param seek: whether top-level elements are found through the SeekHead
+    :type seek: bool
+
+    :return: the container format and stream information of the file
+    :rtype: dict
+    """
+    elements = segment_elements(buf, read_ebml_header(buf), seek)
+
+    if ATTACHMENTS in elements:
+        raise EbmlError("Attachments are not supported")
+    if INFO not in elements or TRACKS not in elements:
+        raise EbmlError("Segment has no Info or Tracks element")
+
+    info = children(buf, elements[INFO][0])
+    streams, track_uids = read_tracks(
+        buf, elements[TRACKS][0], elements.get(CLUSTER, [])
+    )
+
+    format_tags = {}
+    title = read_string(buf, info, TITLE)
+    if title:
+        format_tags["title"] = title
+    if DATE_UTC in info:
+        element = info[DATE_UTC][0]
+        date = int.from_bytes(buf[element.data : element.end], "big", signed=True)
+        creation_time = MATROSKA_EPOCH + datetime.timedelta(microseconds=date // 1000)
+        format_tags["creation_time"] = creation_time.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+    read_tags(buf, elements.get(TAGS, []), format_tags, streams, track_uids)
+
+    # The demuxer truncates the duration to microseconds
+    timestamp_scale = read_uint(buf, info, TIMESTAMP_SCALE, 1000000)
+    duration = read_float(buf, info, DURATION)
+    if not duration:
+        raise EbmlError("Segment has no duration")
+    duration_us = int(duration * timestamp_scale / 1000)
+
+    for stream in streams:
+        if not stream["tags"]:
+            del stream["tags"]
+
+    webm_format = {
+        "streams": streams,
+        "chapters": read_chapters(buf, elements.get(CHAPTERS, [])),
+        "format": {
+            "filename": filename,
+            "nb_streams": len(streams),
+            "format_name": "matroska,webm",
+            "duration": f"{duration_us / 1e6:.6f}",
+            "size": str(size),
+            "bit_rate": str(int(size * 8 * 1e6 / duration_us)),
+        },
+    }
+
+    if format_tags:
+        webm_format["format"]["tags"] = format_tags
+
+    return webm_format
+
+
+def read_webm_format(file):
+    """Get the container format and stream information of the file from its headers
+
+    :param file: the file being tested
+    :type file: str
+
+    :return: the container format and stream information of the file
+    :rtype: dict
+    """
+    if is_url(file):
+        with RangeBuffer(file) as buf:
+            return parse_webm_format(buf, file, len(buf), seek=True)
+
+    with open(file, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if not size:
+            raise EbmlError("File is empty")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            return parse_webm_format(buf, file, size)
+
+
+def is_ebml(file):
+    """Test if the file starts with the EBML magic number
+
+    :param file: the file being tested
+    :type file: str
+
+    :return: whether the file is an EBML file
+    :rtype: bool
+    """
+    if is_url(file):
+        return read_range(file, 0, len(EBML_MAGIC))[0] == EBML_MAGIC
+
+    with open(file, "rb") as f:
+        return f.read(len(EBML_MAGIC)) == EBML_MAGIC
@@ -0,0 +1,299 @@
+"""Range reads of remote files over pooled keep-alive HTTP connections"""
+
+import email.utils
+import http.client
+import logging
+import threading
+import time
+import urllib.parse
+
+from ._profile import record_stage
+
+logger = logging.getLogger(__name__)
+
+
+class HttpError(OSError):
+    """An error response or a failed request for a remote file"""
+
+
+def is_url(path):
+    """Test if the path is an HTTP(S) URL
+
+    :param path: the path given for the file
+    :type path: str
+
+    :return: whether the path is a URL
+    :rtype: bool
+    """
+    return path.startswith(("http://", "https://"))
+
+
+def url_name(url):
+    """Get the path component of the URL, which ends with the name of the file
+
+    :param url: the URL of the file
+    :type url: str
+
+    :return: the unquoted path of the URL
+    :rtype: str
+    """
+    return urllib.parse.unquote(urllib.parse.urlsplit(url).path)
+
+
+class ConnectionPool:
+    """A pool of keep-alive connections per host, shared by the threads of a process
+
+    :param max_idle: the number of idle connections kept per host
+    :type max_idle: int
+
+    :param timeout: the socket timeout in seconds
+    :type timeout: float
+    """
+
+    def __init__(self, max_idle=4, timeout=30.0):
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def connect(self, scheme, netloc):
+        """Get an idle connection to the host, or open a new one
+
+        :param scheme: the scheme of the URL
+        :type scheme: str
+
+        :param netloc: the host and port of the URL
+        :type netloc: str
+
+        :return: the connection and whether it was reused
+        :rtype: tuple
+        """
+        with self._lock:
+            idle = self._idle.get((scheme, netloc))
+            if idle:
+                return idle.pop(), True
+
+        connection_class = (
+            http.client.HTTPSConnection
+            if scheme == "https"
+            else http.client.HTTPConnection
+        )
+        return connection_class(netloc, timeout=self.timeout), False
+
+    def release(self, scheme, netloc, connection):
+        """Return a connection to the pool once its response has been read
+
+        :param scheme: the scheme of the URL
+        :type scheme: str
+
+        :param netloc: the host and port of the URL
+        :type netloc: str
+
+        :param connection: the connection
+        :type connection: http.client.HTTPConnection
+        """
+        with self._lock:
+            idle = self._idle.setdefault((scheme, netloc), [])
+            if len(idle) < self.max_idle:
+                idle.append(connection)
+                return
+
+        connection.close()
+
+    # A reused connection may have been closed by the server while idle,
+    # so a request that fails on one is retried once on a new connection
+    def request(self, method, url, headers=None):
+        """Send a request and read the whole response
+
+        :param method: the HTTP method
+        :type method: str
+
+        :param url: the URL of the file
+        :type url: str
+
+        :param headers: the request headers
+        :type headers: dict
+
+        :return: the response and its body
+        :rtype: tuple
+        """
+        parts = urllib.parse.urlsplit(url)
+        target = parts.path or "/"
+        if parts.query:
+            target += f"?{parts.query}"
+
+        while True:
+            connection, reused = self.connect(parts.scheme, parts.netloc)
+            try:
+                connection.request(method, target, headers=headers or {})
+                response = connection.getresponse()
+                body = response.read()
+            except (http.client.HTTPException, OSError) as exc:
+                connection.close()
+                if reused:
+                    continue
+                raise HttpError(f"Request for '{url}' failed: {exc}") from exc
+
+            if response.will_close:
+                connection.close()
+            else:
+                self.release(parts.scheme, parts.netloc, connection)
+
+            return response, body
+
+
+# Connections are kept alive across the files of a batch
+POOL = ConnectionPool()
+
+
+def head(url):
+    """Get the size and version of the remote file
+
+    :param url: the URL of the file
+    :type url: str
+
+    :return: the size, modification time in nanoseconds and entity tag of the file
+    :rtype: tuple
+    """
+    response, _ = POOL.request("HEAD", url)
+    if response.status != 200:
+        raise HttpError(f"HEAD '{url}' returned {response.status} {response.reason}")
+
+    mtime_ns = 0
+    last_modified = response.getheader("Last-Modified")
+    if last_modified:
+        mtime_ns = int(email.utils.parsedate_to_datetime(last_modified).timestamp())
+        mtime_ns *= 1000000000
+
+    return (
+        int(response.getheader("Content-Length", 0)),
+        mtime_ns,
+        response.getheader("ETag"),
+    )
+
+
+def read_range(url, start, end):
+    """Read a range of bytes of the remote file
+
+    :param url: the URL of the file
+    :type url: str
+
+    :param start: the offset of the first byte
+    :type start: int
+
+    :param end: the offset after the last byte
+    :type end: int
+
+    :return: the bytes and the size of the file
+    :rtype: tuple
+    """
+    started = time.perf_counter()
+    response, body = POOL.request("GET", url, {"Range": f"bytes={start}-{end - 1}"})
+    record_stage("http_range", time.perf_counter() - started, bytes_read=len(body))
+
+    # The size of the file is given by the Content-Range of a partial response
+    if response.status == 206:
+        content_range = response.getheader("Content-Range", "")
+        size = content_range.rpartition("/")[2]
+        if not size.isdigit():
+            raise HttpError(f"Unknown size in Content-Range '{content_range}'")
+        return body, int(size)
+
+    # Ranges past the end of the file are not satisfiable, but the size is still given
+    if response.status == 416:
+        size = response.getheader("Content-Range", "").rpartition("/")[2]
+        return b"", int(size) if size.isdigit() else start
+
+    if response.status == 200:
+        raise HttpError(f"Server for '{url}' does not support range requests")
+
+    raise HttpError(f"GET '{url}' returned {response.status} {response.reason}")
+
+
+class RangeBuffer:
+    """The bytes of a remote file, fetched by range as they are sliced
+
+    Slices are read in aligned blocks, and blocks are kept once read,
+    so the headers of the file are fetched in a few requests rather than downloaded.
+
+    :param url: the URL of the file
+    :type url: str
+
+    :param block_size: the number of bytes fetched at a time
+    :type block_size: int
+    """
+
+    def __init__(self, url, block_size=65536):
+        self.url = url
+        self.block_size = block_size
+        self.blocks = {}
+        self.requests = 0
+
+        data, self.size = read_range(url, 0, block_size)
+        self.blocks[0] = data
+        self.requests += 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            raise TypeError("RangeBuffer only supports slices")
+
+        start, stop, _ = index.indices(self.size)
+        if start >= stop:
+            return b""
+
+        first, last = start // self.block_size, (stop - 1) // self.block_size
+        self.fetch(first, last)
+
+        data = b"".join(self.blocks[block] for block in range(first, last + 1))
+        offset = first * self.block_size
+        return data[start - offset : stop - offset]
+
+    # Consecutive missing blocks are fetched in a single request
+    def fetch(self, first, last):
+        """Fetch the missing blocks in the range
+
+        :param first: the index of the first block
+        :type first: int
+
+        :param last: the index of the last block
+        :type last: int
+        """
+        missing = [
+            block for block in range(first, last + 1) if block not in self.blocks
+        ]
+
+        while missing:
+            run_start = run_end = missing.pop(0)
+            while missing and missing[0] == run_end + 1:
+                run_end = missing.pop(0)
+
+            start = run_start * self.block_size
+            end = min((run_end + 1) * self.block_size, self.size)
+            data, _ = read_range(self.url, start, end)
+            self.requests += 1
+
+            if len(data) != end - start:
+                raise HttpError(f"Short read of '{self.url}' at offset {start}")
+
+            for block in range(run_start, run_end + 1):
+                offset = (block - run_start) * self.block_size
+                self.blocks[block] = data[offset : offset + self.block_size]
+
+    def close(self):
+        """Release the fetched blocks"""
+        logger.debug(
+            "Read %d bytes of '%s' in %d requests",
+            sum(len(block) for block in self.blocks.values()),
+            self.url,
+            self.requests,
+        )
+        self.blocks.clear()
@@ -0,0 +1,270 @@
+"""A full decode of the streams of the file in parallel keyframe-aligned segments"""
+
+import logging
+import re
+import subprocess
+
+from ._packets import FramecrcReader
+from ._plan import Command, Gather
+
+logger = logging.getLogger(__name__)
+
+# Segments shorter than this are not worth the start-up of a decoder of their own
+MIN_SEGMENT_DURATION = 30.0
+
+
+class DecodeProgress:  # pylint: disable=too-few-public-methods
+    """The end time of the frames decoded by FFmpeg, read from its framecrc output"""
+
+    def __init__(self):
+        self.framecrc = FramecrcReader()
+        self.frames = 0
+        self.end_time = None
+
+    def add_framecrc(self, line):
+        """Add a decoded frame from a line of FFmpeg framecrc output
+
+        :param line: the line, as "stream, dts, pts, duration, size, crc"
+        :type line: bytes
+        """
+        frame = self.framecrc.read_line(line)
+        if frame is None:
+            return
+
+        _, pts_time, duration_time = frame
+        self.frames += 1
+        if pts_time is None:
+            return
+
+        end_time = pts_time + duration_time
+        self.end_time = (
+            end_time if self.end_time is None else max(self.end_time, end_time)
+        )
+
+
+def first_error(log):
+    """Get the first error logged by FFmpeg, without the context of the component
+
+    :param log: the log of FFmpeg at the error level
+    :type log: bytes
+
+    :return: the error, or None if nothing was logged
+    :rtype: str
+    """
+    for line in log.decode("utf-8", "replace").splitlines():
+        line = re.sub(r"^(\[[^\]]*\]\s*)+", "", line).strip()
+        if line:
+            return line
+    return None
+
+
+def decode_args(file, stream, start=None, duration=None, threads=None):
+    """Get the FFmpeg arguments that decode a stream, exiting on the first error
+
+    :param file: the file being tested
+    :type file: str
+
+    :param stream: the stream specifier, such as 'v:0'
+    :type stream: str
+
+    :param start: the time of the keyframe to start decoding at in seconds, if any
+    :type start: float
+
+    :param duration: the duration to decode in seconds, if any
+    :type duration: float
+
+    :param threads: the number of decoder threads, or None for FFmpeg to choose
+    :type threads: int
+
+    :return: the arguments
+    :rtype: list
+    """
+    args = ["ffmpeg", "-nostdin", "-hide_banner", "-v", "error", "-xerror"]
+    args += ["-err_detect", "explode"]
+
+    if threads is not None:
+        args += ["-threads", str(threads)]
+
+    # Timestamps are kept, so the frames of every segment are timed from the file start
+    args += ["-copyts"]
+    if start is not None:
+        args += ["-ss", f"{start:.3f}"]
+    if duration is not None:
+        args += ["-t", f"{duration:.3f}"]
+
+    return args + ["-i", file, "-map", f"0:{stream}", "-f", "framecrc", "pipe:1"]
+
+
+def nearest_seek_point(seek_points, time):
+    """Get the cue point nearest to a time
+
+    :param seek_points: the times of the cue points of the file in seconds
+    :type seek_points: list
+
+    :param time: the time in seconds
+    :type time: float
+
+    :return: the time of the nearest cue point in seconds
+    :rtype: float
+    """
+    return min(seek_points, key=lambda point: abs(point - time))
+
+
+def keyframe_segments(
+    seek_points, duration, segments, min_duration=MIN_SEGMENT_DURATION
+):
+    """Get the segments that the video is split into for a segmented decode
+
+    :param seek_points: the times of the cue points of the file in seconds
+    :type seek_points: list
+
+    :param duration: the duration of the file in seconds
+    :type duration: float
+
+    :param segments: the largest number of segments
+    :type segments: int
+
+    :param min_duration: the shortest segment in seconds
+    :type min_duration: float
+
+    :return: the start and duration of each segment, None for the start or end of the file
+    :rtype: list
+    """
+    segments = max(min(segments, int(duration // min_duration)), 1)
+
+    # Segments start at the cue point nearest to an even split, which is a keyframe,
+    # so no frame is decoded twice and none depends on a frame of another segment
+    splits = set()
+    if seek_points:
+        splits = {
+            nearest_seek_point(seek_points, duration * index / segments)
+            for index in range(1, segments)
+        }
+    splits = sorted(splits - {0.0})
+
+    starts, ends = [None] + splits, splits + [None]
+    return [
+        (start, None if end is None else end - (start or 0.0))
+        for start, end in zip(starts, ends)
+    ]
+
+
+def decode_segment(file, stream, start=None, duration=None, threads=None):
+    """Plan the decode of a segment of a stream, stopping at the first error
+
+    :param file: the file being tested
+    :type file: str
+
+    :param stream: the stream specifier, such as 'v:0'
+    :type stream: str
+
+    :param start: the time of the keyframe to start decoding at in seconds, if any
+    :type start: float
+
+    :param duration: the duration to decode in seconds, if any
+    :type duration: float
+
+    :param threads: the number of decoder threads, or None for FFmpeg to choose
+    :type threads: int
+
+    :return: the plan, which returns the first error, its time and the end of the frames
+    :rtype: generator
+    """
+    progress = DecodeProgress()
+
+    # Some errors, such as a truncated file, are logged without failing the decode
+    try:
+        decode = yield Command(
+            decode_args(file, stream, start, duration, threads),
+            "ffmpeg_decode",
+            consume=progress.add_framecrc,
+            stderr="capture",
+        )
+        error = first_error(decode.stderr)
+    except subprocess.CalledProcessError as exc:
+        error = first_error(exc.stderr or b"") or f"FFmpeg exited with {exc.returncode}"
+
+    # The error is in the frame after the last one decoded
+    error_time = None
+    if error is not None:
+        error_time = progress.end_time if progress.end_time is not None else start
+        error_time = round(error_time or 0.0, 3)
+        logger.debug("Decode error in stream %s at %ss: %s", stream, error_time, error)
+
+    return {
+        "error": error,
+        "error_time": error_time,
+        "frames": progress.frames,
+        "end_time": progress.end_time,
+    }
+
+
+# The video is decoded in segments that share the CPUs of the worker, and the audio
+# in one pass, as Opus is cheap to decode and needs the stream from its start
+def get_integrity_stats(  # pylint: disable=too-many-arguments
+    file,
+    codec_types,
+    duration,
+    seek_points,
+    cpus,
+    *,
+    min_duration=MIN_SEGMENT_DURATION,
+):
+    """Plan the full decode of the streams of the file
+
+    :param file: the file being tested
+    :type file: str
+
+    :param codec_types: the codec types of the streams of the file
+    :type codec_types: list
+
+    :param duration: the duration of the file in seconds
+    :type duration: float
+
+    :param seek_points: the times of the cue points of the file in seconds
+    :type seek_points: list
+
+    :param cpus: the number of CPUs of the worker, shared by the segments
+        and their decoder threads
+    :type cpus: int
+
+    :param min_duration: the shortest segment in seconds
+    :type min_duration: float
+
+    :return: the plan, which returns the decode integrity stats
+    :rtype: generator
+    """
+    plans = []
+
+    if "video" in codec_types:
+        video_segments = keyframe_segments(seek_points, duration, cpus, min_duration)
+        threads = max(cpus // len(video_segments), 1)
+        plans += [
+            decode_segment(file, "v:0", start, length, threads)
+            for start, length in video_segments
+        ]
+
+    if "audio" in codec_types:
+        plans.append(decode_segment(file, "a:0"))
+
+    logger.info("Decoding streams in %d segments...", len(plans))
+
+    parts = yield Gather(plans)
+
+    errors = sorted(
+        (part["error_time"], part["error"])
+        for part in parts
+        if part["error"] is not None
+    )
+    end_times = [part["end_time"] for part in parts if part["end_time"] is not None]
+
+    stats = {
+        "segments": len(parts),
+        "frames": sum(part["frames"] for part in parts),
+        "decode_error": errors[0][1] if errors else None,
+        "decode_error_time": errors[0][0] if errors else None,
+        "decoded_duration": round(max(end_times, default=0.0), 6),
+    }
+
+    logger.debug("Decode integrity stats: %s", stats)
+    return stats
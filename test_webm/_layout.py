@@ -0,0 +1,198 @@
+"""A reader of the seek index and cluster layout of the file from its element headers"""
+
+import logging
+import mmap
+import os
+
+from ._ebml import (
+    CLUSTER,
+    DURATION,
+    INFO,
+    SEEK,
+    SEEK_HEAD,
+    SEEK_ID,
+    TIMESTAMP_SCALE,
+    EbmlError,
+    children,
+    iter_children,
+    read_ebml_header,
+    read_element,
+    read_float,
+    read_uint,
+)
+from ._http import RangeBuffer, is_url
+
+logger = logging.getLogger(__name__)
+
+CUES = 0x1C53BB6B
+CUE_POINT = 0xBB
+CUE_TIME = 0xB3
+
+
+def seek_head_ids(buf, seek_heads):
+    """Get the IDs of the elements indexed by the first SeekHead
+
+    :param buf: the bytes of the file
+    :type buf: mmap.mmap
+
+    :param seek_heads: the SeekHead elements
+    :type seek_heads: list
+
+    :return: the IDs of the indexed elements
+    :rtype: set
+    """
+    if not seek_heads:
+        return set()
+    return {
+        read_uint(buf, children(buf, seek), SEEK_ID)
+        for seek in children(buf, seek_heads[0]).get(SEEK, [])
+    }
+
+
+def cue_times(buf, cues, timestamp_scale):
+    """Get the times of the cue points
+
+    :param buf: the bytes of the file
+    :type buf: mmap.mmap
+
+    :param cues: the Cues elements
+    :type cues: list
+
+    :param timestamp_scale: the nanoseconds per timestamp unit
+    :type timestamp_scale: int
+
+    :return: the time of each cue point in seconds, in order
+    :rtype: list
+    """
+    times = [
+        read_uint(buf, children(buf, cue_point), CUE_TIME, 0) * timestamp_scale / 1e9
+        for element in cues
+        for cue_point in iter_children(buf, element)
+        if cue_point.id == CUE_POINT
+    ]
+    return sorted(times)
+
+
+# Only element headers are read, the header of every cluster is skipped over by size
+def read_segment_elements(buf):
+    """Get the top-level elements of the segment and the size of the largest cluster
+
+    :param buf: the bytes of the file
+    :type buf: mmap.mmap
+
+    :return: the elements by ID, with only the first cluster, the largest cluster size,
+        the nanoseconds per timestamp unit and the duration in seconds
+    :rtype: tuple
+    """
+    segment = read_element(buf, read_ebml_header(buf))
+
+    elements = {}
+    max_cluster_size = 0
+    for element in iter_children(buf, segment, len(buf)):
+        if element.id == CLUSTER:
+            max_cluster_size = max(max_cluster_size, element.end - element.offset)
+            elements.setdefault(CLUSTER, [element])
+            continue
+        elements.setdefault(element.id, []).append(element)
+
+    if INFO not in elements:
+        raise EbmlError("Segment has no Info element")
+
+    info = children(buf, elements[INFO][0])
+    timestamp_scale = read_uint(buf, info, TIMESTAMP_SCALE, 1000000)
+    duration = read_float(buf, info, DURATION, 0.0) * timestamp_scale / 1e9
+
+    return elements, max_cluster_size, timestamp_scale, duration
+
+
+def parse_stream_layout(buf):
+    """Get the placement of the seek index and the sizes of the clusters of the file
+
+    :param buf: the bytes of the file
+    :type buf: mmap.mmap
+
+    :return: the stream layout stats
+    :rtype: dict
+    """
+    elements, max_cluster_size, timestamp_scale, duration = read_segment_elements(buf)
+
+    cues = elements.get(CUES, [])
+    first_cluster = elements.get(CLUSTER, [None])[0]
+    times = cue_times(buf, cues, timestamp_scale)
+
+    # Playback can always start from the start of the file, and the last seek point
+    # is as far from the end as from the previous point
+    points = [0.0] + times + [duration]
+    intervals = [b - a for a, b in zip(points, points[1:])]
+
+    stats = {
+        "cue_points": len(times),
+        "cues_before_clusters": bool(cues)
+        and (first_cluster is None or cues[0].offset < first_cluster.offset),
+        "seek_head_cues": CUES in seek_head_ids(buf, elements.get(SEEK_HEAD, [])),
+        "max_cluster_size": max_cluster_size,
+        "max_cue_interval": round(max(intervals, default=0.0), 6),
+    }
+
+    logger.debug("Stream layout stats: %s", stats)
+    return stats
+
+
+def parse_seek_points(buf):
+    """Get the times of the cue points of the file, which FFmpeg writes at keyframes
+
+    :param buf: the bytes of the file
+    :type buf: mmap.mmap
+
+    :return: the time of each cue point in seconds, in order
+    :rtype: list
+    """
+    elements, _, timestamp_scale, _ = read_segment_elements(buf)
+    return cue_times(buf, elements.get(CUES, []), timestamp_scale)
+
+
+def read_layout(file, parse):
+    """Parse the element headers of the file, memory-mapped or fetched by range
+
+    :param file: the file being tested
+    :type file: str
+
+    :param parse: the function that parses the bytes of the file
+    :type parse: callable
+
+    :return: the return value of parse
+    :rtype: object
+    """
+    if is_url(file):
+        with RangeBuffer(file) as buf:
+            return parse(buf)
+
+    with open(file, "rb") as f:
+        if not os.fstat(f.fileno()).st_size:
+            raise EbmlError("File is empty")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            return parse(buf)
+
+
+def read_stream_layout(file):
+    """Get the placement of the seek index and the sizes of the clusters of the file
+
+    :param file: the file being tested
+    :type file: str
+
+    :return: the stream layout stats
+    :rtype: dict
+    """
+    return read_layout(file, parse_stream_layout)
+
+
+def read_seek_points(file):
+    """Get the times of the cue points of the file
+
+    :param file: the file being tested
+    :type file: str
+
+    :return: the time of each cue point in seconds, in order
+    :rtype: list
+    """
+    return read_layout(file, parse_seek_points)
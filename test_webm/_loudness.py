@@ -0,0 +1,621 @@
+"""An in-process EBU R128 loudness meter fed by a single PCM decode"""
+
+import array
+import logging
+import math
+
+from ._plan import Command, Gather
+from ._process import worker_cpus
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Targets of the loudnorm filter, used to derive the output and offset entries
+TARGET_I = -16.0
+TARGET_TP = -1.0
+
+# The decoded PCM is always resampled to 48 kHz
+SAMPLE_RATE = 48000
+
+# Samples per 100 ms sub-block, the unit that gating blocks are built from
+SUB_BLOCK = SAMPLE_RATE // 10
+
+# Segments are decoded with a pre-roll, longer than the K-weighting impulse response,
+# that settles the filters before the first measured sample
+SEGMENT_PREROLL = SAMPLE_RATE
+
+# Segments seek to this far before their pre-roll, longer than the 80 ms that the Opus
+# decoder takes to converge after a seek, and the samples before the pre-roll are trimmed
+SEEK_MARGIN = SAMPLE_RATE // 10
+
+# Files are only split into segments of at least this many seconds
+MIN_SEGMENT_DURATION = 60.0
+
+
+def require_numpy(feature="The numpy loudness engine"):
+    """Test if NumPy is installed for a feature that requires it
+
+    :param feature: the name of the feature, for the error message
+    :type feature: str
+    """
+    if np is None:
+        raise ImportError(
+            f"{feature} requires NumPy, install animethemes-webm-verifier[numpy]"
+        )
+
+
+# BS.1770 K-weighting: a high shelf followed by a high pass, as biquads for any rate
+def k_weighting_coefficients(sample_rate):
+    """Get the coefficients of the K-weighting filter
+
+    :param sample_rate: the sample rate of the audio
+    :type sample_rate: int
+
+    :return: the numerator and denominator coefficients of the cascaded filter
+    :rtype: tuple
+    """
+    f0 = 1681.974450955533
+    gain = 3.999843853973347
+    q = 0.7071752369554196
+    k = math.tan(math.pi * f0 / sample_rate)
+    vh = math.pow(10.0, gain / 20.0)
+    vb = math.pow(vh, 0.4996667741545416)
+    a0 = 1.0 + k / q + k * k
+    shelf_b = [(vh + vb * k / q + k * k) / a0, 2.0 * (k * k - vh) / a0]
+    shelf_b.append((vh - vb * k / q + k * k) / a0)
+    shelf_a = [1.0, 2.0 * (k * k - 1.0) / a0, (1.0 - k / q + k * k) / a0]
+
+    f0 = 38.13547087602444
+    q = 0.5003270373238773
+    k = math.tan(math.pi * f0 / sample_rate)
+    a0 = 1.0 + k / q + k * k
+    high_pass_b = [1.0, -2.0, 1.0]
+    high_pass_a = [1.0, 2.0 * (k * k - 1.0) / a0, (1.0 - k / q + k * k) / a0]
+
+    return (
+        np.convolve(shelf_b, high_pass_b),
+        np.convolve(shelf_a, high_pass_a),
+    )
+
+
+# The IIR filter is applied as a truncated FIR so that it can be vectorized with FFTs.
+# The slowest pole decays below float precision well within the kept taps.
+def k_weighting_impulse_response(sample_rate, taps=16384):
+    """Get the truncated impulse response of the K-weighting filter
+
+    :param sample_rate: the sample rate of the audio
+    :type sample_rate: int
+
+    :param taps: the length of the impulse response
+    :type taps: int
+
+    :return: the impulse response
+    :rtype: numpy.ndarray
+    """
+    b, a = k_weighting_coefficients(sample_rate)
+    size = taps * 8
+    z = np.exp(-2j * np.pi * np.arange(size // 2 + 1) / size)
+    response = np.polyval(b[::-1], z) / np.polyval(a[::-1], z)
+    return np.fft.irfft(response, size)[:taps]
+
+
+# Windowed-sinc interpolation filter for 4x oversampled true peak measurement
+def oversampling_filter(factor=4, taps_per_phase=24):
+    """Get the polyphase interpolation filter for true peak measurement
+
+    :param factor: the oversampling factor
+    :type factor: int
+
+    :param taps_per_phase: the number of taps of each phase
+    :type taps_per_phase: int
+
+    :return: the filter of each phase, one row per phase
+    :rtype: numpy.ndarray
+    """
+    taps = factor * taps_per_phase
+    n = np.arange(taps) - (taps - 1) / 2
+    prototype = np.sinc(n / factor) * np.kaiser(taps, 8.6)
+    prototype *= factor / prototype.sum()
+    return prototype.reshape(taps_per_phase, factor).T.copy()
+
+
+# BS.1770 channel weights, mono is measured as dual mono like loudnorm with dual_mono=true
+def channel_weights(channels):
+    """Get the weight of each channel in the sum of channel energies
+
+    :param channels: the number of channels
+    :type channels: int
+
+    :return: the weight of each channel
+    :rtype: numpy.ndarray
+    """
+    if channels == 1:
+        return np.array([2.0])
+    if channels == 6:
+        return np.array([1.0, 1.0, 1.0, 0.0, 1.41, 1.41])
+    return np.ones(channels)
+
+
+class LoudnessMeter:  # pylint: disable=too-many-instance-attributes
+    """A streaming EBU R128 meter of integrated loudness, loudness range and true peak
+
+    Memory use is bounded by the chunk size, plus one energy value per 100 ms of audio.
+
+    :param channels: the number of channels
+    :type channels: int
+
+    :param warmup: the number of frames that only settle the filters, and aren't measured
+    :type warmup: int
+    """
+
+    def __init__(self, channels, warmup=0):
+        require_numpy()
+        self.channels = channels
+        self.weights = channel_weights(channels)
+        self.impulse_response = k_weighting_impulse_response(SAMPLE_RATE)
+        self.phases = oversampling_filter()
+        self.filter_tail = np.zeros((len(self.impulse_response) - 1, channels))
+        self.peak_history = np.zeros((self.phases.shape[1] - 1, channels))
+        self.partial_energy = 0.0
+        self.partial_samples = 0
+        self.sub_blocks = array.array("d")
+        self.peak = 0.0
+        self.warmup = warmup
+
+    def feed(self, samples):
+        """Measure the next chunk of samples
+
+        :param samples: the interleaved samples, one row per frame
+        :type samples: numpy.ndarray
+        """
+        samples = samples.astype(np.float64)
+
+        # Warm-up frames fill the filter tail and the oversampling history only
+        if self.warmup:
+            warmup, samples = samples[: self.warmup], samples[self.warmup :]
+            self.warmup -= len(warmup)
+            self.k_weight(warmup)
+            history = np.concatenate([self.peak_history, warmup])
+            self.peak_history = history[len(history) - len(self.peak_history) :]
+
+        if not samples.size:
+            return
+
+        self.measure_peak(samples)
+        self.measure_energy(self.k_weight(samples))
+
+    def k_weight(self, samples):
+        """Apply the K-weighting filter with overlap-add, carrying the tail between chunks
+
+        :param samples: the samples, one row per frame
+        :type samples: numpy.ndarray
+
+        :return: the weighted samples
+        :rtype: numpy.ndarray
+        """
+        length = len(samples) + len(self.impulse_response) - 1
+        size = 1 << (length - 1).bit_length()
+        weighted = np.fft.irfft(
+            np.fft.rfft(samples, size, axis=0)
+            * np.fft.rfft(self.impulse_response, size)[:, np.newaxis],
+            size,
+            axis=0,
+        )[:length]
+
+        tail = len(self.filter_tail)
+        weighted[:tail] += self.filter_tail
+        self.filter_tail = weighted[len(samples) :].copy()
+        return weighted[: len(samples)]
+
+    def measure_energy(self, weighted):
+        """Sum the weighted energy of the samples into 100 ms sub-blocks
+
+        :param weighted: the weighted samples, one row per frame
+        :type weighted: numpy.ndarray
+        """
+        energy = np.square(weighted) @ self.weights
+
+        fill = min(SUB_BLOCK - self.partial_samples, len(energy))
+        self.partial_energy += energy[:fill].sum()
+        self.partial_samples += fill
+        energy = energy[fill:]
+
+        if self.partial_samples < SUB_BLOCK:
+            return
+
+        self.sub_blocks.append(self.partial_energy / SUB_BLOCK)
+
+        blocks = len(energy) // SUB_BLOCK
+        self.sub_blocks.extend(
+            energy[: blocks * SUB_BLOCK].reshape(blocks, SUB_BLOCK).mean(axis=1)
+        )
+
+        remainder = energy[blocks * SUB_BLOCK :]
+        self.partial_energy = remainder.sum()
+        self.partial_samples = len(remainder)
+
+    def measure_peak(self, samples):
+        """Track the peak of the 4x oversampled samples
+
+        :param samples: the samples, one row per frame
+        :type samples: numpy.ndarray
+        """
+        extended = np.concatenate([self.peak_history, samples])
+        self.peak_history = extended[len(extended) - len(self.peak_history) :]
+
+        peak = np.abs(samples).max()
+        for channel in range(self.channels):
+            for phase in self.phases:
+                interpolated = np.convolve(extended[:, channel], phase, "valid")
+                peak = max(peak, np.abs(interpolated).max())
+
+        self.peak = max(self.peak, float(peak))
+
+    def result(self):
+        """Get the loudness stats, with the same entries as the loudnorm filter
+
+        :return: the loudness stats
+        :rtype: dict
+        """
+        return loudness_stats(np.asarray(self.sub_blocks), self.peak)
+
+
+def block_loudness(energy):
+    """Get the loudness of mean square energies
+
+    :param energy: the mean square energies
+    :type energy: numpy.ndarray
+
+    :return: the loudness in LUFS
+    :rtype: numpy.ndarray
+    """
+    with np.errstate(divide="ignore"):
+        return -0.691 + 10.0 * np.log10(energy)
+
+
+def window_energy(sub_blocks, length, hop):
+    """Get the mean energies of overlapping windows of sub-blocks
+
+    :param sub_blocks: the mean square energies of 100 ms sub-blocks
+    :type sub_blocks: numpy.ndarray
+
+    :param length: the number of sub-blocks per window
+    :type length: int
+
+    :param hop: the number of sub-blocks between windows
+    :type hop: int
+
+    :return: the mean square energy of each window
+    :rtype: numpy.ndarray
+    """
+    if len(sub_blocks) < length:
+        return np.zeros(0)
+    cumulative = np.concatenate([[0.0], np.cumsum(sub_blocks)])
+    starts = np.arange(0, len(sub_blocks) - length + 1, hop)
+    return (cumulative[starts + length] - cumulative[starts]) / length
+
+
+# Gating as described by ITU-R BS.1770-4 and EBU Tech 3342,
+# with the percentile convention of libebur128 used by loudnorm
+def loudness_stats(sub_blocks, peak):
+    """Get the loudness stats from sub-block energies and the true peak
+
+    :param sub_blocks: the mean square energies of 100 ms sub-blocks
+    :type sub_blocks: numpy.ndarray
+
+    :param peak: the linear true peak
+    :type peak: float
+
+    :return: the loudness stats, with the same entries as the loudnorm filter
+    :rtype: dict
+    """
+    # Integrated loudness: 400 ms blocks every 100 ms, absolute and -10 LU relative gates
+    blocks = window_energy(sub_blocks, 4, 1)
+    blocks = blocks[block_loudness(blocks) > -70.0]
+    input_thresh = -70.0
+    input_i = -math.inf
+    if len(blocks):
+        input_thresh = float(block_loudness(blocks.mean())) - 10.0
+        gated = blocks[block_loudness(blocks) > input_thresh]
+        input_i = float(block_loudness(gated.mean()))
+
+    # Loudness range: 3 s blocks every 100 ms, absolute and -20 LU relative gates
+    short_term = window_energy(sub_blocks, 30, 1)
+    short_term = short_term[block_loudness(short_term) > -70.0]
+    input_lra = 0.0
+    if len(short_term):
+        relative_gate = float(block_loudness(short_term.mean())) - 20.0
+        short_term = np.sort(block_loudness(short_term))
+        short_term = short_term[short_term > relative_gate]
+    if len(short_term):
+        low = int((len(short_term) - 1) * 0.1 + 0.5)
+        high = int((len(short_term) - 1) * 0.95 + 0.5)
+        input_lra = float(short_term[high] - short_term[low])
+
+    with np.errstate(divide="ignore"):
+        input_tp = float(20.0 * np.log10(peak))
+
+    # Only the input entries are measured, the output entries estimate a linear pass
+    offset = TARGET_I - input_i if math.isfinite(input_i) else 0.0
+    normalization_type = "linear" if input_tp + offset <= TARGET_TP else "dynamic"
+
+    return {
+        key: f"{value:.2f}" if isinstance(value, float) else value
+        for key, value in {
+            "input_i": input_i,
+            "input_tp": input_tp,
+            "input_lra": input_lra,
+            "input_thresh": input_thresh,
+            "output_i": input_i + offset,
+            "output_tp": input_tp + offset,
+            "output_lra": input_lra,
+            "output_thresh": input_thresh + offset,
+            "normalization_type": normalization_type,
+            "target_offset": TARGET_I - (input_i + offset),
+        }.items()
+    }
+
+
+def pcm_args(file, start=None, end=None):
+    """Get the arguments that decode the audio stream of the file to a WAV stream
+
+    :param file: the file being tested
+    :type file: str
+
+    :param start: the first decoded sample at 48 kHz, if not the start of the stream
+    :type start: int
+
+    :param end: the sample at 48 kHz after the last decoded sample, if any
+    :type end: int
+
+    :return: the FFmpeg arguments
+    :rtype: list
+    """
+    args = ["ffmpeg", "-v", "error"]
+    trim = []
+
+    # Segments seek to a little before their first sample and are trimmed by timestamp,
+    # which is kept from the file, so that they line up with the samples of a single decode
+    if start is not None or end is not None:
+        seek = max((start or 0) - SEEK_MARGIN, 0)
+        args += ["-copyts", "-ss", f"{seek / SAMPLE_RATE:.6f}"]
+        trim.append(f"start_pts={start or 0}")
+        if end is not None:
+            args += ["-t", f"{(end + SEEK_MARGIN - seek) / SAMPLE_RATE:.6f}"]
+            trim.append(f"end_pts={end}")
+
+    args += ["-i", file, "-map", "0:a:0"]
+    if trim:
+        args += ["-af", f"aresample={SAMPLE_RATE},atrim={':'.join(trim)}"]
+
+    return args + [
+        "-ar",
+        str(SAMPLE_RATE),
+        "-acodec",
+        "pcm_f32le",
+        "-f",
+        "wav",
+        "pipe:1",
+    ]
+
+
+# The WAV header is only read for the channel count, chunk sizes are unknown on a pipe
+def read_wav_header(data):
+    """Read the WAV header up to the start of the samples
+
+    :param data: the start of the WAV stream
+    :type data: bytes
+
+    :return: the number of channels and the offset of the samples,
+        or None if the header is incomplete
+    :rtype: tuple
+    """
+    if len(data) < 12:
+        return None
+    if data[8:12] != b"WAVE":
+        raise ValueError("Decoded audio is not a WAV stream")
+
+    channels = None
+    pos = 12
+    while len(data) >= pos + 8:
+        chunk_id, chunk_size = data[pos : pos + 4], int.from_bytes(
+            data[pos + 4 : pos + 8], "little"
+        )
+        if chunk_id == b"data":
+            if channels is None:
+                raise ValueError("Decoded audio has no format chunk")
+            return channels, pos + 8
+
+        end = pos + 8 + chunk_size + chunk_size % 2
+        if len(data) < end:
+            return None
+        if chunk_id == b"fmt ":
+            channels = int.from_bytes(data[pos + 10 : pos + 12], "little")
+        pos = end
+
+    return None
+
+
+class WavMeter:
+    """A loudness meter fed a WAV stream in chunks of any size
+
+    Bytes of a partial header or frame are carried over to the next chunk.
+
+    :param warmup: the number of frames that only settle the filters, and aren't measured
+    :type warmup: int
+    """
+
+    def __init__(self, warmup=0):
+        require_numpy()
+        self.pending = b""
+        self.meter = None
+        self.warmup = warmup
+
+    def feed_raw(self, chunk):
+        """Measure the next chunk of the WAV stream
+
+        :param chunk: the bytes of the stream
+        :type chunk: bytes
+        """
+        data = self.pending + chunk
+
+        if self.meter is None:
+            header = read_wav_header(data)
+            if header is None:
+                self.pending = data
+                return
+            channels, offset = header
+            self.meter = LoudnessMeter(channels, self.warmup)
+            data = data[offset:]
+
+        channels = self.meter.channels
+        frames = len(data) // (channels * 4)
+        samples = np.frombuffer(data, "<f4", frames * channels)
+        self.meter.feed(samples.reshape(frames, channels))
+        self.pending = data[frames * channels * 4 :]
+
+    def result(self):
+        """Get the loudness stats of the stream
+
+        :return: the loudness stats
+        :rtype: dict
+        """
+        if self.meter is None:
+            raise ValueError("Decoded audio has no samples")
+        return self.meter.result()
+
+    def energies(self):
+        """Get the sub-block energies and true peak of the stream, to be merged
+
+        :return: the mean square energies of 100 ms sub-blocks and the linear true peak
+        :rtype: tuple
+        """
+        if self.meter is None:
+            return array.array("d"), 0.0
+        return self.meter.sub_blocks, self.meter.peak
+
+
+# Source 3 (numpy engine): Loudness stats measured from a single streamed PCM decode
+def get_ebur128_stats(file, chunk_frames=1 << 16):
+    """Plan the measurement of the loudness stats of the file with the in-process meter
+
+    :param file: the file being tested
+    :type file: str
+
+    :param chunk_frames: the number of stereo frames read at a time
+    :type chunk_frames: int
+
+    :return: the plan, which returns the loudness stats of the file
+    :rtype: generator
+    """
+    logger.info("Retrieving loudness data (numpy)...")
+
+    meter = WavMeter()
+
+    # The meter runs in this process while FFmpeg decodes, so the stages overlap
+    yield Command(
+        pcm_args(file),
+        "ffmpeg_pcm",
+        consume=meter.feed_raw,
+        chunk_size=chunk_frames * 8,
+        consume_stage="numpy_loudness",
+    )
+
+    return meter.result()
+
+
+def segment_bounds(duration, segments=None, min_duration=MIN_SEGMENT_DURATION):
+    """Get the samples that the audio is split at for a segmented measurement
+
+    :param duration: the duration of the file in seconds
+    :type duration: float
+
+    :param segments: the largest number of segments, or None for one per CPU of the worker
+    :type segments: int
+
+    :param min_duration: the shortest segment in seconds
+    :type min_duration: float
+
+    :return: the first sample of each segment, on 100 ms sub-block boundaries
+    :rtype: list
+    """
+    if segments is None:
+        segments = worker_cpus()
+    segments = max(min(segments, int(duration // min_duration)), 1)
+
+    sub_blocks = int(duration * 10)
+    return [sub_blocks * index // segments * SUB_BLOCK for index in range(segments)]
+
+
+def get_segment_energies(file, start, end, chunk_frames=1 << 16):
+    """Plan the measurement of the sub-block energies and true peak of a segment
+
+    :param file: the file being tested
+    :type file: str
+
+    :param start: the first measured sample at 48 kHz
+    :type start: int
+
+    :param end: the sample at 48 kHz after the last measured sample, or None for the end
+    :type end: int
+
+    :param chunk_frames: the number of stereo frames read at a time
+    :type chunk_frames: int
+
+    :return: the plan, which returns the sub-block energies and true peak of the segment
+    :rtype: generator
+    """
+    preroll = min(start, SEGMENT_PREROLL)
+    meter = WavMeter(preroll)
+
+    yield Command(
+        pcm_args(file, start - preroll, end),
+        "ffmpeg_pcm",
+        consume=meter.feed_raw,
+        chunk_size=chunk_frames * 8,
+        consume_stage="numpy_loudness",
+    )
+
+    return meter.energies()
+
+
+# Each segment seeks to a little before its pre-roll, which settles the Opus decoder
+# as well as the filters, and only measures its own samples.
+# Gating is done once over the merged sub-blocks, so 400 ms blocks span the segments.
+def get_segmented_ebur128_stats(
+    file, duration, segments=None, min_duration=MIN_SEGMENT_DURATION
+):
+    """Plan the measurement of the loudness stats of the file in parallel segments
+
+    :param file: the file being tested
+    :type file: str
+
+    :param duration: the duration of the file in seconds
+    :type duration: float
+
+    :param segments: the largest number of segments, or None for one per CPU of the worker
+    :type segments: int
+
+    :param min_duration: the shortest segment in seconds
+    :type min_duration: float
+
+    :return: the plan, which returns the loudness stats of the file
+    :rtype: generator
+    """
+    bounds = segment_bounds(duration, segments, min_duration)
+    if len(bounds) == 1:
+        return (yield from get_ebur128_stats(file))
+
+    logger.info("Retrieving loudness data (numpy, %d segments)...", len(bounds))
+
+    parts = yield Gather(
+        get_segment_energies(file, start, end)
+        for start, end in zip(bounds, bounds[1:] + [None])
+    )
+
+    sub_blocks = np.concatenate([np.asarray(energies) for energies, _ in parts])
+    return loudness_stats(sub_blocks, max(peak for _, peak in parts))
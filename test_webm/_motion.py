@@ -0,0 +1,200 @@
+"""A vectorized detector of motion interpolation fed by downscaled grayscale frames"""
+
+import logging
+
+from ._loudness import require_numpy
+from ._plan import Command
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Frames are compared at a fixed low resolution, which is enough to see blending
+WIDTH = 160
+HEIGHT = 90
+
+# Mean absolute differences, in 8-bit gray levels
+DUPLICATE_THRESHOLD = 1.0
+MOTION_THRESHOLD = 3.0
+
+# A frame is a blend if it's closer to the midpoint of its neighbours than this
+# fraction of the difference between them
+BLEND_THRESHOLD = 0.25
+
+# Sampled files are measured in windows spread evenly over the file
+SAMPLE_WINDOWS = 12
+SAMPLE_WINDOW_DURATION = 2.0
+
+
+class MotionMeter:
+    """A streaming meter of duplicate and blended frames
+
+    Interpolated video has few duplicate frames, as every held frame of the source
+    becomes in-between frames, and many frames that are the midpoint of their neighbours.
+
+    Memory use is bounded by the batch size, plus the two frames carried between batches.
+    """
+
+    def __init__(self):
+        require_numpy("The motion group")
+        self.carry = np.empty((0, HEIGHT, WIDTH), np.float32)
+        self.frames = 0
+        self.differences = 0
+        self.duplicates = 0
+        self.moving = 0
+        self.blends = 0
+
+    def reset(self):
+        """Start a new run of consecutive frames, such as the next sampled window"""
+        self.carry = self.carry[:0]
+
+    def feed(self, batch):
+        """Measure a batch of consecutive frames
+
+        :param batch: the frames, one row per frame
+        :type batch: numpy.ndarray
+        """
+        frames = np.concatenate([self.carry, batch.astype(np.float32)])
+        new_differences = len(batch) if len(self.carry) else len(batch) - 1
+
+        # Differences between consecutive frames, skipping the one measured last batch
+        differences = np.abs(frames[1:] - frames[:-1]).mean(axis=(1, 2))
+        differences = differences[len(differences) - new_differences :]
+
+        self.frames += len(batch)
+        self.differences += len(differences)
+        self.duplicates += int(np.count_nonzero(differences < DUPLICATE_THRESHOLD))
+
+        # Triples centred on every frame with both neighbours, none seen last batch
+        if len(frames) >= 3:
+            span = np.abs(frames[2:] - frames[:-2]).mean(axis=(1, 2))
+            midpoint = (frames[2:] + frames[:-2]) * 0.5
+            residual = np.abs(frames[1:-1] - midpoint).mean(axis=(1, 2))
+
+            moving = span > MOTION_THRESHOLD
+            self.moving += int(np.count_nonzero(moving))
+            self.blends += int(
+                np.count_nonzero(moving & (residual < span * BLEND_THRESHOLD))
+            )
+
+        self.carry = frames[-2:]
+
+    def feed_raw(self, chunk):
+        """Measure a chunk of the raw 8-bit grayscale output of FFmpeg
+
+        :param chunk: the bytes of whole frames, a trailing partial frame is dropped
+        :type chunk: bytes
+        """
+        frames = len(chunk) // (WIDTH * HEIGHT)
+        if frames:
+            batch = np.frombuffer(chunk, np.uint8, frames * WIDTH * HEIGHT)
+            self.feed(batch.reshape(frames, HEIGHT, WIDTH))
+
+    def result(self):
+        """Get the motion stats of the measured frames
+
+        :return: the motion stats
+        :rtype: dict
+        """
+        return {
+            "frames": self.frames,
+            "duplicate_ratio": (
+                round(self.duplicates / self.differences, 6)
+                if self.differences
+                else 0.0
+            ),
+            "moving_frames": self.moving,
+            "blend_ratio": round(self.blends / self.moving, 6) if self.moving else 0.0,
+        }
+
+
+def frame_args(file, start=None, duration=None):
+    """Get the FFmpeg arguments that decode the video as downscaled grayscale frames
+
+    :param file: the file being tested
+    :type file: str
+
+    :param start: the time to start decoding at in seconds, if any
+    :type start: float
+
+    :param duration: the duration to decode in seconds, if any
+    :type duration: float
+
+    :return: the arguments
+    :rtype: list
+    """
+    args = ["ffmpeg", "-nostdin", "-v", "error"]
+
+    # The loop filter is skipped to speed up decoding, its effect is lost in the downscale
+    args += ["-skip_loop_filter", "all"]
+
+    if start is not None:
+        args += ["-ss", f"{start:.3f}", "-t", f"{duration:.3f}"]
+
+    return args + [
+        "-i",
+        file,
+        "-map",
+        "0:v:0",
+        "-vf",
+        f"scale={WIDTH}:{HEIGHT}:flags=area,format=gray",
+        "-fps_mode",
+        "passthrough",
+        "-f",
+        "rawvideo",
+        "pipe:1",
+    ]
+
+
+def sample_windows(duration):
+    """Get the windows of the file that are measured when sampling
+
+    :param duration: the duration of the file in seconds
+    :type duration: float
+
+    :return: the start and duration of each window, or None to measure the whole file
+    :rtype: list
+    """
+    if duration <= SAMPLE_WINDOWS * SAMPLE_WINDOW_DURATION * 2:
+        return None
+
+    step = duration / SAMPLE_WINDOWS
+    return [
+        (step * (index + 0.5) - SAMPLE_WINDOW_DURATION / 2, SAMPLE_WINDOW_DURATION)
+        for index in range(SAMPLE_WINDOWS)
+    ]
+
+
+def get_motion_stats(file, windows=None, batch_frames=256):
+    """Plan the measurement of the motion stats of the video stream
+
+    :param file: the file being tested
+    :type file: str
+
+    :param windows: the start and duration of each window to measure, or None for all
+    :type windows: list
+
+    :param batch_frames: the number of frames measured at a time
+    :type batch_frames: int
+
+    :return: the plan, which returns the motion stats
+    :rtype: generator
+    """
+    logger.info("Retrieving motion data...")
+
+    meter = MotionMeter()
+
+    for start, duration in windows or [(None, None)]:
+        meter.reset()
+        yield Command(
+            frame_args(file, start, duration),
+            "ffmpeg_frames",
+            consume=meter.feed_raw,
+            chunk_size=batch_frames * WIDTH * HEIGHT,
+            consume_stage="numpy_motion",
+        )
+
+    return meter.result()
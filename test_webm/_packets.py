@@ -0,0 +1,463 @@
+"""A streaming reader of FFprobe packet output into array-backed columns and profiles"""
+
+import array
+import collections
+import itertools
+import logging
+import math
+
+from ._plan import Command
+
+logger = logging.getLogger(__name__)
+
+# The array typecode of each packet entry, missing values are read as NaN
+COLUMN_TYPES = {
+    "pts_time": "d",
+    "dts_time": "d",
+    "duration_time": "d",
+    "size": "q",
+    "flags": "b",
+}
+
+
+# The timestamp that FFmpeg prints for packets without one
+NOPTS_VALUE = -(2**63)
+
+
+def parse_compact(line):
+    """Get the entries of a line of FFprobe compact output
+
+    :param line: the line, as "entry=value|entry=value"
+    :type line: bytes
+
+    :return: the values of the entries by name
+    :rtype: dict
+    """
+    return dict(
+        entry.split("=", 1)
+        for entry in line.decode("utf-8").strip().split("|")
+        if "=" in entry
+    )
+
+
+class FramecrcReader:  # pylint: disable=too-few-public-methods
+    """A reader of the lines of FFmpeg framecrc output into timed packets"""
+
+    def __init__(self):
+        self.time_bases = {}
+
+    def read_line(self, line):
+        """Read a packet from a line of FFmpeg framecrc output
+
+        :param line: the line, as "stream, dts, pts, duration, size, crc"
+        :type line: bytes
+
+        :return: the size of the packet in bytes, and its presentation time, if known,
+            and duration in seconds, or None for header lines
+        :rtype: tuple
+        """
+        line = line.decode("utf-8")
+
+        # Header lines declare the time base of each stream as "#tb 0: 1/1000"
+        if line.startswith("#tb"):
+            stream, time_base = line[3:].split(":", 1)
+            numerator, denominator = time_base.split("/")
+            self.time_bases[int(stream)] = int(numerator) / int(denominator)
+            return None
+        if line.startswith("#") or not line.strip():
+            return None
+
+        stream, _, pts, duration, size = (int(field) for field in line.split(",")[:5])
+        time_base = self.time_bases.get(stream, 1.0)
+        return (
+            size,
+            pts * time_base if pts != NOPTS_VALUE else None,
+            duration * time_base,
+        )
+
+
+class PacketColumns:
+    """The entries of the packets of a stream, one array per entry
+
+    Packets are kept as machine values rather than dicts,
+    so hundreds of thousands of packets take a few bytes each.
+
+    :param entries: the names of the packet entries
+    :type entries: tuple
+    """
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.columns = {entry: array.array(COLUMN_TYPES[entry]) for entry in entries}
+
+    def __len__(self):
+        return len(self.columns[self.entries[0]])
+
+    def __getitem__(self, entry):
+        return self.columns[entry]
+
+    def append(self, packet):
+        """Add a packet to the columns
+
+        :param packet: the values of the packet entries by name, as printed by FFprobe
+        :type packet: dict
+        """
+        for entry in self.entries:
+            value = packet.get(entry, "N/A")
+            if entry == "flags":
+                # Flags are printed as "K__", "K_" or "__" depending on the FFprobe version
+                self.columns[entry].append(value.startswith("K"))
+            elif entry == "size":
+                self.columns[entry].append(int(value) if value != "N/A" else 0)
+            else:
+                self.columns[entry].append(float(value) if value != "N/A" else math.nan)
+
+
+class BitrateProfile:
+    """The bytes of the packets of a stream per second of presentation time
+
+    Packets are aggregated as they're read, so a stream takes 8 bytes per second.
+    """
+
+    def __init__(self):
+        self.bytes_per_second = array.array("q")
+        self.size = 0
+        self.nb_packets = 0
+        self.start_time = None
+        self.end_time = None
+        self.max_gap = 0.0
+        self.framecrc = FramecrcReader()
+
+    def add(self, size, pts_time, duration_time):
+        """Add a packet to the profile
+
+        :param size: the size of the packet in bytes
+        :type size: int
+
+        :param pts_time: the presentation time of the packet in seconds, if known
+        :type pts_time: float
+
+        :param duration_time: the duration of the packet in seconds
+        :type duration_time: float
+        """
+        self.size += size
+        self.nb_packets += 1
+        if pts_time is None:
+            return
+
+        # Opus packets may start before zero, by the priming samples of the encoder
+        second = max(int(pts_time), 0)
+        if second >= len(self.bytes_per_second):
+            self.bytes_per_second.extend(
+                itertools.repeat(0, second + 1 - len(self.bytes_per_second))
+            )
+        self.bytes_per_second[second] += size
+
+        # A gap is time that no packet covers, packets without a duration cover an instant
+        if self.end_time is not None:
+            self.max_gap = max(self.max_gap, pts_time - self.end_time)
+
+        end_time = pts_time + duration_time
+        self.start_time = (
+            pts_time if self.start_time is None else min(self.start_time, pts_time)
+        )
+        self.end_time = (
+            end_time if self.end_time is None else max(self.end_time, end_time)
+        )
+
+    def add_framecrc(self, line):
+        """Add a packet from a line of FFmpeg framecrc output
+
+        :param line: the line, as "stream, dts, pts, duration, size, crc"
+        :type line: bytes
+        """
+        packet = self.framecrc.read_line(line)
+        if packet is not None:
+            self.add(*packet)
+
+    @property
+    def duration(self):
+        """The time from the start of the first packet to the end of the last"""
+        if self.start_time is None:
+            return 0.0
+        return self.end_time - self.start_time
+
+    def audio_format(self):
+        """Get the profile as the audio_format source
+
+        :return: the size, duration and bitrate of the packets
+        :rtype: dict
+        """
+        bit_rate = int(self.size * 8 / self.duration) if self.duration > 0 else 0
+
+        return {
+            "format": {
+                "nb_packets": self.nb_packets,
+                "size": str(self.size),
+                "duration": f"{self.duration:.6f}",
+                "bit_rate": str(bit_rate),
+            }
+        }
+
+
+class PacketScan:
+    """The packets of the streams of a file, read from one demux
+
+    Every stream is aggregated into a bitrate profile as it's read,
+    and the timestamps and keyframe flags of the video streams are kept as columns.
+    """
+
+    # The packet entries kept for each video stream
+    video_entries = ("pts_time", "duration_time", "flags")
+
+    def __init__(self):
+        self.streams = {}
+        self.video_packets = {}
+
+    def append_line(self, line):
+        """Add a packet from a line of FFprobe compact output
+
+        :param line: the line, as "codec_type=...|stream_index=...|pts_time=...|..."
+        :type line: bytes
+        """
+        packet = parse_compact(line)
+        if "stream_index" not in packet:
+            return
+
+        key = (int(packet["stream_index"]), packet.get("codec_type", ""))
+        profile = self.streams.get(key)
+        if profile is None:
+            profile = self.streams[key] = BitrateProfile()
+
+        pts_time = packet.get("pts_time", "N/A")
+        duration_time = packet.get("duration_time", "N/A")
+        profile.add(
+            int(packet.get("size", 0)),
+            float(pts_time) if pts_time != "N/A" else None,
+            float(duration_time) if duration_time != "N/A" else 0.0,
+        )
+
+        if key[1] == "video":
+            columns = self.video_packets.get(key)
+            if columns is None:
+                columns = self.video_packets[key] = PacketColumns(self.video_entries)
+            columns.append(packet)
+
+    def stream(self, codec_type):
+        """Get the profile of the first stream of the type
+
+        :param codec_type: 'video' or 'audio'
+        :type codec_type: str
+
+        :return: the profile, or None if the file has no stream of the type
+        :rtype: BitrateProfile
+        """
+        for (_, stream_type), profile in sorted(self.streams.items()):
+            if stream_type == codec_type:
+                return profile
+        return None
+
+    def video_columns(self):
+        """Get the packet columns of the first video stream
+
+        :return: the columns, which are empty if the file has no video stream
+        :rtype: PacketColumns
+        """
+        for _, columns in sorted(self.video_packets.items()):
+            return columns
+        return PacketColumns(self.video_entries)
+
+
+def scan_args(file, streams=None):
+    """Get the FFprobe arguments that print the packet entries of the streams
+
+    :param file: the file being tested
+    :type file: str
+
+    :param streams: the stream specifier of the streams to read, or None for every stream
+    :type streams: str
+
+    :return: the arguments
+    :rtype: list
+    """
+    args = ["ffprobe", "-v", "quiet"]
+    if streams is not None:
+        args += ["-select_streams", streams]
+
+    return args + [
+        "-show_entries",
+        "packet=codec_type,stream_index,pts_time,duration_time,size,flags",
+        "-print_format",
+        "compact=p=0",
+        file,
+    ]
+
+
+# FFprobe output is parsed line by line as it's written, so it's never held in memory
+def read_packet_scan(file, streams=None):
+    """Plan the reading of the packets of the streams of the file in one demux
+
+    :param file: the file being tested
+    :type file: str
+
+    :param streams: the stream specifier of the streams to read, or None for every stream
+    :type streams: str
+
+    :return: the plan, which returns the packet scan
+    :rtype: generator
+    """
+    scan = PacketScan()
+    yield Command(
+        scan_args(file, streams), "ffprobe_packet_scan", consume=scan.append_line
+    )
+    return scan
+
+
+def packet_profile_stats(profile):
+    """Get the peak bitrate, drift and gap stats of the packets of the file
+
+    :param profile: the packet scan of the file
+    :type profile: PacketScan
+
+    :return: the packet profile stats
+    :rtype: dict
+    """
+    # The bitrate of each second is that of the whole file, so the streams are summed
+    bytes_per_second = array.array("q")
+    for stream in profile.streams.values():
+        if len(stream.bytes_per_second) > len(bytes_per_second):
+            bytes_per_second.extend(
+                itertools.repeat(
+                    0, len(stream.bytes_per_second) - len(bytes_per_second)
+                )
+            )
+        for second, size in enumerate(stream.bytes_per_second):
+            bytes_per_second[second] += size
+
+    video, audio = profile.stream("video"), profile.stream("audio")
+
+    stats = {
+        "seconds": len(bytes_per_second),
+        "peak_bit_rate": max(bytes_per_second, default=0) * 8,
+        "video_duration": round(video.duration, 6) if video else 0.0,
+        "audio_duration": round(audio.duration, 6) if audio else 0.0,
+        "av_drift": (
+            round(abs(video.duration - audio.duration), 6) if video and audio else 0.0
+        ),
+        "max_packet_gap": round(
+            max((stream.max_gap for stream in profile.streams.values()), default=0.0),
+            6,
+        ),
+    }
+
+    logger.debug("Packet profile stats: %s", stats)
+    return stats
+
+
+def frame_intervals(pts_times):
+    """Get the intervals between consecutive presentation times
+
+    :param pts_times: the presentation times in seconds
+    :type pts_times: array.array
+
+    :return: the intervals in seconds
+    :rtype: array.array
+    """
+    times = array.array("d", (pts for pts in pts_times if not math.isnan(pts)))
+
+    # Packets are usually in presentation order, so they're only sorted if they aren't
+    if any(a > b for a, b in zip(times, times[1:])):
+        times = array.array("d", sorted(times))
+
+    return array.array("d", (b - a for a, b in zip(times, times[1:])))
+
+
+# Frame intervals take a handful of distinct values, so the median is found
+# from their counts rather than from a sorted copy of every interval
+def histogram_median(values):
+    """Get the median of the values from the count of each distinct value
+
+    :param values: the values
+    :type values: array.array
+
+    :return: the median, or 0.0 if there are no values
+    :rtype: float
+    """
+    counts = collections.Counter(values)
+    lower, upper = (len(values) - 1) // 2, len(values) // 2
+
+    seen, low = 0, None
+    for value in sorted(counts):
+        seen += counts[value]
+        if low is None and seen > lower:
+            low = value
+        if seen > upper:
+            return (low + value) / 2
+    return 0.0
+
+
+# Matroska timestamps are rounded to the millisecond, so intervals of an NTSC rate
+# alternate between 41 and 42 ms without the frame rate being variable
+def video_packet_stats(packets, tolerance=0.002, gap_factor=1.5):
+    """Get the frame timing stats of the video packets
+
+    :param packets: the video packet columns with pts_time, duration_time and flags
+    :type packets: PacketColumns
+
+    :param tolerance: the deviation from the median frame interval, in seconds,
+        beyond which an interval is variable
+    :type tolerance: float
+
+    :param gap_factor: the multiple of the median frame interval beyond which
+        an interval is a gap
+    :type gap_factor: float
+
+    :return: the frame timing stats
+    :rtype: dict
+    """
+    intervals = frame_intervals(packets["pts_time"])
+    median_interval = histogram_median(intervals)
+
+    variable = sum(
+        1 for interval in intervals if abs(interval - median_interval) > tolerance
+    )
+    gaps = sum(1 for interval in intervals if interval > median_interval * gap_factor)
+
+    # The last keyframe interval runs to the end of the last packet
+    end_time = max(
+        (
+            pts + (duration if not math.isnan(duration) else 0.0)
+            for pts, duration in zip(packets["pts_time"], packets["duration_time"])
+            if not math.isnan(pts)
+        ),
+        default=0.0,
+    )
+
+    # Keyframes are never reordered, so their times are in order as they're read
+    keyframe_times = array.array(
+        "d",
+        (
+            pts
+            for pts, keyframe in zip(packets["pts_time"], packets["flags"])
+            if keyframe and not math.isnan(pts)
+        ),
+    )
+    keyframe_intervals = (
+        b - a
+        for a, b in zip(keyframe_times, itertools.chain(keyframe_times[1:], [end_time]))
+    )
+
+    stats = {
+        "nb_packets": len(packets),
+        "keyframes": len(keyframe_times),
+        "median_frame_interval": round(median_interval, 6),
+        "max_frame_interval": round(max(intervals, default=0.0), 6),
+        "variable_interval_ratio": (
+            round(variable / len(intervals), 6) if intervals else 0.0
+        ),
+        "frame_gap_ratio": round(gaps / len(intervals), 6) if intervals else 0.0,
+        "max_keyframe_interval": round(max(keyframe_intervals, default=0.0), 6),
+    }
+
+    logger.debug("Video packet stats: %s", stats)
+    return stats
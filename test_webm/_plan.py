@@ -0,0 +1,361 @@
+"""Plans of the subprocesses and calls that load test data, run by sync or asyncio drivers"""
+
+import asyncio
+import concurrent.futures
+import contextlib
+import contextvars
+import subprocess
+import tempfile
+import time
+
+from ._process import get_limits, kill, popen
+from ._profile import record_stage
+from ._profile import stage as profile_stage
+
+# A plan is a generator that yields steps and is sent back the result of each step.
+# The same plan runs in a worker thread with run_plan or on an event loop with arun_plan.
+
+
+class Command:
+    """A subprocess step of a plan
+
+    The driver sends back the completed process, or throws CalledProcessError into the plan.
+
+    :param args: the arguments of the subprocess
+    :type args: list
+
+    :param stage: the name of the stage that the subprocess runs
+    :type stage: str
+
+    :param consume: a function that is fed the output as it's read, instead of collecting it
+    :type consume: callable
+
+    :param chunk_size: the size of the chunks of output fed to consume, or None for lines
+    :type chunk_size: int
+
+    :param consume_stage: the name of the in-process stage that consumes the output, if any
+    :type consume_stage: str
+
+    :param stderr: 'merge' to read the log with the output, 'capture' to collect it
+        separately, or None to inherit it
+    :type stderr: str
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        args,
+        stage,
+        *,
+        consume=None,
+        chunk_size=None,
+        consume_stage=None,
+        stderr=None,
+    ):
+        self.args = args
+        self.stage = stage
+        self.consume = consume
+        self.chunk_size = chunk_size
+        self.consume_stage = consume_stage
+        self.stderr = stderr
+
+    def consuming(self):
+        """Time the consumer of the output as an in-process stage, if it has one
+
+        :return: the context of the stage
+        :rtype: contextlib.AbstractContextManager
+        """
+        if self.consume_stage is None:
+            return contextlib.nullcontext()
+        return profile_stage(self.consume_stage)
+
+    def complete(self, returncode, stdout, stderr):
+        """Get the completed process, raising an error if it failed
+
+        :param returncode: the exit code of the process
+        :type returncode: int
+
+        :param stdout: the output, if it was collected
+        :type stdout: bytes
+
+        :param stderr: the log, if it was captured
+        :type stderr: bytes
+
+        :return: the completed process
+        :rtype: subprocess.CompletedProcess
+        """
+        if returncode:
+            raise subprocess.CalledProcessError(returncode, self.args, stdout, stderr)
+        return subprocess.CompletedProcess(self.args, returncode, stdout, stderr)
+
+
+class Call:  # pylint: disable=too-few-public-methods
+    """An in-process step of a plan that may block, such as reading the file
+
+    :param function: the function to call
+    :type function: callable
+
+    :param args: the arguments of the function
+
+    :param stage: the name of the stage that the call runs, if any
+    :type stage: str
+    """
+
+    def __init__(self, function, *args, stage=None):
+        self.function = function
+        self.args = args
+        self.stage = stage
+
+    def run(self):
+        """Call the function in this thread
+
+        :return: the return value of the function
+        :rtype: object
+        """
+        if self.stage is None:
+            return self.function(*self.args)
+        with profile_stage(self.stage):
+            return self.function(*self.args)
+
+
+class Gather:  # pylint: disable=too-few-public-methods
+    """A step of a plan that runs other plans concurrently
+
+    The driver sends back the results of the plans in order.
+
+    :param plans: the plans to run
+    :type plans: list
+    """
+
+    def __init__(self, plans):
+        self.plans = list(plans)
+
+
+def run_command(command):
+    """Run a subprocess step in this thread
+
+    :param command: the step
+    :type command: Command
+
+    :return: the completed process
+    :rtype: subprocess.CompletedProcess
+    """
+    stdout = stderr = None
+
+    # The log is spooled to a file so that neither pipe can fill while the other is read
+    with contextlib.ExitStack() as stack:
+        log = None
+        if command.stderr == "capture":
+            log = stack.enter_context(tempfile.TemporaryFile())
+
+        with popen(
+            command.args,
+            command.stage,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT if command.stderr == "merge" else log,
+        ) as process:
+            if command.consume is None:
+                stdout = process.stdout.read()
+            elif command.chunk_size is None:
+                with command.consuming():
+                    for line in process.stdout:
+                        command.consume(line)
+            else:
+                with command.consuming():
+                    while chunk := process.stdout.read(command.chunk_size):
+                        command.consume(chunk)
+
+        if log is not None:
+            log.seek(0)
+            stderr = log.read()
+
+    return command.complete(process.returncode, stdout, stderr)
+
+
+def run_step(step):
+    """Run a step of a plan in this thread
+
+    :param step: the step
+    :type step: Command or Call or Gather
+
+    :return: the result of the step
+    :rtype: object
+    """
+    if isinstance(step, Command):
+        return run_command(step)
+
+    if isinstance(step, Call):
+        return step.run()
+
+    # Each plan runs in its own thread, in a copy of the context of the profile
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(step.plans)) as executor:
+        futures = [
+            executor.submit(contextvars.copy_context().run, run_plan, plan)
+            for plan in step.plans
+        ]
+    return [future.result() for future in futures]
+
+
+def run_plan(plan):
+    """Run a plan to completion in this thread
+
+    :param plan: the plan
+    :type plan: generator
+
+    :return: the return value of the plan
+    :rtype: object
+    """
+    send, value = plan.send, None
+
+    while True:
+        try:
+            step = send(value)
+        except StopIteration as stop:
+            return stop.value
+
+        # Errors of a step are raised in the plan, which may handle them
+        try:
+            send, value = plan.send, run_step(step)
+        except Exception as exc:  # pylint: disable=broad-except
+            send, value = plan.throw, exc
+
+
+async def aread_output(process, command):
+    """Read the output of a subprocess step on the event loop
+
+    :param process: the process
+    :type process: asyncio.subprocess.Process
+
+    :param command: the step
+    :type command: Command
+
+    :return: the output, if it isn't consumed
+    :rtype: bytes
+    """
+    if command.consume is None:
+        return await process.stdout.read()
+
+    with command.consuming():
+        if command.chunk_size is None:
+            async for line in process.stdout:
+                command.consume(line)
+            return None
+
+        # Chunks are read whole, as they are from a blocking pipe, and measured
+        # in a worker thread, as chunk consumers like the NumPy meters are CPU-bound
+        while True:
+            try:
+                chunk = await process.stdout.readexactly(command.chunk_size)
+            except asyncio.IncompleteReadError as exc:
+                if exc.partial:
+                    await asyncio.to_thread(command.consume, exc.partial)
+                return None
+            await asyncio.to_thread(command.consume, chunk)
+
+
+# A wait for a slot is polled rather than made in a thread,
+# so a wait that is cancelled never leaves a slot taken
+async def aacquire(semaphore):
+    """Take a slot of a cap on concurrent processes without blocking the event loop
+
+    :param semaphore: the semaphore of the cap
+    :type semaphore: multiprocessing.synchronize.BoundedSemaphore
+    """
+    while not semaphore.acquire(False):
+        await asyncio.sleep(0.05)
+
+
+# Resource usage of the child is not available from asyncio, so only wall time is profiled
+async def arun_command(command):
+    """Run a subprocess step without blocking the event loop
+
+    :param command: the step
+    :type command: Command
+
+    :return: the completed process
+    :rtype: subprocess.CompletedProcess
+    """
+    limits = get_limits()
+    timeout = limits.timeout_of(command.stage)
+    semaphore = limits.semaphore(command.args)
+
+    if semaphore is not None:
+        await aacquire(semaphore)
+
+    try:
+        start = time.perf_counter()
+        process = await asyncio.create_subprocess_exec(
+            *command.args,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr={
+                "merge": asyncio.subprocess.STDOUT,
+                "capture": asyncio.subprocess.PIPE,
+            }.get(command.stderr),
+            start_new_session=timeout is not None,
+        )
+        limits.limit_memory(process.pid)
+
+        try:
+            async with asyncio.timeout(timeout):
+                if command.stderr == "capture":
+                    stdout, stderr = await asyncio.gather(
+                        aread_output(process, command), process.stderr.read()
+                    )
+                else:
+                    stdout, stderr = await aread_output(process, command), None
+                await process.wait()
+        except TimeoutError as exc:
+            raise subprocess.TimeoutExpired(command.args, timeout) from exc
+        finally:
+            # A process that is abandoned early, cancelled or timed out is not left running
+            if process.returncode is None:
+                kill(process, timeout is not None)
+                await process.wait()
+            record_stage(command.stage, time.perf_counter() - start)
+    finally:
+        if semaphore is not None:
+            semaphore.release()
+
+    return command.complete(process.returncode, stdout, stderr)
+
+
+async def arun_step(step):
+    """Run a step of a plan without blocking the event loop
+
+    :param step: the step
+    :type step: Command or Call or Gather
+
+    :return: the result of the step
+    :rtype: object
+    """
+    if isinstance(step, Command):
+        return await arun_command(step)
+
+    if isinstance(step, Call):
+        return await asyncio.to_thread(step.run)
+
+    return list(await asyncio.gather(*(arun_plan(plan) for plan in step.plans)))
+
+
+async def arun_plan(plan):
+    """Run a plan to completion on the event loop
+
+    :param plan: the plan
+    :type plan: generator
+
+    :return: the return value of the plan
+    :rtype: object
+    """
+    send, value = plan.send, None
+
+    while True:
+        try:
+            step = send(value)
+        except StopIteration as stop:
+            return stop.value
+
+        try:
+            send, value = plan.send, await arun_step(step)
+        except Exception as exc:  # pylint: disable=broad-except
+            send, value = plan.throw, exc
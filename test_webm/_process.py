@@ -0,0 +1,390 @@
+"""Subprocesses of the probes and decoders, profiled per stage"""
+
+import contextlib
+import logging
+import multiprocessing
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+from ._profile import record_stage
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+
+def available_cpus():
+    """Get the number of CPUs this process may run on
+
+    :return: the number of CPUs in the affinity mask, or of the machine
+    :rtype: int
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+class Limits:  # pylint: disable=too-many-instance-attributes
+    """The resource limits of the probes and decoders run by this process and its workers
+
+    Priorities and CPU pinning are applied to the worker processes, whose threads and
+    subprocesses inherit them, while timeouts, memory limits and the caps on concurrent
+    processes apply to each subprocess.
+
+    :param timeout: the time a subprocess may run in seconds, or None for no limit
+    :type timeout: float
+
+    :param stage_timeouts: the time the subprocesses of named stages may run in seconds
+    :type stage_timeouts: dict
+
+    :param nice: the niceness of the workers, or None to keep it
+    :type nice: int
+
+    :param ionice: the best-effort I/O priority of the workers from 0 to 7, or None to keep it
+    :type ionice: int
+
+    :param workers: the number of worker processes that share the CPUs
+    :type workers: int
+
+    :param pin_cpus: whether each worker is pinned to its share of the CPUs
+    :type pin_cpus: bool
+
+    :param max_memory: the limit on the address space of a subprocess in bytes, or None
+    :type max_memory: int
+
+    :param max_decoders: the number of FFmpeg processes run at once, or None for no cap
+    :type max_decoders: int
+
+    :param max_probes: the number of FFprobe processes run at once, or None for no cap
+    :type max_probes: int
+    """
+
+    # The limits are keyword-only, as most of them are left unset
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        *,
+        timeout=None,
+        stage_timeouts=None,
+        nice=None,
+        ionice=None,
+        workers=1,
+        pin_cpus=False,
+        max_memory=None,
+        max_decoders=None,
+        max_probes=None,
+    ):
+        self.timeout = timeout
+        self.stage_timeouts = stage_timeouts or {}
+        self.nice = nice
+        self.ionice = ionice
+        self.workers = workers
+        self.max_memory = max_memory
+
+        # The caps are shared by the workers, which are given them as they start
+        context = multiprocessing.get_context()
+        self.decoders = context.BoundedSemaphore(max_decoders) if max_decoders else None
+        self.probes = context.BoundedSemaphore(max_probes) if max_probes else None
+
+        # The CPUs are split from the mask of the main process, in the order workers start
+        self.cpus = None
+        self.workers_started = None
+        self.pinned = False
+        if pin_cpus and hasattr(os, "sched_setaffinity"):
+            self.cpus = sorted(os.sched_getaffinity(0))
+            self.workers_started = context.Value("i", 0)
+
+    def timeout_of(self, stage):
+        """Get the time the subprocesses of a stage may run
+
+        :param stage: the name of the stage
+        :type stage: str
+
+        :return: the timeout in seconds, or None for no limit
+        :rtype: float
+        """
+        return self.stage_timeouts.get(stage, self.timeout)
+
+    def semaphore(self, args):
+        """Get the cap on concurrent processes of the tool of a subprocess
+
+        :param args: the arguments of the subprocess
+        :type args: list
+
+        :return: the semaphore of probes or decoders, or None if there is no cap
+        :rtype: multiprocessing.synchronize.BoundedSemaphore
+        """
+        if os.path.basename(args[0]).startswith("ffprobe"):
+            return self.probes
+        return self.decoders
+
+    # The limit is set from this process once the subprocess has started,
+    # as a preexec_fn is unsafe with the threads that run the plans.
+    # FFmpeg allocates its frame buffers after opening the input, well after the limit.
+    def limit_memory(self, pid):
+        """Limit the address space of a subprocess
+
+        :param pid: the process id
+        :type pid: int
+        """
+        if self.max_memory is None or not hasattr(resource, "prlimit"):
+            return
+        try:
+            resource.prlimit(
+                pid, resource.RLIMIT_AS, (self.max_memory, self.max_memory)
+            )
+        except ProcessLookupError:
+            pass
+
+    def apply(self):
+        """Apply the priorities and CPU pinning to this process
+
+        Only the calling thread is changed on Linux, so this is called
+        before the process starts any threads.
+        """
+        # Niceness is set rather than added, so workers that inherit it keep the same level
+        if self.nice is not None and hasattr(os, "setpriority"):
+            current = os.getpriority(os.PRIO_PROCESS, 0)
+            os.setpriority(os.PRIO_PROCESS, 0, max(self.nice, current))
+
+        if self.ionice is not None:
+            if shutil.which("ionice") is None:
+                logger.warning("ionice is not installed, I/O priority is unchanged")
+            else:
+                subprocess.run(
+                    [
+                        "ionice",
+                        "-c",
+                        "2",
+                        "-n",
+                        str(self.ionice),
+                        "-p",
+                        str(os.getpid()),
+                    ],
+                    check=False,
+                )
+
+        if self.cpus is not None:
+            with self.workers_started.get_lock():
+                index = self.workers_started.value
+                self.workers_started.value += 1
+
+            share = max(len(self.cpus) // self.workers, 1)
+            start = index % self.workers * share % len(self.cpus)
+            os.sched_setaffinity(0, self.cpus[start : start + share])
+            self.pinned = True
+
+    # A pinned worker's affinity mask is already its share of the CPUs
+    def worker_cpus(self):
+        """Get the number of CPUs of one worker, for the decoders it runs in parallel
+
+        :return: the share of the available CPUs of each worker, at least 1
+        :rtype: int
+        """
+        if self.pinned:
+            return available_cpus()
+        return max(available_cpus() // self.workers, 1)
+
+
+# The limits of this process, set once at startup and given to each worker as it starts
+LIMITS = Limits()
+
+
+def get_limits():
+    """Get the resource limits of the probes and decoders run by this process
+
+    :return: the limits
+    :rtype: Limits
+    """
+    return LIMITS
+
+
+def worker_cpus():
+    """Get the number of CPUs of this worker, for the decoders it runs in parallel
+
+    :return: the share of the available CPUs of this worker, at least 1
+    :rtype: int
+    """
+    return LIMITS.worker_cpus()
+
+
+def set_limits(limits):
+    """Set the resource limits of the probes and decoders run by this process
+
+    :param limits: the limits
+    :type limits: Limits
+    """
+    global LIMITS  # pylint: disable=global-statement
+    LIMITS = limits
+    limits.apply()
+
+
+def kill(process, group):
+    """Kill the subprocess, along with any processes it started in its group
+
+    :param process: the process
+    :type process: subprocess.Popen or asyncio.subprocess.Process
+
+    :param group: whether the process leads its own process group
+    :type group: bool
+    """
+    if not group or not hasattr(os, "killpg"):
+        process.kill()
+        return
+
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+class Watchdog:
+    """A timer that kills the process group of a subprocess that outlives its timeout
+
+    :param process: the process, which leads its own process group
+    :type process: subprocess.Popen
+
+    :param timeout: the time the process may run in seconds, or None for no limit
+    :type timeout: float
+    """
+
+    def __init__(self, process, timeout):
+        self.process = process
+        self.timeout = timeout
+        self.expired = False
+        self._lock = threading.Lock()
+        self._timer = None
+
+        if timeout is not None:
+            self._timer = threading.Timer(timeout, self.expire)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def expire(self):
+        """Kill the process group, unless the watchdog was cancelled"""
+        with self._lock:
+            if self._timer is None:
+                return
+            self.expired = True
+            kill(self.process, True)
+
+    # The process is cancelled before it's reaped, so its id is never reused when killed
+    def cancel(self):
+        """Stop the timer once the process has exited"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+
+def read_bytes_read(pid):
+    """Get the number of bytes read by the process, from /proc/<pid>/io
+
+    :param pid: the process id
+    :type pid: int
+
+    :return: the number of bytes read, or 0 if it isn't available
+    :rtype: int
+    """
+    try:
+        with open(f"/proc/{pid}/io", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("rchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+# Children run concurrently, so usage is taken per child from wait4
+# rather than from deltas of RUSAGE_CHILDREN, which would mix them together
+def reap(process):
+    """Wait for the process to exit and get its resource usage
+
+    :param process: the process
+    :type process: subprocess.Popen
+
+    :return: the CPU time, peak RSS and bytes read of the process
+    :rtype: dict
+    """
+    if not hasattr(os, "wait4"):
+        process.wait()
+        return {}
+
+    # The exited child is left waitable so its /proc entry can still be read
+    bytes_read = 0
+    if hasattr(os, "waitid"):
+        os.waitid(os.P_PID, process.pid, os.WEXITED | os.WNOWAIT)
+        bytes_read = read_bytes_read(process.pid)
+
+    _, status, rusage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+
+    # ru_maxrss is in kilobytes, except on macOS
+    rss_unit = 1 if sys.platform == "darwin" else 1024
+
+    return {
+        "cpu": rusage.ru_utime + rusage.ru_stime,
+        "max_rss": rusage.ru_maxrss * rss_unit,
+        "bytes_read": bytes_read,
+    }
+
+
+@contextlib.contextmanager
+def popen(args, stage, **kwargs):
+    """Run a subprocess, adding its wall time and resource usage to the profile
+
+    Pipes are closed before the process is waited for,
+    so a process that is abandoned early is not left blocked on a full pipe,
+    and a process that is still running when the block raises is killed.
+    The subprocess waits for a slot under the cap of its tool, and a subprocess
+    that outlives the timeout of its stage is killed with its process group.
+
+    :param args: the arguments of the subprocess
+    :type args: list
+
+    :param stage: the name of the stage that the subprocess runs
+    :type stage: str
+
+    :return: the process
+    :rtype: subprocess.Popen
+
+    :raises subprocess.TimeoutExpired: if the subprocess was killed by its timeout
+    """
+    limits = LIMITS
+    timeout = limits.timeout_of(stage)
+
+    with limits.semaphore(args) or contextlib.nullcontext():
+        start = time.perf_counter()
+
+        # Only processes that may be killed are moved out of the group of the terminal
+        process = subprocess.Popen(  # pylint: disable=consider-using-with
+            args, start_new_session=timeout is not None, **kwargs
+        )
+        limits.limit_memory(process.pid)
+        watchdog = Watchdog(process, timeout)
+
+        try:
+            yield process
+        except BaseException:
+            # A process that is abandoned by an error or interrupt is not left running
+            if process.poll() is None:
+                kill(process, timeout is not None)
+            raise
+        finally:
+            watchdog.cancel()
+            for stream in (process.stdin, process.stdout, process.stderr):
+                if stream is not None:
+                    stream.close()
+            usage = reap(process)
+            record_stage(stage, time.perf_counter() - start, **usage)
+
+            if watchdog.expired:
+                raise subprocess.TimeoutExpired(args, timeout)
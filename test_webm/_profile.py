@@ -0,0 +1,274 @@
+"""Per-stage timing and resource usage of verified WebM(s)"""
+
+import collections
+import contextlib
+import contextvars
+import math
+import os
+import tempfile
+import threading
+import time
+
+from ._report import Reporter
+
+# The profile of the file being verified, set per file by the runner
+CURRENT = contextvars.ContextVar("profile", default=None)
+
+
+class Profile:
+    """The wall time and resource usage of each stage of verifying a file"""
+
+    def __init__(self):
+        self.stages = {}
+        self.lock = threading.Lock()
+
+    def add(self, name, wall, cpu=0.0, max_rss=0, bytes_read=0):
+        """Add a run of a stage
+
+        :param name: the name of the stage
+        :type name: str
+
+        :param wall: the wall time of the run in seconds
+        :type wall: float
+
+        :param cpu: the user and system CPU time of the run in seconds
+        :type cpu: float
+
+        :param max_rss: the peak resident set size of the run in bytes
+        :type max_rss: int
+
+        :param bytes_read: the number of bytes read by the run
+        :type bytes_read: int
+        """
+        with self.lock:
+            usage = self.stages.setdefault(
+                name,
+                {"runs": 0, "wall": 0.0, "cpu": 0.0, "max_rss": 0, "bytes_read": 0},
+            )
+            usage["runs"] += 1
+            usage["wall"] += wall
+            usage["cpu"] += cpu
+            usage["max_rss"] = max(usage["max_rss"], max_rss)
+            usage["bytes_read"] += bytes_read
+
+    def to_dict(self):
+        """Get the usage of each stage as a dict of JSON types
+
+        :return: the usage of each stage by name
+        :rtype: dict
+        """
+        with self.lock:
+            return {
+                stage: dict(
+                    usage, wall=round(usage["wall"], 6), cpu=round(usage["cpu"], 6)
+                )
+                for stage, usage in self.stages.items()
+            }
+
+
+def record_stage(name, wall, **usage):
+    """Add a run of a stage to the profile of the file being verified, if any
+
+    :param name: the name of the stage
+    :type name: str
+
+    :param wall: the wall time of the run in seconds
+    :type wall: float
+    """
+    profile = CURRENT.get()
+    if profile is not None:
+        profile.add(name, wall, **usage)
+
+
+# In-process stages run on a single thread, so the thread's CPU time is the stage's
+@contextlib.contextmanager
+def stage(name):
+    """Time an in-process stage of verifying the file
+
+    :param name: the name of the stage
+    :type name: str
+    """
+    start, start_cpu = time.perf_counter(), time.thread_time()
+    try:
+        yield
+    finally:
+        record_stage(
+            name, time.perf_counter() - start, cpu=time.thread_time() - start_cpu
+        )
+
+
+def percentile(values, fraction):
+    """Get the nearest-rank percentile of the values
+
+    :param values: the sorted values
+    :type values: list
+
+    :param fraction: the percentile as a fraction
+    :type fraction: float
+
+    :return: the percentile, or 0 if there are no values
+    :rtype: float
+    """
+    if not values:
+        return 0.0
+    return values[max(math.ceil(fraction * len(values)) - 1, 0)]
+
+
+class ProfileReporter(Reporter):
+    """A writer of a per-stage breakdown of the profiles of all files
+
+    The breakdown is written once the run ends, along with an optional Prometheus textfile.
+
+    :param stream: the stream the breakdown is written to, or None to skip it
+    :type stream: io.TextIOBase
+
+    :param prometheus: the path of the Prometheus textfile, if any
+    :type prometheus: str
+    """
+
+    quantiles = (0.5, 0.9, 0.99)
+
+    def __init__(self, stream, prometheus=None):
+        super().__init__(stream)
+        self.prometheus = prometheus
+        self.usage = collections.defaultdict(collections.Counter)
+        self.walls = collections.defaultdict(list)
+
+    # Only the breakdown is written, once the run ends
+    def write_file(self, file, report, success, record):
+        self.files["passed" if success else "failed"] += 1
+        self.write_record(file, report, success, record)
+
+    # The file row totals the stages, which may overlap in wall time
+    def write_record(self, file, report, success, record):
+        self.walls["file"].append(record["time"])
+        file_usage = {"runs": 1, "wall": record["time"], "cpu": 0.0, "bytes_read": 0}
+        max_rss = self.usage["file"]["max_rss"]
+
+        for name, usage in record.get("profile", {}).items():
+            self.walls[name].append(usage["wall"])
+            stage_max_rss = max(self.usage[name]["max_rss"], usage["max_rss"])
+            self.usage[name].update(usage)
+            self.usage[name]["max_rss"] = stage_max_rss
+
+            file_usage["cpu"] += usage["cpu"]
+            file_usage["bytes_read"] += usage["bytes_read"]
+            max_rss = max(max_rss, usage["max_rss"])
+
+        self.usage["file"].update(file_usage)
+        self.usage["file"]["max_rss"] = max_rss
+
+    def breakdown(self):
+        """Get the per-stage breakdown as text
+
+        :return: the breakdown
+        :rtype: str
+        """
+        header = f"{'stage':<18}{'runs':>7}{'wall':>10}{'cpu':>10}"
+        header += "".join(f"{f'p{quantile * 100:g}':>9}" for quantile in self.quantiles)
+        header += f"{'max':>9}{'peak rss':>11}{'read':>11}"
+        lines = [
+            f"Profile of {len(self.walls['file'])} files, time per file in seconds",
+            header,
+        ]
+
+        for name, walls in sorted(
+            self.walls.items(), key=lambda item: item[0] != "file"
+        ):
+            walls = sorted(walls)
+            usage = self.usage[name]
+            line = f"{name:<18}{usage['runs']:>7}"
+            line += f"{sum(walls):>10.3f}{usage['cpu']:>10.3f}"
+            line += "".join(
+                f"{percentile(walls, quantile):>9.3f}" for quantile in self.quantiles
+            )
+            line += f"{walls[-1]:>9.3f}{format_bytes(usage['max_rss']):>11}"
+            line += f"{format_bytes(usage['bytes_read']):>11}"
+            lines.append(line)
+
+        return "\n".join(lines) + "\n"
+
+    def metrics(self):
+        """Get the profiles of all files in the Prometheus text format
+
+        :return: the metrics
+        :rtype: str
+        """
+        lines = [
+            "# HELP test_webm_files_total Files verified by result.",
+            "# TYPE test_webm_files_total counter",
+        ]
+        for status in ("passed", "failed"):
+            lines.append(
+                f'test_webm_files_total{{status="{status}"}} {self.files[status]}'
+            )
+
+        families = [
+            ("stage_runs_total", "counter", "Runs of each stage.", "runs"),
+            ("stage_seconds_total", "counter", "Wall time of each stage.", "wall"),
+            ("stage_cpu_seconds_total", "counter", "CPU time of each stage.", "cpu"),
+            ("stage_max_rss_bytes", "gauge", "Peak RSS of each stage.", "max_rss"),
+            (
+                "stage_read_bytes_total",
+                "counter",
+                "Bytes read by each stage.",
+                "bytes_read",
+            ),
+        ]
+        for family, metric_type, description, key in families:
+            lines.append(f"# HELP test_webm_{family} {description}")
+            lines.append(f"# TYPE test_webm_{family} {metric_type}")
+            for name, usage in sorted(self.usage.items()):
+                lines.append(f'test_webm_{family}{{stage="{name}"}} {usage[key]}')
+
+        lines.append("# HELP test_webm_stage_seconds Wall time per file of each stage.")
+        lines.append("# TYPE test_webm_stage_seconds summary")
+        for name, walls in sorted(self.walls.items()):
+            walls = sorted(walls)
+            for quantile in self.quantiles:
+                lines.append(
+                    f'test_webm_stage_seconds{{stage="{name}",quantile="{quantile}"}}'
+                    f" {percentile(walls, quantile)}"
+                )
+            lines.append(f'test_webm_stage_seconds_sum{{stage="{name}"}} {sum(walls)}')
+            lines.append(
+                f'test_webm_stage_seconds_count{{stage="{name}"}} {len(walls)}'
+            )
+
+        return "\n".join(lines) + "\n"
+
+    # The node exporter may read the textfile at any time, so it's replaced atomically
+    def write_metrics(self):
+        """Write the metrics to the Prometheus textfile"""
+        directory = os.path.dirname(os.path.abspath(self.prometheus))
+        with tempfile.NamedTemporaryFile(
+            "w", dir=directory, suffix=".tmp", delete=False, encoding="utf-8"
+        ) as f:
+            f.write(self.metrics())
+        os.chmod(f.name, 0o644)
+        os.replace(f.name, self.prometheus)
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.write(self.breakdown())
+            self.stream.flush()
+        if self.prometheus is not None:
+            self.write_metrics()
+
+
+def format_bytes(size):
+    """Get the size in binary units
+
+    :param size: the size in bytes
+    :type size: int
+
+    :return: the formatted size
+    :rtype: str
+    """
+    if size < 1024:
+        return f"{size}B"
+    for unit in ("KiB", "MiB"):
+        size /= 1024
+        if size < 1024:
+            return f"{size:.1f}{unit}"
+    return f"{size / 1024:.1f}GiB"
@@ -0,0 +1,391 @@
+"""A shared work queue of WebM(s) leased by workers on many hosts"""
+
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+from ._report import Reporter
+from ._runner import verify_files
+
+logger = logging.getLogger(__name__)
+
+# The statuses of a job, in the order they are reported
+JOB_STATUSES = ("queued", "leased", "passed", "failed", "error")
+
+
+class WorkQueue:
+    """A queue of files to verify, kept in a SQLite database on shared storage
+
+    Workers lease jobs for a limited time and renew their leases while they work,
+    so the jobs of a worker that crashed are leased again once their leases expire.
+    Leases are compared against the clock of each host, which must be kept in sync.
+
+    :param path: the path of the SQLite database
+    :type path: str
+
+    :param lease_timeout: the time a lease is held without being renewed in seconds
+    :type lease_timeout: float
+
+    :param max_attempts: the number of leases of a job before it's given up as an error
+    :type max_attempts: int
+    """
+
+    def __init__(self, path, lease_timeout=600.0, max_attempts=3):
+        self.path = path
+        self.lease_timeout = lease_timeout
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+
+        # Transactions are begun explicitly, so that leases are taken under a write lock
+        self._connection = sqlite3.connect(
+            path, timeout=60, isolation_level=None, check_same_thread=False
+        )
+
+        # The rollback journal is kept, as WAL needs shared memory that network storage lacks
+        with self._lock:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "path TEXT PRIMARY KEY, "
+                "status TEXT NOT NULL, "
+                "attempts INTEGER NOT NULL DEFAULT 0, "
+                "worker TEXT, "
+                "lease_expires REAL, "
+                "record TEXT, "
+                "report TEXT, "
+                "updated REAL NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, lease_expires)"
+            )
+
+    def transaction(self):
+        """Begin a transaction that holds the write lock of the database until it ends
+
+        :return: the connection, which commits or rolls back the transaction on exit
+        :rtype: sqlite3.Connection
+        """
+        self._connection.execute("BEGIN IMMEDIATE")
+        return self._connection
+
+    # Jobs that are finished are queued again, as the rules may have changed since
+    def seed(self, paths):
+        """Queue the files, leaving the jobs that are leased by a worker
+
+        :param paths: the paths of the files
+        :type paths: iterable
+
+        :return: the number of jobs queued
+        :rtype: int
+        """
+        queued = 0
+        now = time.time()
+
+        with self._lock, self.transaction() as connection:
+            for path in paths:
+                cursor = connection.execute(
+                    "INSERT INTO jobs (path, status, updated) VALUES (?, 'queued', ?) "
+                    "ON CONFLICT (path) DO UPDATE SET "
+                    "status = 'queued', attempts = 0, worker = NULL, "
+                    "lease_expires = NULL, record = NULL, report = NULL, "
+                    "updated = excluded.updated "
+                    "WHERE status != 'leased'",
+                    (path, now),
+                )
+                queued += cursor.rowcount
+
+        return queued
+
+    def lease(self, worker):
+        """Lease the next job, reclaiming jobs whose leases have expired
+
+        :param worker: the identity of the worker
+        :type worker: str
+
+        :return: the path of the file, or None if no job can be leased
+        :rtype: str
+        """
+        now = time.time()
+
+        with self._lock, self.transaction() as connection:
+            # Jobs that keep outliving their leases are given up rather than retried forever
+            connection.execute(
+                "UPDATE jobs SET status = 'error', worker = NULL, lease_expires = NULL, "
+                "record = ?, updated = ? "
+                "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (
+                    json.dumps({"results": [], "error": "Lease expired"}),
+                    now,
+                    now,
+                    self.max_attempts,
+                ),
+            )
+
+            row = connection.execute(
+                "SELECT path, status, worker FROM jobs "
+                "WHERE status = 'queued' OR (status = 'leased' AND lease_expires < ?) "
+                "ORDER BY rowid LIMIT 1",
+                (now,),
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            path, status, previous_worker = row
+            connection.execute(
+                "UPDATE jobs SET status = 'leased', attempts = attempts + 1, worker = ?, "
+                "lease_expires = ?, updated = ? WHERE path = ?",
+                (worker, now + self.lease_timeout, now, path),
+            )
+
+        if status == "leased":
+            logger.info("Reclaimed '%s' from worker '%s'", path, previous_worker)
+
+        return path
+
+    def renew(self, worker):
+        """Extend the leases of the jobs held by the worker
+
+        :param worker: the identity of the worker
+        :type worker: str
+        """
+        now = time.time()
+
+        with self._lock, self.transaction() as connection:
+            connection.execute(
+                "UPDATE jobs SET lease_expires = ? "
+                "WHERE status = 'leased' AND worker = ?",
+                (now + self.lease_timeout, worker),
+            )
+
+    # A worker whose lease was reclaimed may still finish the job, in which case
+    # the result of the worker holding the lease is kept
+    def complete(self, path, worker, success, record, report):
+        """Store the results of a leased job
+
+        :param path: the path of the file
+        :type path: str
+
+        :param worker: the identity of the worker
+        :type worker: str
+
+        :param success: whether all tests passed
+        :type success: bool
+
+        :param record: the results of the rules, the time spent and any error
+        :type record: dict
+
+        :param report: the text report of the file
+        :type report: str
+
+        :return: whether the worker still held the lease
+        :rtype: bool
+        """
+        if record.get("error") is not None:
+            status = "error"
+        else:
+            status = "passed" if success else "failed"
+
+        with self._lock, self.transaction() as connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET status = ?, worker = NULL, lease_expires = NULL, "
+                "record = ?, report = ?, updated = ? "
+                "WHERE path = ? AND status = 'leased' AND worker = ?",
+                (status, json.dumps(record), report, time.time(), path, worker),
+            )
+
+        if not cursor.rowcount:
+            logger.info("Discarded result of '%s', its lease was reclaimed", path)
+        return bool(cursor.rowcount)
+
+    def counts(self):
+        """Get the number of jobs of each status
+
+        :return: the number of jobs by status, and of leases that have expired
+        :rtype: dict
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+            ).fetchall()
+            (expired,) = self._connection.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'leased' AND lease_expires < ?",
+                (time.time(),),
+            ).fetchone()
+
+        counts = dict.fromkeys(JOB_STATUSES, 0)
+        counts.update(rows)
+        counts["expired"] = expired
+        return counts
+
+    def workers(self):
+        """Get the number of jobs leased by each worker
+
+        :return: the number of leased jobs by worker
+        :rtype: dict
+        """
+        with self._lock:
+            return dict(
+                self._connection.execute(
+                    "SELECT worker, COUNT(*) FROM jobs WHERE status = 'leased' "
+                    "GROUP BY worker ORDER BY worker"
+                ).fetchall()
+            )
+
+    def close(self):
+        """Close the connection to the database"""
+        with self._lock:
+            self._connection.close()
+
+
+class QueueReporter(Reporter):
+    """A writer of the results of each leased file back to the queue
+
+    :param queue: the queue
+    :type queue: WorkQueue
+
+    :param worker: the identity of the worker
+    :type worker: str
+    """
+
+    def __init__(self, queue, worker):
+        super().__init__(None)
+        self.queue = queue
+        self.worker = worker
+
+    # Results are only written to the queue, there is no stream to flush
+    def write_file(self, file, report, success, record):
+        self.files["passed" if success else "failed"] += 1
+        self.write_record(file, report, success, record)
+
+    def write_record(self, file, report, success, record):
+        self.queue.complete(file, self.worker, success, record, report)
+
+    def close(self):
+        pass
+
+
+def worker_id():
+    """Get the identity of this worker, unique across the hosts sharing a queue
+
+    :return: the host name and process ID
+    :rtype: str
+    """
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def leased_files(queue, worker):
+    """Lease jobs one at a time until none can be leased
+
+    :param queue: the queue
+    :type queue: WorkQueue
+
+    :param worker: the identity of the worker
+    :type worker: str
+
+    :return: the paths of the leased files
+    :rtype: generator
+    """
+    while (path := queue.lease(worker)) is not None:
+        yield path
+
+
+# Leases are renewed in the background while the files are verified
+def work(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+    queue, groups, jobs, loglevel, format_options, reporters, fail_fast=False
+):
+    """Verify the files of the queue until every job is finished
+
+    Jobs leased by other workers are waited on, so that they are reclaimed
+    if their worker crashes.
+
+    :param queue: the queue
+    :type queue: WorkQueue
+
+    :param groups: the values of the selected test groups
+    :type groups: list
+
+    :param jobs: the number of files to verify in parallel
+    :type jobs: int
+
+    :param loglevel: the name of the logging level
+    :type loglevel: str
+
+    :param format_options: the keyword arguments of WebmFormat
+    :type format_options: dict
+
+    :param reporters: the reporters the results of each file are written to
+    :type reporters: list
+
+    :param fail_fast: whether to skip costly tests once a cheaper test has failed
+    :type fail_fast: bool
+
+    :return: whether all tests passed for the files verified by this worker
+    :rtype: bool
+    """
+    worker = worker_id()
+    reporters = reporters + [QueueReporter(queue, worker)]
+    success = True
+
+    stopped = threading.Event()
+
+    def renew():
+        while not stopped.wait(queue.lease_timeout / 3):
+            queue.renew(worker)
+
+    logger.info("Working on queue '%s' as '%s'...", queue.path, worker)
+    renewer = threading.Thread(target=renew, daemon=True)
+    renewer.start()
+
+    try:
+        while True:
+            success = (
+                verify_files(
+                    leased_files(queue, worker),
+                    groups,
+                    jobs,
+                    loglevel,
+                    format_options,
+                    reporters,
+                    fail_fast,
+                )
+                and success
+            )
+
+            counts = queue.counts()
+            if not counts["queued"] and not counts["leased"]:
+                return success
+
+            # The rest of the jobs are leased by other workers, which may yet crash
+            time.sleep(min(queue.lease_timeout / 3, 10.0))
+    finally:
+        stopped.set()
+        renewer.join()
+
+
+def write_status(stream, queue):
+    """Write the progress of the queue
+
+    :param stream: the stream the progress is written to
+    :type stream: io.TextIOBase
+
+    :param queue: the queue
+    :type queue: WorkQueue
+    """
+    counts = queue.counts()
+    total = sum(counts[status] for status in JOB_STATUSES)
+    finished = counts["passed"] + counts["failed"] + counts["error"]
+
+    stream.write(
+        f"{finished}/{total} jobs finished "
+        f"({finished / total * 100 if total else 100.0:.1f}%)\n"
+    )
+    for status in JOB_STATUSES:
+        stream.write(f"{status:<10}{counts[status]:>10}\n")
+    stream.write(f"{'expired':<10}{counts['expired']:>10}\n")
+
+    for worker, leased in queue.workers().items():
+        stream.write(f"worker '{worker}' holds {leased} leases\n")
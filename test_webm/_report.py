@@ -0,0 +1,197 @@
+"""Streaming reporters of the results of verified WebM(s)"""
+
+import abc
+import collections
+import json
+import sys
+from xml.sax.saxutils import escape, quoteattr
+
+
+class Reporter(abc.ABC):
+    """A writer of the results of each file as it's verified
+
+    Only the counts of each rule status are kept for the summary,
+    so memory doesn't grow with the number of files.
+
+    :param stream: the stream the report is written to
+    :type stream: io.TextIOBase
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.files = collections.Counter()
+        self.rules = collections.defaultdict(collections.Counter)
+
+    # Reporters are selected by the value of the --report option
+    @staticmethod
+    def open(name, path):
+        """Open the named reporter
+
+        :param name: 'text', 'jsonl' or 'junit'
+        :type name: str
+
+        :param path: the path of the report, or '-' for standard output
+        :type path: str
+
+        :return: the reporter
+        :rtype: Reporter
+        """
+        if path == "-":
+            stream = sys.stdout
+        else:
+            # pylint: disable-next=consider-using-with
+            stream = open(path, "w", encoding="utf-8")
+        return REPORTERS[name](stream)
+
+    def write_file(self, file, report, success, record):
+        """Write the results of a verified file
+
+        :param file: the file being tested
+        :type file: str
+
+        :param report: the text report of the file
+        :type report: str
+
+        :param success: whether all tests passed
+        :type success: bool
+
+        :param record: the results of the rules, the time spent and any error
+        :type record: dict
+        """
+        self.files["passed" if success else "failed"] += 1
+        for result in record["results"]:
+            self.rules[result["rule"]][result["status"]] += 1
+
+        self.write_record(file, report, success, record)
+        self.stream.flush()
+
+    @abc.abstractmethod
+    def write_record(self, file, report, success, record):
+        """Write the results of a verified file in the format of the reporter
+
+        :param file: the file being tested
+        :type file: str
+
+        :param report: the text report of the file
+        :type report: str
+
+        :param success: whether all tests passed
+        :type success: bool
+
+        :param record: the results of the rules, the time spent and any error
+        :type record: dict
+        """
+
+    def summary(self):
+        """Get the counts of files and of the statuses of each rule
+
+        :return: the summary
+        :rtype: dict
+        """
+        return {
+            "files": sum(self.files.values()),
+            "passed": self.files["passed"],
+            "failed": self.files["failed"],
+            "rules": {rule: dict(counts) for rule, counts in self.rules.items()},
+        }
+
+    def close(self):
+        """Write the summary and close the report"""
+        if self.stream is not sys.stdout:
+            self.stream.close()
+
+
+class TextReporter(Reporter):
+    """A writer of the text report of each file"""
+
+    def write_record(self, file, report, success, record):
+        self.stream.write(report)
+
+
+class JsonLinesReporter(Reporter):
+    """A writer of a JSON record per file, followed by a summary record"""
+
+    def write_record(self, file, report, success, record):
+        self.stream.write(
+            json.dumps(dict(record, type="file", file=file, success=success)) + "\n"
+        )
+
+    def close(self):
+        self.stream.write(json.dumps(dict(self.summary(), type="summary")) + "\n")
+        super().close()
+
+
+class JUnitReporter(Reporter):
+    """A writer of a JUnit XML test suite per file, followed by a summary suite
+
+    Totals are not known until the end of the run, so the testsuites element
+    only carries the name and the summary is written as properties of a final suite.
+    """
+
+    # The JUnit element of each rule status other than pass
+    status_tags = {"fail": "failure", "error": "error", "skip": "skipped"}
+
+    def __init__(self, stream):
+        super().__init__(stream)
+        self.stream.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        self.stream.write('<testsuites name="test_webm">\n')
+
+    def write_record(self, file, report, success, record):
+        counts = collections.Counter(result["status"] for result in record["results"])
+        failed_verify = record["error"] is not None
+        self.stream.write(
+            f"  <testsuite name={quoteattr(file)}"
+            f" tests=\"{len(record['results']) + failed_verify}\""
+            f' failures="{counts["fail"]}" errors="{counts["error"] + failed_verify}"'
+            f' skipped="{counts["skip"]}" time="{record["time"]:.3f}">\n'
+        )
+
+        for result in record["results"]:
+            self.stream.write(
+                f"    <testcase classname={quoteattr(result['group'])}"
+                f" name={quoteattr(result['rule'])} time=\"{result['time']:.6f}\""
+            )
+            if result["status"] == "pass":
+                self.stream.write("/>\n")
+                continue
+
+            tag = self.status_tags[result["status"]]
+            detail = f"value: {result['value']!r}\nexpected: {result['expected']}"
+            self.stream.write(
+                f">\n      <{tag}"
+                f" message={quoteattr(result['message'] or '')}>"
+                f"{escape(detail)}</{tag}>\n    </testcase>\n"
+            )
+
+        # A file that couldn't be verified is reported as a single errored test
+        if failed_verify:
+            self.stream.write(
+                '    <testcase classname="test_webm" name="verify">\n'
+                f"      <error message={quoteattr(record['error'])}>"
+                f"{escape(report)}</error>\n    </testcase>\n"
+            )
+
+        self.stream.write("  </testsuite>\n")
+
+    def close(self):
+        summary = self.summary()
+        self.stream.write(
+            f'  <testsuite name="summary" tests="{summary["files"]}"'
+            f' failures="{summary["failed"]}" errors="0" skipped="0">\n'
+            "    <properties>\n"
+        )
+        for rule, counts in summary["rules"].items():
+            for status, count in counts.items():
+                self.stream.write(
+                    f"      <property name={quoteattr(f'{rule}.{status}')}"
+                    f' value="{count}"/>\n'
+                )
+        self.stream.write("    </properties>\n  </testsuite>\n</testsuites>\n")
+        super().close()
+
+
+REPORTERS = {
+    "text": TextReporter,
+    "jsonl": JsonLinesReporter,
+    "junit": JUnitReporter,
+}
@@ -0,0 +1,809 @@
+"""A compiled table of the rules that verify the file against encoding standards"""
+
+import functools
+import time
+
+from packaging import version
+
+from ._profile import stage
+
+
+class Fact:  # pylint: disable=too-few-public-methods
+    """A value extracted from the sources of test data of the file
+
+    :param sources: the sources of test data the value is extracted from
+    :type sources: tuple
+
+    :param extract: the function that extracts the value from the WebmFormat
+    :type extract: callable
+    """
+
+    def __init__(self, sources, extract):
+        self.sources = sources
+        self.extract = extract
+
+
+class Rule:
+    """A predicate over facts of the file that must hold to satisfy a standard
+
+    :param name: the name of the rule
+    :type name: str
+
+    :param group: the value of the test group of the rule
+    :type group: str
+
+    :param facts: the names of the facts passed to the predicate
+    :type facts: tuple
+
+    :param predicate: the function that tests the facts
+    :type predicate: callable
+
+    :param expected: a description of the values that satisfy the predicate
+    :type expected: str
+
+    :param message: the message of a failure
+    :type message: str
+    """
+
+    # The rules are declared in one table, with their arguments in order
+    # pylint: disable-next=too-many-arguments,too-many-positional-arguments
+    def __init__(self, name, group, facts, predicate, expected, message):
+        self.name = name
+        self.group = group
+        self.facts = facts
+        self.predicate = predicate
+        self.expected = expected
+        self.message = message
+
+    @property
+    def sources(self):
+        """The sources of test data read by the rule"""
+        return tuple(
+            dict.fromkeys(
+                source for fact in self.facts for source in FACTS[fact].sources
+            )
+        )
+
+    @property
+    def cost(self):
+        """The cost of loading the sources of test data read by the rule"""
+        return max(SOURCE_COSTS[source] for source in self.sources)
+
+    def value(self, values):
+        """Get the facts passed to the predicate as a single value
+
+        :param values: the facts in the order of the rule
+        :type values: list
+
+        :return: the fact, or the facts by name if the rule reads more than one
+        :rtype: object
+        """
+        return values[0] if len(values) == 1 else dict(zip(self.facts, values))
+
+    def describe_failure(self, value):
+        """Get the message of a failure of the rule
+
+        :param value: the facts passed to the predicate
+        :type value: object
+
+        :return: the message with the actual and expected values
+        :rtype: str
+        """
+        return f"{self.message}: got {value!r}, expected {self.expected}"
+
+
+class RuleResult:  # pylint: disable=too-few-public-methods
+    """The result of a rule for the file
+
+    :param rule: the rule
+    :type rule: Rule
+
+    :param status: 'pass', 'fail', 'error' or 'skip'
+    :type status: str
+
+    :param value: the facts passed to the predicate
+    :type value: object
+
+    :param message: the message of a failure, error or skip
+    :type message: str
+
+    :param elapsed: the time spent evaluating the rule in seconds
+    :type elapsed: float
+    """
+
+    def __init__(self, rule, status, value=None, message=None, elapsed=0.0):
+        self.rule = rule
+        self.status = status
+        self.value = value
+        self.message = message
+        self.elapsed = elapsed
+
+    def to_dict(self):
+        """Get the result as a dict of JSON types
+
+        :return: the result
+        :rtype: dict
+        """
+        return {
+            "rule": self.rule.name,
+            "group": self.rule.group,
+            "status": self.status,
+            "value": self.value,
+            "expected": self.rule.expected,
+            "message": self.message,
+            "time": round(self.elapsed, 6),
+        }
+
+
+def encoder_tag(webm_format):
+    """Get the encoder tag of the container, or None if it isn't tagged
+
+    :param webm_format: the file being tested
+    :type webm_format: WebmFormat
+
+    :return: the encoder tag
+    :rtype: str
+    """
+    for tag_key, tag_value in webm_format.webm_format["format"]["tags"].items():
+        if tag_key.lower() == "encoder":
+            return tag_value
+    return None
+
+
+def source_metadata(webm_format):
+    """Get the keys of extraneous source file metadata
+
+    :param webm_format: the file being tested
+    :type webm_format: WebmFormat
+
+    :return: the keys of the stream and format tags
+    :rtype: list
+    """
+    found_source_metadata = []
+
+    for stream in webm_format.webm_format["streams"]:
+        # Tag entry isn't guaranteed to exist, examples found in VP8 encodes
+        for tag_key in stream.get("tags", []):
+            if tag_key.lower() != "encoder" and tag_key.lower() != "duration":
+                found_source_metadata.append(tag_key)
+
+    # Tag entry is expected to exist here, haven't found examples where that isn't true
+    for tag_key in webm_format.webm_format["format"]["tags"]:
+        if tag_key.lower() != "encoder":
+            found_source_metadata.append(tag_key)
+
+    return found_source_metadata
+
+
+def encoder_version_is_current(encoder):
+    """Test if the FFmpeg build of the encoder tag is the latest release
+
+    :param encoder: the encoder tag, or None if it isn't tagged
+    :type encoder: str
+
+    :return: whether the build is up to date
+    :rtype: bool
+    """
+    if encoder is None:
+        return True
+    # FFmpeg versioning doesn't comply with PEP 440 so we can't use packaging.version
+    webm_ffmpeg_version = version.parse(encoder.removeprefix("Lavf"))
+    latest_ffmpeg_version = version.parse("61.7.100")
+    return webm_ffmpeg_version >= latest_ffmpeg_version
+
+
+WEBM = ("webm_format",)
+
+# The relative cost of loading each source of test data: header metadata,
+# a demux of every packet, or a decode of the whole stream
+SOURCE_COSTS = {
+    "webm_format": 0,
+    "audio_format": 1,
+    "video_packets": 1,
+    "packet_profile": 1,
+    "stream_layout": 0,
+    "loudness_stats": 2,
+    "motion_stats": 2,
+    "decode_integrity": 2,
+}
+
+# The facts read by the rules, extracted once per file
+FACTS = {
+    "first_stream_type": Fact(
+        WEBM, lambda f: f.webm_format["streams"][0]["codec_type"]
+    ),
+    "second_stream_type": Fact(
+        WEBM, lambda f: f.webm_format["streams"][1]["codec_type"]
+    ),
+    "stream_count": Fact(WEBM, lambda f: len(f.webm_format["streams"])),
+    "encoder": Fact(WEBM, encoder_tag),
+    "format_name": Fact(WEBM, lambda f: f.webm_format["format"]["format_name"]),
+    "bit_rate": Fact(WEBM, lambda f: int(f.webm_format["format"]["bit_rate"])),
+    "height": Fact(WEBM, lambda f: int(f.get_video_stream_entry("height"))),
+    "source_metadata": Fact(WEBM, source_metadata),
+    "chapters": Fact(WEBM, lambda f: len(f.webm_format["chapters"])),
+    "video_codec": Fact(WEBM, lambda f: f.get_video_stream_entry("codec_name")),
+    "pix_fmt": Fact(WEBM, lambda f: f.get_video_stream_entry("pix_fmt")),
+    "color_space": Fact(WEBM, lambda f: f.get_video_stream_entry("color_space")),
+    "color_transfer": Fact(WEBM, lambda f: f.get_video_stream_entry("color_transfer")),
+    "color_primaries": Fact(
+        WEBM, lambda f: f.get_video_stream_entry("color_primaries")
+    ),
+    "avg_frame_rate": Fact(WEBM, lambda f: f.get_video_stream_entry("avg_frame_rate")),
+    "variable_interval_ratio": Fact(
+        ("video_packets",), lambda f: f.video_packets["variable_interval_ratio"]
+    ),
+    "max_keyframe_interval": Fact(
+        ("video_packets",), lambda f: f.video_packets["max_keyframe_interval"]
+    ),
+    "frame_gap_ratio": Fact(
+        ("video_packets",), lambda f: f.video_packets["frame_gap_ratio"]
+    ),
+    "peak_bit_rate": Fact(
+        ("packet_profile",), lambda f: f.packet_profile["peak_bit_rate"]
+    ),
+    "av_drift": Fact(("packet_profile",), lambda f: f.packet_profile["av_drift"]),
+    "max_packet_gap": Fact(
+        ("packet_profile",), lambda f: f.packet_profile["max_packet_gap"]
+    ),
+    "cue_points": Fact(("stream_layout",), lambda f: f.stream_layout["cue_points"]),
+    "cues_before_clusters": Fact(
+        ("stream_layout",), lambda f: f.stream_layout["cues_before_clusters"]
+    ),
+    "seek_head_cues": Fact(
+        ("stream_layout",), lambda f: f.stream_layout["seek_head_cues"]
+    ),
+    "max_cluster_size": Fact(
+        ("stream_layout",), lambda f: f.stream_layout["max_cluster_size"]
+    ),
+    "max_cue_interval": Fact(
+        ("stream_layout",), lambda f: f.stream_layout["max_cue_interval"]
+    ),
+    "duration": Fact(WEBM, lambda f: float(f.webm_format["format"]["duration"])),
+    "decode_error": Fact(
+        ("decode_integrity",), lambda f: f.decode_integrity["decode_error"]
+    ),
+    "decode_error_time": Fact(
+        ("decode_integrity",), lambda f: f.decode_integrity["decode_error_time"]
+    ),
+    "decoded_duration": Fact(
+        ("decode_integrity",), lambda f: f.decode_integrity["decoded_duration"]
+    ),
+    "blend_ratio": Fact(("motion_stats",), lambda f: f.motion_stats["blend_ratio"]),
+    "audio_codec": Fact(WEBM, lambda f: f.get_audio_stream_entry("codec_name")),
+    "input_i": Fact(
+        ("loudness_stats",), lambda f: float(f.get_loudness_entry("input_i"))
+    ),
+    "input_tp": Fact(
+        ("loudness_stats",), lambda f: float(f.get_loudness_entry("input_tp"))
+    ),
+    "audio_bit_rate": Fact(
+        ("audio_format",), lambda f: int(f.get_audio_format_entry("bit_rate"))
+    ),
+    "sample_rate": Fact(WEBM, lambda f: int(f.get_audio_stream_entry("sample_rate"))),
+    "channels": Fact(WEBM, lambda f: int(f.get_audio_stream_entry("channels"))),
+    "channel_layout": Fact(WEBM, lambda f: f.get_audio_stream_entry("channel_layout")),
+}
+
+COLORS = ["bt709", "smpte170m", "bt470bg"]
+
+FRAME_RATES = [
+    "24000/1001",
+    "2997/125",
+    "23976/1000",
+    "24/1",
+    "30000/1001",
+    "19001/634",
+    "1990/83",
+    "2997/100",
+    "30/1",
+]
+
+# The rules of each test group, in the order of the standards
+RULES = [
+    # Expectation 1: Index 0 stream is video
+    Rule(
+        "video_stream",
+        "format",
+        ("first_stream_type",),
+        lambda codec_type: codec_type == "video",
+        "== 'video'",
+        "First stream is not video",
+    ),
+    # Expectation 2: Index 1 stream is audio
+    Rule(
+        "audio_stream",
+        "format",
+        ("second_stream_type",),
+        lambda codec_type: codec_type == "audio",
+        "== 'audio'",
+        "Second stream is not audio",
+    ),
+    # Expectation 3: There exists 1 video stream and 1 audio stream
+    Rule(
+        "stream_count",
+        "format",
+        ("stream_count",),
+        lambda streams: streams == 2,
+        "== 2",
+        "Unexpected number of streams",
+    ),
+    # Files must use the latest release version of FFmpeg.
+    Rule(
+        "encoder_name",
+        "format",
+        ("encoder",),
+        lambda encoder: encoder is None or encoder.startswith("Lavf"),
+        "starts with 'Lavf'",
+        "Incorrect Encoder",
+    ),
+    # Files must use the latest release version of FFmpeg.
+    Rule(
+        "encoder_version",
+        "format",
+        ("encoder",),
+        encoder_version_is_current,
+        ">= Lavf61.7.100",
+        "Build is out of date",
+    ),
+    # Files must use the WebM container.
+    Rule(
+        "file_format",
+        "format",
+        ("format_name",),
+        lambda format_name: format_name == "matroska,webm",
+        "== 'matroska,webm'",
+        "Incorrect file format",
+    ),
+    # Files must adhere to our size restrictions.
+    # Linear fit approximation, we just want to flag egregious overall bitrates here
+    Rule(
+        "filesize",
+        "format",
+        ("bit_rate", "height"),
+        lambda bit_rate, height: bit_rate < height * 5000 + 683300,
+        "bit_rate < height * 5000 + 683300",
+        "File size restriction violated",
+    ),
+    # Bitrate spikes stall playback even when the overall bitrate is within limits.
+    # A second may carry a keyframe, so it's allowed three times the overall limit
+    Rule(
+        "peak_bitrate",
+        "packets",
+        ("peak_bit_rate", "height"),
+        lambda peak_bit_rate, height: peak_bit_rate < (height * 5000 + 683300) * 3,
+        "peak_bit_rate < (height * 5000 + 683300) * 3",
+        "Peak one-second bitrate restriction violated",
+    ),
+    # Audio and video streams must have the same length.
+    Rule(
+        "av_drift",
+        "packets",
+        ("av_drift",),
+        lambda drift: drift <= 0.5,
+        "<= 0.5 seconds between the audio and video durations",
+        "Audio and video durations differ",
+    ),
+    # Streams must not have gaps that no packet covers.
+    Rule(
+        "packet_gaps",
+        "packets",
+        ("max_packet_gap",),
+        lambda gap: gap <= 1.0,
+        "<= 1.0 seconds without packets",
+        "Gap between packets",
+    ),
+    # Files must erase source metadata using -map_metadata -1.
+    Rule(
+        "metadata",
+        "format",
+        ("source_metadata",),
+        lambda tags: not tags,
+        "no tags other than encoder and duration",
+        "Extraneous source file metadata",
+    ),
+    # Files must erase source menu data using -map_chapters -1.
+    Rule(
+        "chapters",
+        "format",
+        ("chapters",),
+        lambda chapters: not chapters,
+        "== 0",
+        "Extraneous menu data",
+    ),
+    # Videos must use the VP9 video codec.
+    Rule(
+        "video_codec",
+        "video",
+        ("video_codec",),
+        lambda codec: codec == "vp9",
+        "== 'vp9'",
+        "Incorrect video codec",
+    ),
+    # Videos must use the yuv420p pixel format.
+    Rule(
+        "pix_fmt",
+        "video",
+        ("pix_fmt",),
+        lambda pix_fmt: pix_fmt == "yuv420p",
+        "== 'yuv420p'",
+        "Incorrect pixel format",
+    ),
+    # Videos must identify colorspace
+    # Colorspace entries do not exist if not specified by the encoder
+    Rule(
+        "color_space",
+        "video",
+        ("color_space",),
+        lambda color_space: color_space in COLORS,
+        f"in {COLORS}",
+        "Unexpected color_space",
+    ),
+    Rule(
+        "color_transfer",
+        "video",
+        ("color_transfer",),
+        lambda color_transfer: color_transfer in COLORS,
+        f"in {COLORS}",
+        "Unexpected color_transfer",
+    ),
+    Rule(
+        "color_primaries",
+        "video",
+        ("color_primaries",),
+        lambda color_primaries: color_primaries in COLORS,
+        f"in {COLORS}",
+        "Unexpected color_primaries",
+    ),
+    # Videos must be encoded at the same framerate as the source file.
+    # Motion interpolated videos (60FPS converted) are not allowed.
+    Rule(
+        "framerate",
+        "video",
+        ("avg_frame_rate",),
+        lambda avg_frame_rate: avg_frame_rate in FRAME_RATES,
+        f"in {FRAME_RATES}",
+        "Unexpected framerate",
+    ),
+    # Frame timestamps are checked beyond the average framerate.
+    # Matroska timestamps are rounded to the millisecond, so we allow for variance
+    Rule(
+        "constant_frame_rate",
+        "packets",
+        ("variable_interval_ratio",),
+        lambda ratio: ratio <= 0.01,
+        "<= 1% of frame intervals off the median by more than 2 ms",
+        "Variable frame rate",
+    ),
+    # Videos must have a keyframe at least every 10 seconds for seeking.
+    Rule(
+        "keyframe_interval",
+        "packets",
+        ("max_keyframe_interval",),
+        lambda interval: interval <= 10.0,
+        "max_keyframe_interval <= 10.0",
+        "Keyframe interval too long",
+    ),
+    # Videos must not have gaps between frame timestamps, such as dropped frames.
+    # A single long interval is tolerated, longer stalls are caught by packet_gaps
+    Rule(
+        "timestamp_gaps",
+        "packets",
+        ("frame_gap_ratio",),
+        lambda ratio: ratio <= 0.005,
+        "<= 0.5% of frame intervals over 1.5 times the median",
+        "Gaps between frame timestamps",
+    ),
+    # Motion interpolated videos are not allowed, whatever their framerate.
+    # Interpolated frames are blends of their neighbours, unlike held or native frames.
+    Rule(
+        "motion_interpolation",
+        "motion",
+        ("blend_ratio",),
+        lambda ratio: ratio <= 0.2,
+        "<= 20% of moving frames blended from their neighbours",
+        "Motion interpolated frames",
+    ),
+    # Files must have a Cues index for seeking.
+    Rule(
+        "cues",
+        "streaming",
+        ("cue_points",),
+        lambda cue_points: cue_points > 0,
+        "> 0 cue points",
+        "No Cues index",
+    ),
+    # The Cues index must be read before the first cluster, without a seek to the end.
+    Rule(
+        "cues_front",
+        "streaming",
+        ("cues_before_clusters",),
+        lambda front: front,
+        "Cues before the first Cluster",
+        "Cues index is not at the front of the file",
+    ),
+    # The SeekHead must index the Cues.
+    Rule(
+        "seek_head",
+        "streaming",
+        ("seek_head_cues",),
+        lambda indexed: indexed,
+        "a SeekHead entry for the Cues",
+        "Cues index is not in the SeekHead",
+    ),
+    # Clusters must be small enough to be fetched quickly.
+    Rule(
+        "cluster_size",
+        "streaming",
+        ("max_cluster_size",),
+        lambda size: size <= 5 * 1024 * 1024,
+        "<= 5 MiB",
+        "Oversized cluster",
+    ),
+    # Seek points must be at most 10 seconds apart.
+    Rule(
+        "cue_interval",
+        "streaming",
+        ("max_cue_interval",),
+        lambda interval: interval <= 10.0,
+        "max_cue_interval <= 10.0",
+        "Cue points too far apart",
+    ),
+    # Every frame of every stream must decode without errors.
+    Rule(
+        "decode_errors",
+        "integrity",
+        ("decode_error", "decode_error_time"),
+        lambda error, error_time: error is None,
+        "no decode errors",
+        "Corrupt frames",
+    ),
+    # Decoded frames must reach the duration of the file, or the upload was truncated.
+    # A decode that stopped at an error is already reported by decode_errors.
+    Rule(
+        "truncation",
+        "integrity",
+        ("decoded_duration", "duration", "decode_error"),
+        lambda decoded_duration, duration, error: error is not None
+        or decoded_duration >= duration - 0.5,
+        "decoded_duration >= duration - 0.5",
+        "Truncated file",
+    ),
+    # Audio must use the Opus format.
+    Rule(
+        "audio_codec",
+        "audio",
+        ("audio_codec",),
+        lambda codec: codec == "opus",
+        "== 'opus'",
+        "Incorrect audio codec",
+    ),
+    # Audio must be normalized as described by the AES Streaming Loudness Recommendation.
+    Rule(
+        "loudness_i",
+        "audio",
+        ("input_i",),
+        lambda input_i: -16.25 <= input_i <= -15.75,
+        "-16.25 <= input_i <= -15.75",
+        "Unexpected target loudness",
+    ),
+    Rule(
+        "loudness_tp",
+        "audio",
+        ("input_tp",),
+        lambda input_tp: input_tp <= -1.0,
+        "input_tp <= -1.0",
+        "Unexpected true peak",
+    ),
+    # If the source is a DVD or BD release with a source bitrate of >= 320 kbps,
+    # the audio stream must use a bitrate of 320 kbps.
+    # Otherwise, the audio stream must use a default bitrate of 192 kbps.
+    # Note: libopus defaults to VBR mode so we will allow for variance
+    Rule(
+        "audio_bitrate",
+        "audio",
+        ("audio_bit_rate",),
+        lambda bit_rate: 167000 <= bit_rate <= 217000 or 295000 <= bit_rate <= 345000,
+        "167000 <= bit_rate <= 217000 or 295000 <= bit_rate <= 345000",
+        "Unexpected audio bitrate",
+    ),
+    # Audio must use a sampling rate of 48k.
+    Rule(
+        "sample_rate",
+        "audio",
+        ("sample_rate",),
+        lambda sample_rate: sample_rate == 48000,
+        "== 48000",
+        "Incorrect sample rate",
+    ),
+    # Audio must use a two channel stereo mix.
+    Rule(
+        "channels",
+        "audio",
+        ("channels",),
+        lambda channels: channels == 2,
+        "== 2",
+        "Incorrect audio channels",
+    ),
+    Rule(
+        "layout",
+        "audio",
+        ("channel_layout",),
+        lambda channel_layout: channel_layout == "stereo",
+        "== 'stereo'",
+        "Incorrect audio layout",
+    ),
+]
+
+RULES_BY_NAME = {rule.name: rule for rule in RULES}
+
+
+# Compiled once per selection of groups, rules are then evaluated per file in a flat loop
+@functools.cache
+def compile_rules(groups):
+    """Get the rules of the test groups
+
+    :param groups: the values of the selected test groups
+    :type groups: tuple
+
+    :return: the rules of the groups, in the order of the groups
+    :rtype: tuple
+    """
+    return tuple(rule for group in groups for rule in RULES if rule.group == group)
+
+
+@functools.cache
+def rule_tiers(rules):
+    """Get the rules grouped by the cost of their sources of test data
+
+    :param rules: the compiled rules
+    :type rules: tuple
+
+    :return: the rules of each cost, cheapest first
+    :rtype: tuple
+    """
+    tiers = {}
+    for rule in rules:
+        tiers.setdefault(rule.cost, []).append(rule)
+    return tuple(tuple(tiers[cost]) for cost in sorted(tiers))
+
+
+def rule_sources(rules):
+    """Get the sources of test data read by the rules
+
+    :param rules: the rules
+    :type rules: tuple
+
+    :return: the names of the sources
+    :rtype: tuple
+    """
+    return tuple(dict.fromkeys(source for rule in rules for source in rule.sources))
+
+
+def extract_fact(webm_format, facts, name):
+    """Get the named fact of the file, extracting it on first use
+
+    :param webm_format: the file being tested
+    :type webm_format: WebmFormat
+
+    :param facts: the facts extracted so far, or the exceptions raised extracting them
+    :type facts: dict
+
+    :param name: the name of the fact
+    :type name: str
+
+    :return: the fact
+    :rtype: object
+    """
+    if name not in facts:
+        try:
+            facts[name] = FACTS[name].extract(webm_format)
+        except Exception as exc:  # pylint: disable=broad-except
+            facts[name] = exc
+
+    if isinstance(facts[name], Exception):
+        raise facts[name]
+
+    return facts[name]
+
+
+def evaluate_rule(rule, webm_format, facts):
+    """Evaluate the rule for the file
+
+    :param rule: the rule
+    :type rule: Rule
+
+    :param webm_format: the file being tested
+    :type webm_format: WebmFormat
+
+    :param facts: the facts extracted so far
+    :type facts: dict
+
+    :return: the result of the rule
+    :rtype: RuleResult
+    """
+    start = time.perf_counter()
+    try:
+        values = [extract_fact(webm_format, facts, fact) for fact in rule.facts]
+        value = rule.value(values)
+        passed = rule.predicate(*values)
+    except Exception as exc:  # pylint: disable=broad-except
+        return RuleResult(
+            rule, "error", message=repr(exc), elapsed=time.perf_counter() - start
+        )
+
+    return RuleResult(
+        rule,
+        "pass" if passed else "fail",
+        value,
+        None if passed else rule.describe_failure(value),
+        time.perf_counter() - start,
+    )
+
+
+# The caller loads the sources of each tier, with either driver, before it's evaluated
+class Evaluation:
+    """An evaluation of the rules for the file, in tiers of the cost of their sources
+
+    In fail-fast mode, the rules are evaluated cheapest first and the rules of the
+    tiers after a failure are skipped, so their sources are never loaded.
+    Otherwise the rules form a single tier.
+
+    :param rules: the compiled rules
+    :type rules: tuple
+
+    :param webm_format: the file being tested
+    :type webm_format: WebmFormat
+
+    :param fail_fast: whether to skip the rules of the tiers after a failure
+    :type fail_fast: bool
+    """
+
+    def __init__(self, rules, webm_format, fail_fast=False):
+        self.rules = rules
+        self.webm_format = webm_format
+        webm_format.expect_sources(rule_sources(rules))
+        self.tiers = rule_tiers(rules) if fail_fast else (rules,)
+        self.facts = {}
+        self.elapsed = 0.0
+        self._results = {}
+
+    def __iter__(self):
+        """Evaluate the tiers in order
+
+        :return: the names of the sources of each tier, which must be loaded when yielded
+        :rtype: iterator
+        """
+        for tier in self.tiers:
+            if self.failed:
+                for rule in tier:
+                    self._results[rule.name] = RuleResult(
+                        rule, "skip", message="Skipped after an earlier failure"
+                    )
+                continue
+
+            yield rule_sources(tier)
+
+            start = time.perf_counter()
+            with stage("evaluate"):
+                for rule in tier:
+                    self._results[rule.name] = evaluate_rule(
+                        rule, self.webm_format, self.facts
+                    )
+            self.elapsed += time.perf_counter() - start
+
+    @property
+    def failed(self):
+        """Whether a rule evaluated so far has failed or raised an error"""
+        return any(
+            result.status in ("fail", "error") for result in self._results.values()
+        )
+
+    @property
+    def results(self):
+        """The result of each rule evaluated or skipped so far, in the order of the rules"""
+        return [
+            self._results[rule.name]
+            for rule in self.rules
+            if rule.name in self._results
+        ]
@@ -0,0 +1,279 @@
+"""Verification of WebM(s) against the selected groups of tests"""
+
+import collections
+import concurrent.futures
+import contextlib
+import io
+import itertools
+import logging
+import time
+
+from ._ebml import EbmlError, is_ebml
+from ._http import is_url
+from ._process import get_limits, set_limits
+from ._profile import CURRENT, Profile
+from ._rules import Evaluation, compile_rules
+from ._webm_format import WebmFormat
+
+logger = logging.getLogger(__name__)
+
+# The progress mark of each rule status, as printed by unittest
+STATUS_MARKS = {"pass": ".", "fail": "F", "error": "E", "skip": "s"}
+
+
+# The report keeps the layout of unittest's text runner that the rules replaced
+def write_results(stream, results, elapsed):
+    """Write the results of the rules as a text report
+
+    :param stream: the stream the report is written to
+    :type stream: io.TextIOBase
+
+    :param results: the result of each rule
+    :type results: list
+
+    :param elapsed: the time spent evaluating the rules in seconds
+    :type elapsed: float
+    """
+    stream.write("".join(STATUS_MARKS[result.status] for result in results) + "\n")
+
+    for result in results:
+        if result.status in ("fail", "error"):
+            stream.write("=" * 70 + "\n")
+            stream.write(
+                f"{result.status.upper()}: {result.rule.name} ({result.rule.group})\n"
+            )
+            stream.write("-" * 70 + "\n")
+            stream.write(f"{result.message}\n\n")
+
+    # Skipped rules are listed without details, after the failure that skipped them
+    for result in results:
+        if result.status == "skip":
+            stream.write(
+                f"SKIP: {result.rule.name} ({result.rule.group}): {result.message}\n"
+            )
+
+    counts = collections.Counter(result.status for result in results)
+    stream.write("-" * 70 + "\n")
+    stream.write(f"Ran {len(results)} tests in {elapsed:.3f}s\n\n")
+
+    details = [
+        f"{label}={counts[status]}"
+        for status, label in (
+            ("fail", "failures"),
+            ("error", "errors"),
+            ("skip", "skipped"),
+        )
+        if counts[status]
+    ]
+    if counts["fail"] or counts["error"]:
+        stream.write(f"FAILED ({', '.join(details)})\n")
+    else:
+        stream.write(f"OK ({', '.join(details)})\n" if details else "OK\n")
+
+
+# Worker processes don't inherit the logging config, so we set it up for each file
+@contextlib.contextmanager
+def captured_logs(loglevel):
+    """Capture the log records of the root logger while verifying a file
+
+    :param loglevel: the name of the logging level
+    :type loglevel: str
+
+    :return: the stream the records are written to
+    :rtype: io.StringIO
+    """
+    report = io.StringIO()
+    handler = logging.StreamHandler(report)
+    handler.setFormatter(logging.Formatter("%(levelname)s: %(message)s"))
+
+    root = logging.getLogger()
+    root_handlers, root_level = root.handlers, root.level
+    root.handlers = [handler]
+    root.setLevel(logging.getLevelName(loglevel.upper()))
+    try:
+        yield report
+    finally:
+        root.handlers = root_handlers
+        root.setLevel(root_level)
+
+
+def evaluate_file(file, groups, format_options, fail_fast):
+    """Evaluate the rules of the selected groups of tests on the file
+
+    :param file: the file being tested
+    :type file: str
+
+    :param groups: the values of the selected test groups
+    :type groups: list
+
+    :param format_options: the keyword arguments of WebmFormat
+    :type format_options: dict
+
+    :param fail_fast: whether to skip costly tests once a cheaper test has failed
+    :type fail_fast: bool
+
+    :return: the evaluation of the rules
+    :rtype: Evaluation
+    """
+    # Remote files are only read once they're verified, not as arguments are parsed
+    if is_url(file) and not is_ebml(file):
+        raise EbmlError(f"File '{file}' is not an EBML file")
+
+    webm_format = WebmFormat(file, **format_options)
+    evaluation = Evaluation(compile_rules(tuple(groups)), webm_format, fail_fast)
+
+    # Only the sources read by the selected rules are loaded, tier by tier
+    logger.info("Running Tests...")
+    for sources in evaluation:
+        webm_format.prefetch(sources)
+
+    # dump formats and stream information on debug
+    if logging.root.isEnabledFor(logging.DEBUG):
+        webm_format.debug_dump()
+
+    return evaluation
+
+
+# Verify a single file, buffering the output so that it can be printed as one block
+def verify_file(file, groups, loglevel, format_options, fail_fast=False):
+    """Verify the file against the selected groups of tests
+
+    :param file: the file being tested
+    :type file: str
+
+    :param groups: the values of the selected test groups
+    :type groups: list
+
+    :param loglevel: the name of the logging level
+    :type loglevel: str
+
+    :param format_options: the keyword arguments of WebmFormat
+    :type format_options: dict
+
+    :param fail_fast: whether to skip costly tests once a cheaper test has failed
+    :type fail_fast: bool
+
+    :return: the file, the report of the file, whether all tests passed
+        and a record of the results of the rules, the time spent, the profile and any error
+    :rtype: tuple
+    """
+    record = {"results": [], "time": 0.0, "error": None}
+    profile = Profile()
+    profile_token = CURRENT.set(profile)
+    file_start = time.perf_counter()
+
+    with captured_logs(loglevel) as report:
+        try:
+            logger.info("Using file '%s'...", file)
+            evaluation = evaluate_file(file, groups, format_options, fail_fast)
+            write_results(report, evaluation.results, evaluation.elapsed)
+            record["results"] = [result.to_dict() for result in evaluation.results]
+            success = all(
+                result.status in ("pass", "skip") for result in evaluation.results
+            )
+        # A file that cannot be probed should not abort the rest of the batch
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.exception("Failed to verify file '%s'", file)
+            record["error"] = repr(exc)
+            success = False
+        finally:
+            CURRENT.reset(profile_token)
+
+    record["time"] = round(time.perf_counter() - file_start, 6)
+    record["profile"] = profile.to_dict()
+    return file, report.getvalue(), success, record
+
+
+def write_file(reporters, result):
+    """Write the result of a file to the reporters
+
+    :param reporters: the reporters the results of each file are written to
+    :type reporters: list
+
+    :param result: the result of verify_file
+    :type result: tuple
+
+    :return: whether all tests passed for the file
+    :rtype: bool
+    """
+    for reporter in reporters:
+        reporter.write_file(*result)
+    return result[2]
+
+
+# Verify files in a pool of worker processes, writing reports as files complete
+def verify_files(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+    files, groups, jobs, loglevel, format_options, reporters, fail_fast=False
+):
+    """Verify the files against the selected groups of tests
+
+    :param files: the files being tested
+    :type files: iterable
+
+    :param groups: the values of the selected test groups
+    :type groups: list
+
+    :param jobs: the number of files to verify in parallel
+    :type jobs: int
+
+    :param loglevel: the name of the logging level
+    :type loglevel: str
+
+    :param format_options: the keyword arguments of WebmFormat
+    :type format_options: dict
+
+    :param reporters: the reporters the results of each file are written to
+    :type reporters: list
+
+    :param fail_fast: whether to skip costly tests once a cheaper test has failed
+    :type fail_fast: bool
+
+    :return: whether all tests passed for all files
+    :rtype: bool
+    """
+    success = True
+
+    if jobs == 1:
+        results = (
+            verify_file(file, groups, loglevel, format_options, fail_fast)
+            for file in files
+        )
+        for result in results:
+            success = write_file(reporters, result) and success
+        return success
+
+    # Files are submitted as they are discovered, with a bounded number in flight
+    # Workers are given the resource limits of this process as they start
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=jobs, initializer=set_limits, initargs=(get_limits(),)
+    ) as executor:
+        files = iter(files)
+        pending = set()
+
+        try:
+            while True:
+                for file in itertools.islice(files, jobs * 2 - len(pending)):
+                    pending.add(
+                        executor.submit(
+                            verify_file,
+                            file,
+                            groups,
+                            loglevel,
+                            format_options,
+                            fail_fast,
+                        )
+                    )
+
+                if not pending:
+                    break
+
+                done, pending = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    success = write_file(reporters, future.result()) and success
+        except KeyboardInterrupt:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    return success
@@ -3,6 +3,10 @@
 from enum import Enum
 from ._test_audio import TestAudio
 from ._test_format import TestFormat
+from ._test_integrity import TestIntegrity
+from ._test_motion import TestMotion
+from ._test_packets import TestPackets
+from ._test_streaming import TestStreaming
 from ._test_video import TestVideo
 
 
@@ -10,15 +14,20 @@ from ._test_video import TestVideo
 class TestGroup(Enum):
     """An enumeration of test groups"""
 
-    def __new__(cls, value, test_class):
+    def __new__(cls, value, test_class, default=True):
         obj = object.__new__(cls)
         obj._value_ = value
         obj.test_class = test_class
+        obj.default = default
         return obj
 
     FORMAT = ("format", TestFormat)
     VIDEO = ("video", TestVideo)
     AUDIO = ("audio", TestAudio)
+    MOTION = ("motion", TestMotion, False)
+    PACKETS = ("packets", TestPackets, False)
+    STREAMING = ("streaming", TestStreaming, False)
+    INTEGRITY = ("integrity", TestIntegrity, False)
 
     @staticmethod
     def value_of(val):
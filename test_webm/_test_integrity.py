@@ -0,0 +1,18 @@
+"""A collection of tests to detect corrupt frames and truncation in the streams"""
+
+from ._test_webm import TestWebm
+
+
+class TestIntegrity(TestWebm):
+    """A collection of tests to detect corrupt frames and truncation in the streams"""
+
+    # Every frame of every stream must decode without errors.
+    # The whole file is decoded, so this group is only run when selected.
+    def test_decode_errors(self):
+        """Test if every stream decodes without errors"""
+        self.check_rule("decode_errors")
+
+    # Decoded frames must reach the duration of the file.
+    def test_truncation(self):
+        """Test if the decoded streams reach the duration of the file"""
+        self.check_rule("truncation")
@@ -0,0 +1,13 @@
+"""A collection of tests to detect motion interpolation in the video stream"""
+
+from ._test_webm import TestWebm
+
+
+class TestMotion(TestWebm):
+    """A collection of tests to detect motion interpolation in the video stream"""
+
+    # Motion interpolated videos (60FPS converted) are not allowed.
+    # Frames are decoded and compared, so this group is only run when selected.
+    def test_motion_interpolation(self):
+        """Test if the video stream has few frames blended from their neighbours"""
+        self.check_rule("motion_interpolation")
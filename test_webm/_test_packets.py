@@ -0,0 +1,38 @@
+"""A collection of tests to verify the packets of every stream of the file"""
+
+from ._test_webm import TestWebm
+
+
+class TestPackets(TestWebm):
+    """A collection of tests to verify the packets of every stream of the file"""
+
+    # Bitrate spikes stall playback even when the overall bitrate is within limits.
+    # Every packet of every stream is demuxed, so this group is only run when selected.
+    def test_peak_bitrate(self):
+        """Test if the peak one-second bitrate violates the restrictions"""
+        self.check_rule("peak_bitrate")
+
+    # Audio and video streams must have the same length.
+    def test_av_drift(self):
+        """Test if the audio and video durations differ"""
+        self.check_rule("av_drift")
+
+    # Streams must not have gaps that no packet covers.
+    def test_packet_gaps(self):
+        """Test if a stream has a gap between packets"""
+        self.check_rule("packet_gaps")
+
+    # Frame timestamps are checked beyond the average framerate.
+    def test_constant_frame_rate(self):
+        """Test if the frame intervals of the video stream are constant"""
+        self.check_rule("constant_frame_rate")
+
+    # Videos must have a keyframe at least every 10 seconds for seeking.
+    def test_keyframe_interval(self):
+        """Test if the longest interval between keyframes is at most 10 seconds"""
+        self.check_rule("keyframe_interval")
+
+    # Videos must not have gaps between frame timestamps, such as dropped frames.
+    def test_timestamp_gaps(self):
+        """Test if few frame intervals are far longer than the median frame interval"""
+        self.check_rule("timestamp_gaps")
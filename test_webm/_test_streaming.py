@@ -0,0 +1,33 @@
+"""A collection of tests to verify the file can be streamed and seeked quickly"""
+
+from ._test_webm import TestWebm
+
+
+class TestStreaming(TestWebm):
+    """A collection of tests to verify the file can be streamed and seeked quickly"""
+
+    # Files must have a Cues index for seeking.
+    # Element headers are read rather than packets, so this group is only run when selected.
+    def test_cues(self):
+        """Test if the file has a Cues index"""
+        self.check_rule("cues")
+
+    # The Cues index must be read before the first cluster, without a seek to the end.
+    def test_cues_front(self):
+        """Test if the Cues index is placed before the clusters"""
+        self.check_rule("cues_front")
+
+    # The SeekHead must index the Cues.
+    def test_seek_head(self):
+        """Test if the SeekHead indexes the Cues"""
+        self.check_rule("seek_head")
+
+    # Clusters must be small enough to be fetched quickly.
+    def test_cluster_size(self):
+        """Test if the largest cluster is at most 5 MiB"""
+        self.check_rule("cluster_size")
+
+    # Seek points must be at most 10 seconds apart.
+    def test_cue_interval(self):
+        """Test if the longest interval between cue points is at most 10 seconds"""
+        self.check_rule("cue_interval")
@@ -2,6 +2,8 @@
 
 from unittest import TestCase
 
+from ._rules import FACTS, RULES_BY_NAME
+
 
 class TestWebm(TestCase):
     """A collection of tests to verify the file against encoding standards
@@ -16,3 +18,15 @@ class TestWebm(TestCase):
     def __init__(self, testname, webm_format):
         super().__init__(testname)
         self.webm_format = webm_format
+
+    # The tests are a front end to the rule table, so both report the same results
+    def check_rule(self, name):
+        """Assert that the file satisfies the named rule
+
+        :param name: the name of the rule
+        :type name: str
+        """
+        rule = RULES_BY_NAME[name]
+        values = [FACTS[fact].extract(self.webm_format) for fact in rule.facts]
+        if not rule.predicate(*values):
+            self.fail(rule.describe_failure(rule.value(values)))
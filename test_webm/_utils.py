@@ -3,11 +3,74 @@
 import argparse
 import os
 
+from ._ebml import is_ebml
+from ._http import is_url, url_name
+
+
+# Remote files are read when they're verified, so an unreachable host fails its own files
+def url_arg_type(arg_value):
+    """Test if the remote file is named as a WebM"""
+    if not url_name(arg_value).endswith(".webm"):
+        raise argparse.ArgumentTypeError(f"File '{arg_value}' is not WebM")
+    return arg_value
+
 
 def file_arg_type(arg_value):
     """Test if the file is readable and is a WebM"""
+    if is_url(arg_value):
+        return url_arg_type(arg_value)
     if not os.access(arg_value, os.R_OK):
         raise argparse.ArgumentTypeError(f"File '{arg_value}' does not exist")
     if not arg_value.endswith(".webm"):
         raise argparse.ArgumentTypeError(f"File '{arg_value}' is not WebM")
+    if not is_ebml(arg_value):
+        raise argparse.ArgumentTypeError(f"File '{arg_value}' is not an EBML file")
     return arg_value
+
+
+def is_glob_pattern(path):
+    """Test if the path has the wildcards of a glob pattern"""
+    return any(char in path for char in "*?[")
+
+
+def path_arg_type(arg_value):
+    """Test if the path is a directory, a glob pattern or a readable WebM"""
+    if is_url(arg_value):
+        return url_arg_type(arg_value)
+    if is_glob_pattern(arg_value) or os.path.isdir(arg_value):
+        return arg_value
+    return file_arg_type(arg_value)
+
+
+def positive_int_arg_type(arg_value):
+    """Test if the value is a positive integer"""
+    try:
+        value = int(arg_value)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f"'{arg_value}' is not an integer") from exc
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"'{arg_value}' is not a positive integer")
+    return value
+
+
+def non_negative_float_arg_type(arg_value):
+    """Test if the value is a number that is not negative"""
+    try:
+        value = float(arg_value)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f"'{arg_value}' is not a number") from exc
+    if value < 0:
+        raise argparse.ArgumentTypeError(f"'{arg_value}' is not a non-negative number")
+    return value
+
+
+def stage_timeout_arg_type(arg_value):
+    """Test if the value is a stage name and a positive number of seconds"""
+    stage, _, seconds = arg_value.partition("=")
+    try:
+        timeout = float(seconds)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f"'{arg_value}' is not STAGE=SECONDS") from exc
+    if not stage or timeout <= 0:
+        raise argparse.ArgumentTypeError(f"'{arg_value}' is not STAGE=SECONDS")
+    return stage, timeout
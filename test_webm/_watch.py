@@ -0,0 +1,471 @@
+"""A long-running mode that verifies WebM(s) as they arrive in a directory"""
+
+import argparse
+import collections
+import concurrent.futures
+import ctypes
+import ctypes.util
+import functools
+import http.server
+import json
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+import urllib.parse
+
+from ._process import get_limits, set_limits
+from ._runner import verify_file
+from ._utils import file_arg_type
+
+logger = logging.getLogger(__name__)
+
+# inotify event masks, from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+
+
+class Inotify:
+    """Events of files written to, moved into or out of, or deleted from a directory,
+    using Linux inotify
+
+    :param directory: the directory being watched
+    :type directory: str
+    """
+
+    event_header = struct.Struct("iIII")
+
+    def __init__(self, directory):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.directory = directory
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        mask |= IN_MOVED_FROM | IN_DELETE
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), "inotify_add_watch failed")
+
+    # Falls back to polling on platforms without inotify
+    @staticmethod
+    def open(directory):
+        """Watch the directory with inotify, if available
+
+        :param directory: the directory being watched
+        :type directory: str
+
+        :return: the inotify watch, or None if inotify is not available
+        :rtype: Inotify
+        """
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            return Inotify(directory)
+        except (AttributeError, OSError) as exc:
+            logger.info("Polling for changes, inotify is not available: %s", exc)
+            return None
+
+    def read(self, timeout):
+        """Wait for events and get the paths of the changed files
+
+        :param timeout: the time to wait for events in seconds
+        :type timeout: float
+
+        :return: the paths of the changed files, or None if events were lost
+        :rtype: set
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+
+        data = os.read(self.fd, 65536)
+        paths = set()
+        pos = 0
+        while pos < len(data):
+            _, mask, _, length = self.event_header.unpack_from(data, pos)
+            pos += self.event_header.size
+            name = data[pos : pos + length].split(b"\0", 1)[0]
+            pos += length
+            if mask & IN_Q_OVERFLOW:
+                return None
+            if name:
+                paths.add(os.path.join(self.directory, os.fsdecode(name)))
+        return paths
+
+    def close(self):
+        """Stop watching the directory"""
+        os.close(self.fd)
+
+
+def scan_directory(directory):
+    """Get the size and modification time of the WebMs in the directory
+
+    :param directory: the directory being watched
+    :type directory: str
+
+    :return: the size and modification time of each WebM by path
+    :rtype: dict
+    """
+    files = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.endswith(".webm") and entry.is_file():
+                stat = entry.stat()
+                files[entry.path] = (stat.st_size, stat.st_mtime_ns)
+    return files
+
+
+class WatchService:  # pylint: disable=too-many-instance-attributes
+    """A warm pool of workers that verifies files and keeps their results
+
+    :param groups: the values of the selected test groups
+    :type groups: list
+
+    :param jobs: the number of files to verify in parallel
+    :type jobs: int
+
+    :param loglevel: the name of the logging level
+    :type loglevel: str
+
+    :param format_options: the keyword arguments of WebmFormat
+    :type format_options: dict
+
+    :param reporters: the reporters the results of each file are written to
+    :type reporters: list
+
+    :param max_results: the number of results that are kept
+    :type max_results: int
+
+    :param fail_fast: whether to skip costly tests once a cheaper test has failed
+    :type fail_fast: bool
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        groups,
+        jobs,
+        loglevel,
+        format_options,
+        reporters,
+        *,
+        max_results=10000,
+        fail_fast=False,
+    ):
+        self.groups = groups
+        self.loglevel = loglevel
+        self.format_options = format_options
+        self.reporters = reporters
+        self.max_results = max_results
+        self.fail_fast = fail_fast
+        self.results = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=jobs, initializer=set_limits, initargs=(get_limits(),)
+        )
+
+    def submit(self, path):
+        """Put the file on the work queue
+
+        :param path: the path of the file
+        :type path: str
+        """
+        with self.lock:
+            self.results[path] = {"path": path, "status": "queued"}
+            self.results.move_to_end(path)
+            while len(self.results) > self.max_results:
+                self.results.popitem(last=False)
+
+        future = self.executor.submit(
+            verify_file,
+            path,
+            self.groups,
+            self.loglevel,
+            self.format_options,
+            self.fail_fast,
+        )
+        future.add_done_callback(functools.partial(self.complete, path))
+
+    def complete(self, path, future):
+        """Store the result of a verified file and write its report
+
+        :param path: the path of the file
+        :type path: str
+
+        :param future: the future of the verification
+        :type future: concurrent.futures.Future
+        """
+        # Files dropped as the service shuts down have no result to store
+        if future.cancelled():
+            return
+
+        try:
+            _, report, success, record = future.result()
+            status = "passed" if success else "failed"
+        except Exception as exc:  # pylint: disable=broad-except
+            report, success, status = repr(exc) + "\n", False, "error"
+            record = {"results": [], "time": 0.0, "error": repr(exc)}
+
+        result = {
+            "path": path,
+            "status": status,
+            "report": report,
+            "results": record["results"],
+            "finished": time.time(),
+        }
+
+        with self.lock:
+            self.results[path] = result
+            for reporter in self.reporters:
+                reporter.write_file(path, report, success, record)
+
+    def result(self, path):
+        """Get the result of the file
+
+        :param path: the path of the file
+        :type path: str
+
+        :return: the result, or None if the file was not submitted
+        :rtype: dict
+        """
+        with self.lock:
+            return self.results.get(path)
+
+    def summary(self):
+        """Get the status of every kept result
+
+        :return: the path and status of each result
+        :rtype: list
+        """
+        with self.lock:
+            return [
+                {"path": path, "status": result["status"]}
+                for path, result in self.results.items()
+            ]
+
+    # Files being verified are waited for, so their reports are written before
+    # the reporters are closed
+    def shutdown(self):
+        """Stop the workers, dropping queued files"""
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+class WatchRequestHandler(http.server.BaseHTTPRequestHandler):
+    """Submit paths with POST /verify and fetch results with GET /results"""
+
+    service = None
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """Submit the path in the request body for verification"""
+        if urllib.parse.urlsplit(self.path).path != "/verify":
+            self.send_json(404, {"error": "Not found"})
+            return
+
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        try:
+            path = json.loads(body)["path"]
+        except (ValueError, TypeError, KeyError):
+            path = body.decode("utf-8").strip()
+
+        try:
+            path = file_arg_type(path)
+        except argparse.ArgumentTypeError as exc:
+            self.send_json(400, {"error": str(exc)})
+            return
+
+        self.service.submit(path)
+        self.send_json(202, {"path": path, "status": "queued"})
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Get the result of the path in the query, or the status of all results"""
+        url = urllib.parse.urlsplit(self.path)
+        if url.path != "/results":
+            self.send_json(404, {"error": "Not found"})
+            return
+
+        query = urllib.parse.parse_qs(url.query)
+        if "path" not in query:
+            self.send_json(200, self.service.summary())
+            return
+
+        result = self.service.result(query["path"][0])
+        if result is None:
+            self.send_json(404, {"error": "Not submitted"})
+        else:
+            self.send_json(200, result)
+
+    def send_json(self, status, body):
+        """Send a JSON response
+
+        :param status: the HTTP status code
+        :type status: int
+
+        :param body: the response body
+        :type body: object
+        """
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        logger.debug("%s: %s", self.address_string(), format % args)
+
+
+def serve(service, listen):
+    """Serve the HTTP endpoint in a background thread
+
+    :param service: the service that verifies files
+    :type service: WatchService
+
+    :param listen: the address to listen on, as [HOST:]PORT
+    :type listen: str
+
+    :return: the HTTP server
+    :rtype: http.server.ThreadingHTTPServer
+    """
+    host, _, port = listen.rpartition(":")
+    handler = type("Handler", (WatchRequestHandler,), {"service": service})
+    server = http.server.ThreadingHTTPServer((host or "127.0.0.1", int(port)), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info("Listening on http://%s:%s", *server.server_address[:2])
+    return server
+
+
+# Without inotify, the directory is polled for files that differ from their last verification
+def wait_for_changes(directory, inotify, verified, poll, pending):
+    """Wait for files in the directory to change
+
+    :param directory: the directory being watched
+    :type directory: str
+
+    :param inotify: the inotify watch of the directory, or None to poll it
+    :type inotify: Inotify
+
+    :param verified: the size and modification time of each verified file
+    :type verified: dict
+
+    :param poll: the interval in seconds between checks for changes
+    :type poll: float
+
+    :param pending: the files waiting to settle, which keep the wait to the poll interval
+    :type pending: dict
+
+    :return: the paths of the changed files
+    :rtype: set
+    """
+    if inotify is not None:
+        changed = inotify.read(poll if pending else None)
+        if changed is not None:
+            return changed
+    else:
+        time.sleep(poll)
+
+    # Files that are gone from a full scan are forgotten, as are deleted files
+    # in the watch loop, so that the verified files don't grow without bound
+    files = scan_directory(directory)
+    for path in verified.keys() - files.keys():
+        del verified[path]
+
+    return {path for path, key in files.items() if verified.get(path) != key}
+
+
+def settled_files(pending, now, settle):
+    """Get the pending files that have been unchanged for the settle time
+
+    Settled files and files that no longer exist are removed from the pending files.
+
+    :param pending: the size and modification time of each pending file,
+        and the time they were first seen
+    :type pending: dict
+
+    :param now: the current monotonic time in seconds
+    :type now: float
+
+    :param settle: the time in seconds that a file must be unchanged before it's verified
+    :type settle: float
+
+    :return: the path, size and modification time of each settled file
+    :rtype: list
+    """
+    settled = []
+    for path, (key, since) in list(pending.items()):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            del pending[path]
+            continue
+
+        current = (stat.st_size, stat.st_mtime_ns)
+        if current != key:
+            pending[path] = (current, now)
+        elif now - since >= settle:
+            del pending[path]
+            settled.append((path, current))
+    return settled
+
+
+# A file is verified once its size and modification time stop changing
+def watch(directory, service, settle=2.0, poll=1.0):
+    """Verify new or changed WebMs in the directory until interrupted
+
+    :param directory: the directory being watched
+    :type directory: str
+
+    :param service: the service that verifies files
+    :type service: WatchService
+
+    :param settle: the time in seconds that a file must be unchanged before it's verified
+    :type settle: float
+
+    :param poll: the interval in seconds between checks for changes
+    :type poll: float
+
+    :raises ValueError: if the settle time is negative or the interval isn't positive
+    """
+    if settle < 0:
+        raise ValueError(f"Settle time must not be negative, got {settle}")
+    if poll <= 0:
+        raise ValueError(f"Poll interval must be positive, got {poll}")
+
+    inotify = Inotify.open(directory)
+    verified = {}
+    pending = {}
+
+    logger.info("Watching directory '%s'...", directory)
+
+    # Files that exist on startup are verified as well
+    changed = set(scan_directory(directory))
+
+    try:
+        while True:
+            now = time.monotonic()
+
+            for path in changed:
+                if not path.endswith(".webm"):
+                    continue
+                if os.path.exists(path):
+                    pending.setdefault(path, (None, now))
+                else:
+                    verified.pop(path, None)
+
+            for path, current in settled_files(pending, now, settle):
+                if verified.get(path) != current:
+                    verified[path] = current
+                    service.submit(path)
+
+            changed = wait_for_changes(directory, inotify, verified, poll, pending)
+    finally:
+        if inotify is not None:
+            inotify.close()
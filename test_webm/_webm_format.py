@@ -1,17 +1,56 @@
 """The container format and stream information of the file being tested"""
 
+import asyncio
+import concurrent.futures
+import contextvars
+import functools
 import json
 import logging
-import os
 import re
-import subprocess
-
-
-class WebmFormat:
+import threading
+
+from ._cache import ProbeCache
+from ._ebml import EbmlError, read_webm_format
+from ._integrity import get_integrity_stats
+from ._layout import read_seek_points, read_stream_layout
+from ._loudness import get_ebur128_stats, get_segmented_ebur128_stats
+from ._motion import get_motion_stats, sample_windows
+from ._packets import (
+    BitrateProfile,
+    packet_profile_stats,
+    read_packet_scan,
+    video_packet_stats,
+)
+from ._plan import Call, Command, Gather, arun_plan, run_plan
+from ._process import worker_cpus
+
+logger = logging.getLogger(__name__)
+
+
+# Each source of test data is loaded by a method named in source_loaders
+class WebmFormat:  # pylint: disable=too-many-public-methods
     """The container format and stream information of the file being tested
 
     :param file: the file being tested
     :type file: str
+
+    :param cache: the path of the persistent cache of sources, if any
+    :type cache: str
+
+    :param cache_hash: whether cache entries are also keyed on a hash of the file contents
+    :type cache_hash: bool
+
+    :param loudness_engine: the engine that measures loudness stats
+    :type loudness_engine: str
+
+    :param probe: the reader of container format and stream information
+    :type probe: str
+
+    :param single_pass: whether audio packets and loudness are collected by a single FFmpeg run
+    :type single_pass: bool
+
+    :param motion_full: whether motion is measured over every frame rather than sampled
+    :type motion_full: bool
     """
 
     format_args = [
@@ -25,12 +64,376 @@ class WebmFormat:
         "-show_chapters",
     ]
 
-    def __init__(self, file):
-        self.webm_format = WebmFormat.get_webm_format(file)
-        self.audio_format = WebmFormat.get_audio_format(file)
-        self.loudness_stats = WebmFormat.get_loudness_stats(file)
-        self.video_index = WebmFormat.get_stream_index(self.webm_format, "video")
-        self.audio_index = WebmFormat.get_stream_index(self.webm_format, "audio")
+    # The name of the loader of each source of test data
+    source_loaders = {
+        "webm_format": "get_webm_format",
+        "audio_format": "get_audio_format",
+        "packet_scan": "get_packet_scan_sources",
+        "loudness_stats": "get_loudness_stats",
+        "motion_stats": "get_sampled_motion_stats",
+        "stream_layout": "get_stream_layout",
+        "decode_integrity": "get_decode_integrity",
+    }
+
+    # The name of the loader of container format and stream information for each probe
+    probes = {
+        "ffprobe": "get_webm_format",
+        "ebml": "get_ebml_webm_format",
+    }
+
+    # The name of the loader of loudness stats for each loudness engine
+    loudness_engines = {
+        "loudnorm": "get_loudness_stats",
+        "numpy": "get_numpy_loudness_stats",
+        "segmented": "get_segmented_loudness_stats",
+        "cross-check": "get_cross_checked_loudness_stats",
+    }
+
+    # The sources collected together by each combined loader, in order of precedence
+    # A combined loader is only used for a source when another of its sources is read
+    combined_sources = {
+        "single_pass": ("audio_format", "loudness_stats"),
+        "packet_scan": ("audio_format", "video_packets", "packet_profile"),
+    }
+
+    loudnorm_filter = (
+        "loudnorm=I=-16:LRA=20:TP=-1:dual_mono=true:linear=true:print_format=json"
+    )
+
+    # Differences between the loudness engines that are logged in cross-check mode
+    loudness_tolerances = {"input_i": 0.2, "input_tp": 0.2, "input_lra": 1.0}
+
+    # The options are keyword-only, as they're passed from the options of the run
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        file,
+        *,
+        cache=None,
+        cache_hash=False,
+        loudness_engine="loudnorm",
+        probe="ffprobe",
+        single_pass=False,
+        motion_full=False,
+    ):
+        self.file = file
+        self.cache = ProbeCache.open(cache, cache_hash) if cache else None
+        self._file_key = None
+        self._file_key_lock = threading.Lock()
+        self.source_loaders = dict(
+            WebmFormat.source_loaders,
+            webm_format=WebmFormat.probes[probe],
+            loudness_stats=WebmFormat.loudness_engines[loudness_engine],
+        )
+
+        # Motion is measured in sampled windows unless every frame is asked for
+        if motion_full:
+            self.source_loaders["motion_stats"] = "get_motion_stats"
+
+        # In single-pass mode, metadata is read from the headers rather than demuxed
+        if single_pass:
+            self.source_loaders.update(
+                webm_format=WebmFormat.probes["ebml"],
+                single_pass="get_single_pass_sources",
+            )
+        self.expected_sources = None
+        self._sources = {}
+        self._sources_lock = threading.Lock()
+
+    @property
+    def webm_format(self):
+        """The container format and stream information of the file"""
+        return self.get_source("webm_format")
+
+    @property
+    def audio_format(self):
+        """The size, duration and bitrate of the audio stream packets"""
+        return self.get_source("audio_format")
+
+    @property
+    def loudness_stats(self):
+        """The loudness stats of the file"""
+        return self.get_source("loudness_stats")
+
+    @property
+    def video_packets(self):
+        """The frame timing stats of the video packets of the file"""
+        return self.get_source("video_packets")
+
+    @property
+    def packet_profile(self):
+        """The peak bitrate, drift and gap stats of the packets of the file"""
+        return self.get_source("packet_profile")
+
+    @property
+    def stream_layout(self):
+        """The placement of the seek index and the sizes of the clusters of the file"""
+        return self.get_source("stream_layout")
+
+    @property
+    def decode_integrity(self):
+        """The first decode error of the streams of the file and the decoded duration"""
+        return self.get_source("decode_integrity")
+
+    @property
+    def motion_stats(self):
+        """The duplicate and blended frame stats of the video stream of the file"""
+        return self.get_source("motion_stats")
+
+    @functools.cached_property
+    def video_index(self):
+        """The index of the video stream"""
+        return WebmFormat.get_stream_index(self.webm_format, "video")
+
+    @functools.cached_property
+    def audio_index(self):
+        """The index of the audio stream"""
+        return WebmFormat.get_stream_index(self.webm_format, "audio")
+
+    # Sources are loaded once, on first use, by whichever thread asks for them first
+    def get_source(self, name):
+        """Get the named source of test data, loading it if needed
+
+        :param name: the name of the source
+        :type name: str
+
+        :return: the source of test data
+        :rtype: dict
+        """
+        while True:
+            future, owner = self.claim_source(name)
+
+            if owner:
+                try:
+                    future.set_result(self.load_source(name))
+                # The exception is raised to every caller of the source through the future
+                except Exception as exc:  # pylint: disable=broad-except
+                    future.set_exception(exc)
+                except BaseException:
+                    self.drop_source(name, future)
+                    raise
+
+            # A source dropped by its interrupted owner is loaded again by a waiter
+            try:
+                return future.result()
+            except concurrent.futures.CancelledError:
+                if not future.cancelled():
+                    raise
+
+    def claim_source(self, name):
+        """Get the future of the named source, claiming it if no caller has
+
+        :param name: the name of the source
+        :type name: str
+
+        :return: the future of the source, and whether the caller must load it
+        :rtype: tuple
+        """
+        with self._sources_lock:
+            future = self._sources.get(name)
+            owner = future is None
+            if owner:
+                future = self._sources[name] = concurrent.futures.Future()
+        return future, owner
+
+    # An owner that is interrupted or cancelled leaves the source unloaded, not pending
+    def drop_source(self, name, future):
+        """Drop the future of the named source, cancelling it for its waiters
+
+        :param name: the name of the source
+        :type name: str
+
+        :param future: the future of the source
+        :type future: concurrent.futures.Future
+        """
+        with self._sources_lock:
+            if self._sources.get(name) is future:
+                del self._sources[name]
+        future.cancel()
+
+    # Probe output is reused from the persistent cache while the file is unchanged
+    def plan_source(self, name):
+        """Plan the loading of the named source of test data from the cache or its loader
+
+        :param name: the name of the source
+        :type name: str
+
+        :return: the plan, which returns the source of test data
+        :rtype: generator
+        """
+        loader_name = self.source_loaders[name]
+
+        # The loader is part of the key, as engines may not produce identical results
+        cache_key = f"{name}:{loader_name}"
+
+        if self.cache is not None:
+            file_key = yield Call(self.get_file_key)
+            source = yield Call(self.cache.get, file_key, cache_key)
+            if source is not None:
+                logger.debug("Using cached source '%s'", cache_key)
+                return source
+
+        source = yield from getattr(WebmFormat, loader_name)(self.file)
+
+        if self.cache is not None:
+            yield Call(self.cache.put, file_key, cache_key, source)
+
+        return source
+
+    # The file is identified once, as a remote file costs a HEAD request
+    def get_file_key(self):
+        """Get the identity of the file that cache entries are keyed on
+
+        :return: the path, size, modification time, inode and digest of the file
+        :rtype: tuple
+        """
+        with self._file_key_lock:
+            if self._file_key is None:
+                self._file_key = self.cache.file_key(self.file)
+        return self._file_key
+
+    def expect_sources(self, names):
+        """Set the sources of test data that will be read, to choose their loaders
+
+        :param names: the names of the sources
+        :type names: iterable
+        """
+        self.expected_sources = frozenset(names)
+
+    def combined_source(self, name):
+        """Get the combined loader that collects the named source, if any
+
+        Without expected sources, every source of a combined loader is expected.
+
+        :param name: the name of the source
+        :type name: str
+
+        :return: the name of the combined loader, or None if the source has its own
+        :rtype: str
+        """
+        for combined, names in self.combined_sources.items():
+            if combined not in self.source_loaders or name not in names:
+                continue
+            if self.expected_sources is None or any(
+                other in self.expected_sources for other in names if other != name
+            ):
+                return combined
+        return None
+
+    def load_source(self, name):
+        """Load the named source of test data in this thread
+
+        :param name: the name of the source
+        :type name: str
+
+        :return: the source of test data
+        :rtype: dict
+        """
+        # Sources of a combined loader are split out of its combined result
+        combined = self.combined_source(name)
+        if combined is not None:
+            return self.get_source(combined)[name]
+
+        return run_plan(self.plan_source(name))
+
+    # Sources are shared with get_source, so either may load a source for the other
+    async def aget_source(self, name):
+        """Get the named source of test data without blocking the event loop
+
+        :param name: the name of the source
+        :type name: str
+
+        :return: the source of test data
+        :rtype: dict
+        """
+        while True:
+            future, owner = self.claim_source(name)
+
+            if owner:
+                try:
+                    future.set_result(await self.aload_source(name))
+                except Exception as exc:  # pylint: disable=broad-except
+                    future.set_exception(exc)
+                except BaseException:
+                    self.drop_source(name, future)
+                    raise
+
+            # Waiters are shielded, so that a cancelled waiter doesn't cancel the source,
+            # and a waiter of a source dropped by its cancelled owner loads it again
+            try:
+                return await asyncio.shield(asyncio.wrap_future(future))
+            except asyncio.CancelledError:
+                if not future.cancelled() or asyncio.current_task().cancelling():
+                    raise
+
+    async def aload_source(self, name):
+        """Load the named source of test data on the event loop
+
+        :param name: the name of the source
+        :type name: str
+
+        :return: the source of test data
+        :rtype: dict
+        """
+        combined = self.combined_source(name)
+        if combined is not None:
+            return (await self.aget_source(combined))[name]
+
+        return await arun_plan(self.plan_source(name))
+
+    # Test if a source has been loaded without loading it
+    def is_loaded(self, name):
+        """Test if the named source of test data has been loaded
+
+        :param name: the name of the source
+        :type name: str
+
+        :return: whether the source has been loaded successfully
+        :rtype: bool
+        """
+        future = self._sources.get(name)
+        return (
+            future is not None
+            and future.done()
+            and not future.cancelled()
+            and future.exception() is None
+        )
+
+    # The sources are independent of each other, so we run the probes concurrently
+    def prefetch(self, names):
+        """Load the named sources of test data concurrently
+
+        Errors are not raised here, but on first use of the source.
+
+        :param names: the names of the sources
+        :type names: iterable
+        """
+        names = [name for name in dict.fromkeys(names) if name not in self._sources]
+
+        if not names:
+            return
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(names)) as executor:
+            concurrent.futures.wait(
+                [
+                    executor.submit(
+                        contextvars.copy_context().run, self.get_source, name
+                    )
+                    for name in names
+                ]
+            )
+
+    async def aprefetch(self, names):
+        """Load the named sources of test data concurrently on the event loop
+
+        Errors are not raised here, but on first use of the source.
+
+        :param names: the names of the sources
+        :type names: iterable
+        """
+        await asyncio.gather(
+            *(self.aget_source(name) for name in dict.fromkeys(names)),
+            return_exceptions=True,
+        )
 
     # Source 1: WebM Streams/Formats
     @staticmethod
@@ -40,54 +443,150 @@ class WebmFormat:
         :param file: the file being tested
         :type file: str
 
-        :return: the container format and stream information of the file
-        :rtype: dict
+        :return: the plan, which returns the container format and stream information
+        :rtype: generator
         """
-        logging.info("Retrieving WebmM stream/format data...")
+        logger.info("Retrieving WebmM stream/format data...")
 
         webm_args = WebmFormat.format_args + [file]
-        webm_format = subprocess.check_output(webm_args).decode("utf-8")
-        return json.loads(webm_format)
+        webm_format = yield Command(webm_args, "ffprobe_format")
+        return json.loads(webm_format.stdout.decode("utf-8"))
 
-    # Source 2: Extracted audio stream, needed for verifying audio bitrate
+    # Source 1 (ebml probe): WebM Streams/Formats read from the headers without a subprocess
+    @staticmethod
+    def get_ebml_webm_format(file):
+        """Get the container format and stream information of the file from its headers
+
+        Files that the EBML reader can't decode fall back to FFprobe.
+
+        :param file: the file being tested
+        :type file: str
+
+        :return: the plan, which returns the container format and stream information
+        :rtype: generator
+        """
+        logger.info("Reading WebM headers...")
+
+        try:
+            return (yield Call(read_webm_format, file, stage="ebml_format"))
+        except EbmlError as exc:
+            logger.info("Falling back to FFprobe: %s", exc)
+            return (yield from WebmFormat.get_webm_format(file))
+
+    # Source 2: Audio packets, needed for verifying audio bitrate
+    # Only the audio stream is demuxed when no other packet data is read
     @staticmethod
     def get_audio_format(file):
-        """Get the container format and stream information of the extracted audio
+        """Get the audio packet totals of the file
 
         :param file: the file being tested
         :type file: str
 
-        :return: the container format and stream information of the extracted audio
-        :rtype: dict
+        :return: the plan, which returns the size, duration and bitrate of the packets
+        :rtype: generator
         """
-        logging.info("Retrieving extracted audio stream/format data...")
+        logger.info("Retrieving audio packet data...")
 
-        ogg_file = f"{file}.ogg"
+        scan = yield from read_packet_scan(file, "a:0")
+        return (scan.stream("audio") or BitrateProfile()).audio_format()
 
-        ogg_args = [
-            "ffmpeg",
-            "-v",
-            "quiet",
-            "-i",
-            file,
-            "-vn",
-            "-acodec",
-            "copy",
-            "-f",
-            "ogg",
-            "-y",
-            ogg_file,
-        ]
+    # Sources 2, 4 and 6: Packets of every stream, read in one demux of the file,
+    # needed for verifying audio bitrate, frame timing, bitrate spikes and A/V drift
+    # The bitrate is measured from the demuxed packet sizes, so no remux is written to disk
+    @staticmethod
+    def get_packet_scan_sources(file):
+        """Get the audio packet totals, frame timing and packet profile stats of the file
 
-        subprocess.call(ogg_args)
+        :param file: the file being tested
+        :type file: str
+
+        :return: the plan, which returns the audio_format, video_packets and
+            packet_profile sources
+        :rtype: generator
+        """
+        logger.info("Retrieving packet data of every stream...")
 
-        audio_args = WebmFormat.format_args + [ogg_file]
-        audio_format = subprocess.check_output(audio_args).decode("utf-8")
-        audio_format = json.loads(audio_format)
+        scan = yield from read_packet_scan(file)
 
-        os.remove(ogg_file)
+        return {
+            "audio_format": (scan.stream("audio") or BitrateProfile()).audio_format(),
+            "video_packets": video_packet_stats(scan.video_columns()),
+            "packet_profile": packet_profile_stats(scan),
+        }
 
-        return audio_format
+    # Source 5: Motion stats, needed for detecting motion interpolation
+    @staticmethod
+    def get_motion_stats(file):
+        """Get the duplicate and blended frame stats of every frame of the video stream
+
+        :param file: the file being tested
+        :type file: str
+
+        :return: the plan, which returns the motion stats of the video stream
+        :rtype: generator
+        """
+        return (yield from get_motion_stats(file))
+
+    # Source 5 (sampled): Windows spread over the file are decoded rather than every frame
+    @staticmethod
+    def get_sampled_motion_stats(file):
+        """Get the duplicate and blended frame stats of windows of the video stream
+
+        :param file: the file being tested
+        :type file: str
+
+        :return: the plan, which returns the motion stats of the video stream
+        :rtype: generator
+        """
+        webm_format = yield from WebmFormat.get_ebml_webm_format(file)
+        windows = sample_windows(float(webm_format["format"]["duration"]))
+        return (yield from get_motion_stats(file, windows))
+
+    # Source 7: Seek index and cluster layout, needed for verifying streaming readiness
+    @staticmethod
+    def get_stream_layout(file):
+        """Get the placement of the seek index and the sizes of the clusters of the file
+
+        :param file: the file being tested
+        :type file: str
+
+        :return: the plan, which returns the stream layout stats
+        :rtype: generator
+        """
+        logger.info("Reading WebM cluster layout...")
+
+        return (yield Call(read_stream_layout, file, stage="ebml_layout"))
+
+    # Source 8: Full decode of every stream, needed for detecting corrupt and truncated files
+    @staticmethod
+    def get_decode_integrity(file):
+        """Get the first decode error of the streams of the file and the decoded duration
+
+        Files without a readable Cues index are decoded in a single segment.
+
+        :param file: the file being tested
+        :type file: str
+
+        :return: the plan, which returns the decode integrity stats
+        :rtype: generator
+        """
+        webm_format = yield from WebmFormat.get_ebml_webm_format(file)
+
+        try:
+            seek_points = yield Call(read_seek_points, file, stage="ebml_layout")
+        except EbmlError as exc:
+            logger.info("Decoding without segments: %s", exc)
+            seek_points = []
+
+        return (
+            yield from get_integrity_stats(
+                file,
+                [stream["codec_type"] for stream in webm_format["streams"]],
+                float(webm_format["format"]["duration"]),
+                seek_points,
+                worker_cpus(),
+            )
+        )
 
     # Source 3: Loudness stats
     # Implementation: https://gist.github.com/SoThatsPrettyBrutal/85cbbfc42fea03c6954d08db28c2626b
@@ -98,10 +597,10 @@ class WebmFormat:
         :param file: the file being tested
         :type file: str
 
-        :return: the loudness stats of the file
-        :rtype: dict
+        :return: the plan, which returns the loudness stats of the file
+        :rtype: generator
         """
-        logging.info("Retrieving loudness data...")
+        logger.info("Retrieving loudness data...")
 
         loudness_args = [
             "ffmpeg",
@@ -113,21 +612,143 @@ class WebmFormat:
             "-sn",
             "-dn",
             "-af",
-            "loudnorm=I=-16:LRA=20:TP=-1:dual_mono=true:linear=true:print_format=json",
+            WebmFormat.loudnorm_filter,
             "-f",
             "null",
             "NUL",
         ]
 
-        loudness_output = (
-            subprocess.check_output(loudness_args, stderr=subprocess.STDOUT)
-            .decode("utf-8")
-            .strip()
+        loudness_output = yield Command(
+            loudness_args, "ffmpeg_loudnorm", stderr="merge"
         )
+        return WebmFormat.parse_loudnorm_stats(loudness_output.stdout.decode("utf-8"))
+
+    # The loudnorm filter prints its stats as the last JSON object of the log
+    @staticmethod
+    def parse_loudnorm_stats(output):
+        """Get the loudness stats printed by the loudnorm filter
+
+        :param output: the log output of FFmpeg
+        :type output: str
 
-        loudness_stats = re.search(r"\{[^}]*\}", loudness_output, re.DOTALL)
+        :return: the loudness stats
+        :rtype: dict
+        """
+        loudness_stats = re.search(r"\{[^}]*\}", output.strip(), re.DOTALL)
         return json.loads(loudness_stats.group(0))
 
+    # Sources 2 and 3 (single pass): one demux of the file feeds two outputs,
+    # a stream copy of the audio packets to framecrc and a decode through loudnorm
+    @staticmethod
+    def get_single_pass_sources(file):
+        """Get the audio packet totals and loudness stats of the file from one FFmpeg run
+
+        :param file: the file being tested
+        :type file: str
+
+        :return: the plan, which returns the audio_format and loudness_stats sources
+        :rtype: generator
+        """
+        logger.info("Retrieving audio packet and loudness data in a single pass...")
+
+        single_pass_args = [
+            "ffmpeg",
+            "-nostdin",
+            "-hide_banner",
+            "-nostats",
+            "-i",
+            file,
+            "-map",
+            "0:a:0",
+            "-c",
+            "copy",
+            "-f",
+            "framecrc",
+            "pipe:1",
+            "-map",
+            "0:a:0",
+            "-af",
+            WebmFormat.loudnorm_filter,
+            "-f",
+            "null",
+            "-",
+        ]
+
+        # The log is captured separately, as the output is read as it's written
+        packets = BitrateProfile()
+        single_pass = yield Command(
+            single_pass_args,
+            "ffmpeg_single_pass",
+            consume=packets.add_framecrc,
+            stderr="capture",
+        )
+
+        return {
+            "audio_format": packets.audio_format(),
+            "loudness_stats": WebmFormat.parse_loudnorm_stats(
+                single_pass.stderr.decode("utf-8", "replace")
+            ),
+        }
+
+    # Source 3 (numpy engine): Loudness stats measured in-process from a PCM decode
+    @staticmethod
+    def get_numpy_loudness_stats(file):
+        """Get the loudness stats of the file with the in-process EBU R128 meter
+
+        :param file: the file being tested
+        :type file: str
+
+        :return: the plan, which returns the loudness stats of the file
+        :rtype: generator
+        """
+        return (yield from get_ebur128_stats(file))
+
+    # Source 3 (segmented engine): Loudness stats of parallel segments of long files
+    @staticmethod
+    def get_segmented_loudness_stats(file):
+        """Get the loudness stats of the file with the in-process meter, one segment per CPU
+
+        :param file: the file being tested
+        :type file: str
+
+        :return: the plan, which returns the loudness stats of the file
+        :rtype: generator
+        """
+        webm_format = yield from WebmFormat.get_ebml_webm_format(file)
+        duration = float(webm_format["format"]["duration"])
+        return (yield from get_segmented_ebur128_stats(file, duration))
+
+    # Source 3 (cross-check engine): Loudness stats of loudnorm, compared to the numpy engine
+    @staticmethod
+    def get_cross_checked_loudness_stats(file):
+        """Get the loudness stats of the file, logging differences between the engines
+
+        :param file: the file being tested
+        :type file: str
+
+        :return: the plan, which returns the loudness stats of the file from loudnorm
+        :rtype: generator
+        """
+        loudnorm_stats, numpy_stats = yield Gather(
+            [
+                WebmFormat.get_loudness_stats(file),
+                WebmFormat.get_numpy_loudness_stats(file),
+            ]
+        )
+
+        for entry, tolerance in WebmFormat.loudness_tolerances.items():
+            difference = abs(float(loudnorm_stats[entry]) - float(numpy_stats[entry]))
+            log_level = logging.WARNING if difference > tolerance else logging.INFO
+            logger.log(
+                log_level,
+                "Loudness cross-check %s: loudnorm '%s', numpy '%s'",
+                entry,
+                loudnorm_stats[entry],
+                numpy_stats[entry],
+            )
+
+        return loudnorm_stats
+
     # We expect video at index 0 and audio at index 1,
     # but we still want to inspect streams regardless
     @staticmethod
@@ -195,63 +816,110 @@ class WebmFormat:
 
     # Dump test data
     def debug_dump(self):
+        """Log container format and stream information of the file for debugging
+
+        Only the sources that have been loaded are dumped, so no probe runs for logging.
+        """
+        logger.debug("Dumping test data...")
+
+        if self.is_loaded("webm_format"):
+            self.debug_dump_webm_format()
+
+        if self.is_loaded("loudness_stats"):
+            self.debug_dump_loudness_stats()
+
+        if self.is_loaded("audio_format"):
+            self.debug_dump_audio_format()
+
+        if self.is_loaded("video_packets"):
+            self.debug_dump_video_packets()
+
+        if self.is_loaded("motion_stats"):
+            self.debug_dump_motion_stats()
+
+        if self.is_loaded("packet_profile"):
+            self.debug_dump_packet_profile()
+
+        if self.is_loaded("stream_layout"):
+            self.debug_dump_stream_layout()
+
+        if self.is_loaded("decode_integrity"):
+            self.debug_dump_decode_integrity()
+
+    # Dump container format and stream information
+    def debug_dump_webm_format(self):
         """Log container format and stream information of the file for debugging"""
-        logging.debug("Dumping test data...")
-        logging.debug("video_index: '%s'", self.video_index)
-        logging.debug("audio_index: '%s'", self.audio_index)
-        logging.debug(
+        logger.debug("video_index: '%s'", self.video_index)
+        logger.debug("audio_index: '%s'", self.audio_index)
+        logger.debug(
             "webm_format[streams][0][codec_type]: '%s'",
             self.webm_format["streams"][0]["codec_type"],
         )
-        logging.debug(
+        logger.debug(
             "webm_format[streams][1][codec_type]: '%s'",
             self.webm_format["streams"][1]["codec_type"],
         )
-        logging.debug(
+        logger.debug(
             "len(webm_format[streams]): '%s'", len(self.webm_format["streams"])
         )
-        logging.debug(
+        logger.debug(
             "webm_format[format][format_name]: '%s'",
             self.webm_format["format"]["format_name"],
         )
-        logging.debug(
+        logger.debug(
             "webm_format[format][bit_rate]): '%s'",
             self.webm_format["format"]["bit_rate"],
         )
-        logging.debug(
+        logger.debug(
             "webm_format[streams][video_index][height]: '%s'",
             self.webm_format["streams"][self.video_index]["height"],
         )
-        logging.debug("webm_format[chapters]: '%s'", self.webm_format["chapters"])
-        logging.debug(
+        logger.debug("webm_format[chapters]: '%s'", self.webm_format["chapters"])
+        logger.debug(
             "webm_format[streams][video_index][codec_name]: '%s'",
             self.webm_format["streams"][self.video_index]["codec_name"],
         )
-        logging.debug(
+        logger.debug(
             "webm_format[streams][video_index][pix_fmt]: '%s'",
             self.webm_format["streams"][self.video_index]["pix_fmt"],
         )
-        logging.debug(
+        logger.debug(
             "webm_format[streams][video_index].get(color_space): '%s'",
             self.webm_format["streams"][self.video_index].get("color_space"),
         )
-        logging.debug(
+        logger.debug(
             "webm_format[streams][video_index].get(color_transfer): '%s'",
             self.webm_format["streams"][self.video_index].get("color_transfer"),
         )
-        logging.debug(
+        logger.debug(
             "webm_format[streams][video_index].get(color_primaries): '%s'",
             self.webm_format["streams"][self.video_index].get("color_primaries"),
         )
-        logging.debug(
+        logger.debug(
             "webm_format[streams][video_index][avg_frame_rate]: '%s'",
             self.webm_format["streams"][self.video_index]["avg_frame_rate"],
         )
-        logging.debug(
+        logger.debug(
             "webm_format[streams][audio_index][codec_name]: '%s'",
             self.webm_format["streams"][self.audio_index]["codec_name"],
         )
-        logging.debug(
+        logger.debug(
+            "webm_format[streams][audio_index][sample_rate]: '%s'",
+            self.webm_format["streams"][self.audio_index]["sample_rate"],
+        )
+        logger.debug(
+            "webm_format[streams][audio_index][channels]: '%s'",
+            self.webm_format["streams"][self.audio_index]["channels"],
+        )
+        logger.debug(
+            "webm_format[streams][audio_index][channel_layout]: '%s'",
+            self.webm_format["streams"][self.audio_index]["channel_layout"],
+        )
+
+    # Dump loudness stats
+    def debug_dump_loudness_stats(self):
+        """Log loudness stats of the file for debugging"""
+        logger.debug(
             "[loudness_stats] input_i: '%s', "
             "input_lra: '%s', "
             "input_tp: '%s', "
@@ -263,19 +931,41 @@ class WebmFormat:
             self.loudness_stats["input_thresh"],
             self.loudness_stats["target_offset"],
         )
-        logging.debug(
+
+    # Dump audio packet data
+    def debug_dump_audio_format(self):
+        """Log audio stream packet data of the file for debugging"""
+        logger.debug(
             "audio_format[format][bitrate]: '%s'",
             self.audio_format["format"]["bit_rate"],
         )
-        logging.debug(
-            "webm_format[streams][audio_index][sample_rate]: '%s'",
-            self.webm_format["streams"][self.audio_index]["sample_rate"],
-        )
-        logging.debug(
-            "webm_format[streams][audio_index][channels]: '%s'",
-            self.webm_format["streams"][self.audio_index]["channels"],
-        )
-        logging.debug(
-            "webm_format[streams][audio_index][channel_layout]: '%s'",
-            self.webm_format["streams"][self.audio_index]["channel_layout"],
-        )
+
+    # Dump frame timing stats
+    def debug_dump_video_packets(self):
+        """Log frame timing stats of the video packets for debugging"""
+        for entry, value in self.video_packets.items():
+            logger.debug("video_packets[%s]: '%s'", entry, value)
+
+    # Dump motion stats
+    def debug_dump_motion_stats(self):
+        """Log duplicate and blended frame stats of the video stream for debugging"""
+        for entry, value in self.motion_stats.items():
+            logger.debug("motion_stats[%s]: '%s'", entry, value)
+
+    # Dump packet profile stats
+    def debug_dump_packet_profile(self):
+        """Log peak bitrate, drift and gap stats of the packets for debugging"""
+        for entry, value in self.packet_profile.items():
+            logger.debug("packet_profile[%s]: '%s'", entry, value)
+
+    # Dump stream layout stats
+    def debug_dump_stream_layout(self):
+        """Log seek index and cluster layout stats of the file for debugging"""
+        for entry, value in self.stream_layout.items():
+            logger.debug("stream_layout[%s]: '%s'", entry, value)
+
+    # Dump decode integrity stats
+    def debug_dump_decode_integrity(self):
+        """Log decode error and decoded duration stats of the streams for debugging"""
+        for entry, value in self.decode_integrity.items():
+            logger.debug("decode_integrity[%s]: '%s'", entry, value)
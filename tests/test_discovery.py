@@ -0,0 +1,180 @@
+"""Tests of the lazy discovery of the WebMs to verify"""
+
+import argparse
+import io
+import os
+import tempfile
+import unittest
+
+from test_webm._discovery import discover_files, read_paths, scan_directory
+from test_webm._utils import path_arg_type
+
+# The start of a WebM, enough for it to be recognized as an EBML file
+EBML_MAGIC = b"\x1a\x45\xdf\xa3"
+
+
+class TestDiscovery(unittest.TestCase):
+    """Tests of the discovery of WebMs in directories, glob patterns and lists"""
+
+    def setUp(self):
+        # pylint: disable-next=consider-using-with
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+        for path in (
+            "Show-OP1.webm",
+            "Show-ED1.webm",
+            "notes.txt",
+            os.path.join("Season 2", "Show-OP2.webm"),
+            os.path.join("Season 2", "Extras", "Show-OP2-NCBD.webm"),
+            os.path.join("Season 2", "Extras", "Show-OP2.mkv"),
+        ):
+            path = self.path(path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(EBML_MAGIC)
+
+    def path(self, *names):
+        """Get the path of a file of the temporary directory"""
+        return os.path.join(self.directory.name, *names)
+
+    def test_scan_directory(self):
+        """Test if only the WebMs of the directory itself are found"""
+        self.assertEqual(
+            sorted(scan_directory(self.directory.name)),
+            [self.path("Show-ED1.webm"), self.path("Show-OP1.webm")],
+        )
+
+    def test_scan_directory_recursive(self):
+        """Test if the WebMs of every subdirectory are found"""
+        # Links to directories are not followed, so a loop is scanned once
+        os.symlink(self.directory.name, self.path("Season 2", "Extras", "Loop"))
+
+        self.assertEqual(
+            sorted(scan_directory(self.directory.name, recursive=True)),
+            [
+                self.path("Season 2", "Extras", "Show-OP2-NCBD.webm"),
+                self.path("Season 2", "Show-OP2.webm"),
+                self.path("Show-ED1.webm"),
+                self.path("Show-OP1.webm"),
+            ],
+        )
+
+    def test_scan_missing_directory(self):
+        """Test if a directory that can't be scanned is logged"""
+        with self.assertLogs("test_webm._discovery", "ERROR"):
+            self.assertEqual(list(scan_directory(self.path("Season 3"))), [])
+
+    def test_glob(self):
+        """Test if glob patterns match WebMs and the WebMs of directories"""
+        self.assertEqual(
+            sorted(discover_files([self.path("Show-*")])),
+            [self.path("Show-ED1.webm"), self.path("Show-OP1.webm")],
+        )
+        self.assertEqual(
+            list(discover_files([self.path("Season ?")])),
+            [self.path("Season 2", "Show-OP2.webm")],
+        )
+
+    def test_glob_recursive(self):
+        """Test if '**' matches any number of directories when recursive"""
+        pattern = self.path("**", "Show-OP*.webm")
+        self.assertEqual(
+            sorted(discover_files([pattern])),
+            [self.path("Season 2", "Show-OP2.webm")],
+        )
+        self.assertEqual(
+            sorted(discover_files([pattern], recursive=True)),
+            [
+                self.path("Season 2", "Extras", "Show-OP2-NCBD.webm"),
+                self.path("Season 2", "Show-OP2.webm"),
+                self.path("Show-OP1.webm"),
+            ],
+        )
+
+    def test_url(self):
+        """Test if URLs are passed through, even if they look like glob patterns"""
+        url = "https://example.com/Show-OP1.webm?token=[a]*"
+        self.assertEqual(list(discover_files([url])), [url])
+
+    def test_from_file(self):
+        """Test if the listed paths follow the arguments, skipping invalid paths"""
+        from_file = self.path("files.txt")
+        with open(from_file, "wb") as f:
+            f.write(
+                b"\n".join(
+                    os.fsencode(path)
+                    for path in (
+                        self.path("Season 2", "Show-OP2.webm"),
+                        self.path("Show-OP3.webm"),
+                        self.path("Season 2", "Extras", "Show-OP2.mkv"),
+                    )
+                )
+            )
+
+        with self.assertLogs("test_webm._discovery", "ERROR") as logs:
+            files = list(
+                discover_files([self.path("Show-OP1.webm")], from_file=from_file)
+            )
+
+        self.assertEqual(
+            files,
+            [self.path("Show-OP1.webm"), self.path("Season 2", "Show-OP2.webm")],
+        )
+        self.assertEqual(len(logs.records), 2)
+        self.assertIn("does not exist", logs.records[0].getMessage())
+        self.assertIn("is not WebM", logs.records[1].getMessage())
+
+    def test_invalid_argument(self):
+        """Test if an invalid path given as an argument is a usage error"""
+        with self.assertRaises(argparse.ArgumentTypeError):
+            path_arg_type(self.path("Show-OP3.webm"))
+        with self.assertRaises(argparse.ArgumentTypeError):
+            path_arg_type(self.path("Season 2", "Extras", "Show-OP2.mkv"))
+
+
+class TestReadPaths(unittest.TestCase):
+    """Tests of the lists of paths separated by NUL or newline characters"""
+
+    def test_newline(self):
+        """Test if paths are split on newlines, with Windows line endings and blanks"""
+        stream = io.BytesIO(b"Show-OP1.webm\r\n\nSeason 2/Show-OP2.webm\nShow-ED1.webm")
+        self.assertEqual(
+            list(read_paths(stream)),
+            ["Show-OP1.webm", "Season 2/Show-OP2.webm", "Show-ED1.webm"],
+        )
+
+    def test_nul(self):
+        """Test if paths are split on NUL characters, keeping newlines in names"""
+        stream = io.BytesIO(b"Show-OP1.webm\0Show\nOP2.webm\0\0Show-ED1.webm\0")
+        self.assertEqual(
+            list(read_paths(stream)),
+            ["Show-OP1.webm", "Show\nOP2.webm", "Show-ED1.webm"],
+        )
+
+    def test_chunks(self):
+        """Test if paths split across chunks are joined"""
+        stream = io.BytesIO(b"OP1.webm\nSeason 2/Show-OP2.webm\n")
+        self.assertEqual(
+            list(read_paths(stream, chunk_size=4)),
+            ["OP1.webm", "Season 2/Show-OP2.webm"],
+        )
+
+    def test_separator(self):
+        """Test if the separator is chosen from the first chunk"""
+        stream = io.BytesIO(b"OP.webm\0Season 2/Show-OP2.webm\0")
+        self.assertEqual(
+            list(read_paths(stream, chunk_size=8)),
+            ["OP.webm", "Season 2/Show-OP2.webm"],
+        )
+
+        # A NUL after the first chunk is part of a newline separated path
+        stream = io.BytesIO(b"Show-OP1.webm\nOP\0.webm\n")
+        self.assertEqual(
+            list(read_paths(stream, chunk_size=8)), ["Show-OP1.webm", "OP\0.webm"]
+        )
+
+    def test_undecodable(self):
+        """Test if paths that aren't UTF-8 are kept as the file system names them"""
+        stream = io.BytesIO(b"Show-\xff.webm\n")
+        self.assertEqual(list(read_paths(stream)), [os.fsdecode(b"Show-\xff.webm")])
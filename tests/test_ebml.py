@@ -0,0 +1,527 @@
+"""Tests of the EBML header reader against synthetic files and FFprobe"""
+
+import json
+import os
+import shutil
+import struct
+import subprocess
+import tempfile
+import unittest
+
+from test_webm import _ebml as ebml
+from test_webm._ebml import (
+    EbmlError,
+    av_reduce,
+    read_vint,
+    read_webm_format,
+    vp9_color_config,
+)
+
+# The size of an element whose size is unknown, as written by live muxers
+UNKNOWN_SIZE = b"\x01\xff\xff\xff\xff\xff\xff\xff"
+
+
+def vint(value):
+    """Encode a variable length integer in the fewest bytes"""
+    length = 1
+    while value >= (1 << (7 * length)) - 1:
+        length += 1
+    return ((1 << (7 * length)) | value).to_bytes(length, "big")
+
+
+def element(element_id, *payloads, size=None):
+    """Encode an element, with its ID, size and the concatenated payloads"""
+    data = b"".join(payloads)
+    id_bytes = element_id.to_bytes((element_id.bit_length() + 7) // 8, "big")
+    return id_bytes + (vint(len(data)) if size is None else size) + data
+
+
+def uint(element_id, value):
+    """Encode an unsigned integer element"""
+    return element(element_id, value.to_bytes(max((value.bit_length() + 7) // 8, 1)))
+
+
+def string(element_id, value):
+    """Encode a string element"""
+    return element(element_id, value.encode("utf-8"))
+
+
+def double(element_id, value):
+    """Encode a float element"""
+    return element(element_id, struct.pack(">d", value))
+
+
+def vp9_keyframe(profile=0, bit_depth=8, color_space=2, color_range=0, sub=(1, 1)):
+    """Encode the uncompressed header of a VP9 keyframe, up to its color config"""
+    bits = "10" + str(profile & 1) + str(profile >> 1) + ("0" if profile == 3 else "")
+    bits += "0" + "0" + "1" + "0" + f"{0x498342:024b}"
+    if profile >= 2:
+        bits += "1" if bit_depth == 12 else "0"
+    bits += f"{color_space:03b}"
+    if color_space != 7:
+        bits += str(color_range)
+        if profile in (1, 3):
+            bits += f"{sub[0]}{sub[1]}0"
+    bits += "0" * (-len(bits) % 8)
+    return int(bits, 2).to_bytes(len(bits) // 8, "big") + b"\0" * 8
+
+
+def simple_block(track_number, frame, flags=0x80):
+    """Encode a SimpleBlock of one frame of the track"""
+    return element(
+        ebml.SIMPLE_BLOCK, vint(track_number), b"\0\0", bytes([flags]), frame
+    )
+
+
+def ebml_header(doc_type="webm"):
+    """Encode the EBML header of a WebM"""
+    return element(ebml.EBML, string(ebml.DOC_TYPE, doc_type))
+
+
+def video_track(colour=None):
+    """Encode the TrackEntry of a VP9 video track at 24000/1001 frames per second"""
+    colour_elements = [
+        uint(element_id, value) for element_id, value in (colour or {}).items()
+    ]
+    return element(
+        ebml.TRACK_ENTRY,
+        uint(ebml.TRACK_NUMBER, 1),
+        uint(ebml.TRACK_UID, 11),
+        uint(ebml.TRACK_TYPE, 1),
+        string(ebml.CODEC_ID, "V_VP9"),
+        uint(ebml.DEFAULT_DURATION, 41708333),
+        element(
+            ebml.VIDEO,
+            uint(ebml.PIXEL_WIDTH, 1280),
+            uint(ebml.PIXEL_HEIGHT, 720),
+            element(ebml.COLOUR, *colour_elements) if colour_elements else b"",
+        ),
+    )
+
+
+def audio_track():
+    """Encode the TrackEntry of a stereo Opus audio track in Japanese"""
+    return element(
+        ebml.TRACK_ENTRY,
+        uint(ebml.TRACK_NUMBER, 2),
+        uint(ebml.TRACK_UID, 22),
+        uint(ebml.TRACK_TYPE, 2),
+        string(ebml.CODEC_ID, "A_OPUS"),
+        string(ebml.LANGUAGE, "jpn"),
+        element(
+            ebml.AUDIO,
+            double(ebml.SAMPLING_FREQUENCY, 48000.0),
+            uint(ebml.CHANNELS, 2),
+        ),
+    )
+
+
+def simple_tag(name, value, *children):
+    """Encode a SimpleTag, with nested SimpleTags"""
+    return element(
+        ebml.SIMPLE_TAG,
+        string(ebml.TAG_NAME, name),
+        string(ebml.TAG_STRING, value),
+        *children,
+    )
+
+
+def webm(*top_level, tracks=None, cluster=None, segment_size=None):
+    """Encode a WebM of the top-level elements, with a 5 second Info and the tracks"""
+    info = element(
+        ebml.INFO,
+        uint(ebml.TIMESTAMP_SCALE, 1000000),
+        double(ebml.DURATION, 5000.0),
+        string(ebml.TITLE, "Show OP1"),
+        element(ebml.DATE_UTC, (86400 * 10**9).to_bytes(8, "big")),
+    )
+    if tracks is None:
+        tracks = [video_track(), audio_track()]
+    if cluster is None:
+        cluster = element(ebml.CLUSTER, simple_block(1, vp9_keyframe()))
+
+    return ebml_header() + element(
+        ebml.SEGMENT,
+        info,
+        element(ebml.TRACKS, *tracks),
+        cluster,
+        *top_level,
+        size=segment_size,
+    )
+
+
+class TestReadVint(unittest.TestCase):
+    """Tests of variable length integers"""
+
+    def test_lengths(self):
+        """Test if the length marker gives the length and is masked out of the value"""
+        self.assertEqual(read_vint(b"\x81", 0), (1, 1))
+        self.assertEqual(read_vint(b"\x40\x02", 0), (2, 2))
+        self.assertEqual(read_vint(b"\x00\x20\x00\x03", 1), (3, 3))
+        self.assertEqual(read_vint(b"\x01" + b"\x00" * 6 + b"\x05", 0), (5, 8))
+
+    def test_unknown(self):
+        """Test if a value with all value bits set is unknown"""
+        self.assertEqual(read_vint(b"\xff", 0), (None, 1))
+        self.assertEqual(read_vint(UNKNOWN_SIZE, 0), (None, 8))
+
+    def test_keep_marker(self):
+        """Test if element IDs keep their length marker"""
+        self.assertEqual(
+            read_vint(b"\x1a\x45\xdf\xa3", 0, keep_marker=True), (ebml.EBML, 4)
+        )
+
+    def test_invalid(self):
+        """Test if a zero first byte or a truncated integer is an error"""
+        for data in (b"\x00\x81", b"", b"\x40"):
+            with self.subTest(data=data), self.assertRaises(EbmlError):
+                read_vint(data, 0)
+
+
+class TestAvReduce(unittest.TestCase):
+    """Tests of the port of av_reduce"""
+
+    def test_frame_rates(self):
+        """Test if default durations give the frame rates of the Matroska demuxer"""
+        for default_duration, frame_rate in (
+            (41708333, (24000, 1001)),
+            (33366667, (30000, 1001)),
+            (40000000, (25, 1)),
+            (41666667, (24, 1)),
+        ):
+            with self.subTest(default_duration=default_duration):
+                self.assertEqual(
+                    av_reduce(1000000000, default_duration, 30000), frame_rate
+                )
+
+    def test_reduce(self):
+        """Test if fractions within the maximum are only reduced"""
+        self.assertEqual(av_reduce(6, 4, 100), (3, 2))
+        self.assertEqual(av_reduce(0, 1, 100), (0, 1))
+
+    def test_approximate(self):
+        """Test if fractions over the maximum are approximated within it"""
+        self.assertEqual(av_reduce(355, 113, 100), (22, 7))
+
+
+class TestVp9ColorConfig(unittest.TestCase):
+    """Tests of the color config of VP9 keyframes"""
+
+    def test_color_configs(self):
+        """Test if the pixel format, color space and range match the FFmpeg decoder"""
+        for kwargs, config in (
+            ({}, ("yuv420p", "bt709", "tv")),
+            ({"color_space": 1, "color_range": 1}, ("yuv420p", "bt470bg", "pc")),
+            ({"color_space": 0}, ("yuv420p", None, "tv")),
+            (
+                {"profile": 2, "bit_depth": 10, "color_space": 5},
+                ("yuv420p10le", "bt2020nc", "tv"),
+            ),
+            ({"profile": 2, "bit_depth": 12}, ("yuv420p12le", "bt709", "tv")),
+            ({"profile": 1, "sub": (0, 0)}, ("yuv444p", "bt709", "tv")),
+            ({"profile": 1, "sub": (1, 0)}, ("yuv422p", "bt709", "tv")),
+            ({"profile": 1, "color_space": 7}, ("gbrp", "gbr", "pc")),
+        ):
+            with self.subTest(**kwargs):
+                self.assertEqual(vp9_color_config(vp9_keyframe(**kwargs)), config)
+
+    def test_invalid(self):
+        """Test if frames that aren't keyframes, or aren't VP9, are errors"""
+        keyframe = vp9_keyframe()
+        for frame in (
+            bytes([keyframe[0] & 0x3F]) + keyframe[1:],
+            bytes([keyframe[0] | 0x04]) + keyframe[1:],
+            keyframe[:1] + b"\0" * 8,
+            keyframe[:2],
+        ):
+            with self.subTest(frame=frame), self.assertRaises(EbmlError):
+                vp9_color_config(frame)
+
+
+class TestReadWebmFormat(unittest.TestCase):
+    """Tests of the container format and stream information of synthetic WebMs"""
+
+    def read(self, data):
+        """Read the format of a file of the bytes"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "Show-OP1.webm")
+            with open(path, "wb") as f:
+                f.write(data)
+            webm_format = read_webm_format(path)
+        webm_format["format"].pop("filename")
+        return webm_format
+
+    def test_streams(self):
+        """Test if the streams have the entries of FFprobe"""
+        webm_format = self.read(
+            webm(
+                tracks=[
+                    video_track(
+                        {
+                            ebml.MATRIX_COEFFICIENTS: 1,
+                            ebml.TRANSFER_CHARACTERISTICS: 1,
+                            ebml.PRIMARIES: 1,
+                            ebml.RANGE: 2,
+                        }
+                    ),
+                    audio_track(),
+                ]
+            )
+        )
+
+        # The color space and range of VP9 are those of the keyframe
+        self.assertEqual(
+            webm_format["streams"],
+            [
+                {
+                    "index": 0,
+                    "codec_name": "vp9",
+                    "codec_type": "video",
+                    "width": 1280,
+                    "height": 720,
+                    "pix_fmt": "yuv420p",
+                    "color_range": "tv",
+                    "color_space": "bt709",
+                    "color_transfer": "bt709",
+                    "color_primaries": "bt709",
+                    "avg_frame_rate": "24000/1001",
+                    "tags": {"language": "eng"},
+                },
+                {
+                    "index": 1,
+                    "codec_name": "opus",
+                    "codec_type": "audio",
+                    "sample_rate": "48000",
+                    "channels": 2,
+                    "channel_layout": "stereo",
+                    "tags": {"language": "jpn"},
+                },
+            ],
+        )
+
+    def test_format(self):
+        """Test if the format has the duration, size, bitrate and tags of FFprobe"""
+        data = webm()
+        self.assertEqual(
+            self.read(data)["format"],
+            {
+                "nb_streams": 2,
+                "format_name": "matroska,webm",
+                "duration": "5.000000",
+                "size": str(len(data)),
+                "bit_rate": str(int(len(data) * 8 / 5)),
+                "tags": {
+                    "title": "Show OP1",
+                    "creation_time": "2001-01-02T00:00:00.000000Z",
+                },
+            },
+        )
+
+    def test_tags(self):
+        """Test if tags are keyed by target type and language, and added to their track"""
+        tags = element(
+            ebml.TAGS,
+            element(
+                ebml.TAG,
+                element(ebml.TARGETS),
+                simple_tag("ENCODER", "Lavf61.7.100"),
+            ),
+            element(
+                ebml.TAG,
+                element(ebml.TARGETS, string(ebml.TARGET_TYPE, "ALBUM")),
+                simple_tag("ARTIST", "Band", simple_tag("SORT_WITH", "band")),
+            ),
+            element(
+                ebml.TAG,
+                element(ebml.TARGETS),
+                element(
+                    ebml.SIMPLE_TAG,
+                    string(ebml.TAG_NAME, "COMMENT"),
+                    string(ebml.TAG_LANGUAGE, "jpn"),
+                    string(ebml.TAG_STRING, "Creditless"),
+                ),
+            ),
+            element(
+                ebml.TAG,
+                element(ebml.TARGETS, uint(ebml.TAG_TRACK_UID, 22)),
+                simple_tag("DURATION", "00:00:05.000000000"),
+            ),
+            element(
+                ebml.TAG,
+                element(ebml.TARGETS, uint(ebml.TAG_CHAPTER_UID, 5)),
+                simple_tag("TITLE", "Ignored"),
+            ),
+        )
+        webm_format = self.read(webm(tags))
+
+        self.assertEqual(
+            webm_format["format"]["tags"],
+            {
+                "title": "Show OP1",
+                "creation_time": "2001-01-02T00:00:00.000000Z",
+                "ENCODER": "Lavf61.7.100",
+                "ALBUM/ARTIST": "Band",
+                "ALBUM/ARTIST/SORT_WITH": "band",
+                "COMMENT": "Creditless",
+                "COMMENT-jpn": "Creditless",
+            },
+        )
+        self.assertEqual(
+            webm_format["streams"][1]["tags"],
+            {"language": "jpn", "DURATION": "00:00:05.000000000"},
+        )
+
+    def test_chapters(self):
+        """Test if chapters have the times and titles of FFprobe"""
+        chapters = element(
+            ebml.CHAPTERS,
+            element(
+                ebml.EDITION_ENTRY,
+                element(
+                    ebml.CHAPTER_ATOM,
+                    uint(ebml.CHAPTER_UID, 5),
+                    uint(ebml.CHAPTER_TIME_START, 0),
+                    uint(ebml.CHAPTER_TIME_END, 1500000000),
+                    element(ebml.CHAPTER_DISPLAY, string(ebml.CHAP_STRING, "Intro")),
+                ),
+                element(
+                    ebml.CHAPTER_ATOM,
+                    uint(ebml.CHAPTER_UID, 0),
+                    uint(ebml.CHAPTER_TIME_START, 1500000000),
+                ),
+            ),
+        )
+
+        self.assertEqual(
+            self.read(webm(chapters))["chapters"],
+            [
+                {
+                    "id": 5,
+                    "time_base": "1/1000000000",
+                    "start": 0,
+                    "start_time": "0.000000",
+                    "end": 1500000000,
+                    "end_time": "1.500000",
+                    "tags": {"title": "Intro"},
+                }
+            ],
+        )
+
+    def test_unknown_size_segment(self):
+        """Test if a segment of unknown size is read to the end of the file"""
+        webm_format = self.read(webm(segment_size=UNKNOWN_SIZE))
+        self.assertEqual(len(webm_format["streams"]), 2)
+
+    def test_unsupported(self):
+        """Test if structures that the reader can't decode fall back as errors"""
+        unknown_size_cluster = element(
+            ebml.CLUSTER, simple_block(1, vp9_keyframe()), size=UNKNOWN_SIZE
+        )
+        cases = {
+            "attachments": webm(element(ebml.ATTACHMENTS)),
+            "laced block": webm(
+                cluster=element(
+                    ebml.CLUSTER, simple_block(1, vp9_keyframe(), flags=0x82)
+                )
+            ),
+            "unknown size cluster": ebml_header()
+            + element(
+                ebml.SEGMENT,
+                element(ebml.INFO, double(ebml.DURATION, 5000.0)),
+                element(ebml.TRACKS, video_track()),
+                unknown_size_cluster,
+            ),
+            "unknown codec": webm(
+                tracks=[
+                    element(
+                        ebml.TRACK_ENTRY,
+                        uint(ebml.TRACK_TYPE, 2),
+                        string(ebml.CODEC_ID, "A_UNKNOWN"),
+                    )
+                ]
+            ),
+            "no keyframe": webm(cluster=element(ebml.CLUSTER)),
+            "not webm": ebml_header("mkv3d") + element(ebml.SEGMENT),
+            "not ebml": b"RIFF" + b"\0" * 16,
+        }
+        for name, data in cases.items():
+            with self.subTest(name), self.assertRaises(EbmlError):
+                self.read(data)
+
+
+@unittest.skipIf(
+    shutil.which("ffmpeg") is None or shutil.which("ffprobe") is None,
+    "requires FFmpeg and FFprobe",
+)
+class TestFfprobeParity(unittest.TestCase):
+    """Tests of the EBML reader against FFprobe on files encoded by FFmpeg"""
+
+    # The encodes, as the arguments of their video stream
+    encodes = {
+        "vp9": ["-c:v", "libvpx-vp9", "-r", "24000/1001", "-pix_fmt", "yuv420p"],
+        "vp9_10bit": ["-c:v", "libvpx-vp9", "-r", "30", "-pix_fmt", "yuv420p10le"],
+        "vp8": ["-c:v", "libvpx", "-r", "25"],
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        # pylint: disable-next=consider-using-with
+        cls.directory = tempfile.TemporaryDirectory()
+
+        metadata = os.path.join(cls.directory.name, "chapters.txt")
+        with open(metadata, "w", encoding="utf-8") as f:
+            f.write(
+                ";FFMETADATA1\ntitle=Show OP1\n"
+                "[CHAPTER]\nTIMEBASE=1/1000\nSTART=0\nEND=1000\ntitle=Intro\n"
+            )
+
+        cls.files = {}
+        for name, video_args in cls.encodes.items():
+            path = os.path.join(cls.directory.name, f"{name}.webm")
+            subprocess.run(
+                ["ffmpeg", "-v", "error", "-f", "lavfi", "-i", "testsrc2=s=320x180:d=2"]
+                + ["-f", "lavfi", "-i", "sine=d=2", "-i", metadata]
+                + ["-map", "0", "-map", "1", "-map_metadata", "2", "-map_chapters", "2"]
+                + video_args
+                + ["-colorspace", "bt709", "-color_trc", "bt709"]
+                + ["-color_primaries", "bt709", "-b:v", "200k", "-c:a", "libopus"]
+                + ["-metadata:s:a:0", "language=jpn", path],
+                check=True,
+            )
+            cls.files[name] = path
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def test_parity(self):
+        """Test if every entry read from the headers matches that of FFprobe"""
+        for name, path in self.files.items():
+            with self.subTest(name):
+                probe = json.loads(
+                    subprocess.run(
+                        ["ffprobe", "-v", "quiet", "-print_format", "json"]
+                        + ["-show_streams", "-show_format", "-show_chapters", path],
+                        check=True,
+                        capture_output=True,
+                    ).stdout
+                )
+                webm_format = read_webm_format(path)
+
+                for stream, probed in zip(webm_format["streams"], probe["streams"]):
+                    self.assertEqual(stream, {key: probed.get(key) for key in stream})
+                self.assertEqual(len(webm_format["streams"]), len(probe["streams"]))
+
+                self.assertEqual(
+                    webm_format["format"],
+                    {key: probe["format"].get(key) for key in webm_format["format"]},
+                )
+                self.assertEqual(
+                    webm_format["chapters"],
+                    [
+                        {key: chapter.get(key) for key in ebml_chapter}
+                        for ebml_chapter, chapter in zip(
+                            webm_format["chapters"], probe["chapters"]
+                        )
+                    ],
+                )
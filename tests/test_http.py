@@ -0,0 +1,216 @@
+"""Tests of range reads of remote files over pooled keep-alive connections"""
+
+import http.server
+import os
+import re
+import socket
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from test_webm._http import HttpError, RangeBuffer, read_range
+from test_webm._runner import verify_file
+from test_webm._utils import path_arg_type
+from test_webm._webm_format import WebmFormat
+
+# The contents of the served file, with a distinct value at every offset
+DATA = bytes(range(256)) * 40
+
+
+class RangeHandler(http.server.BaseHTTPRequestHandler):
+    """A handler of GET and HEAD requests of one file, with single byte ranges"""
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_HEAD(self):  # pylint: disable=invalid-name
+        """Send the headers of the file"""
+        self.server.heads += 1
+        self.send_file(head=True)
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Send the requested range of the file"""
+        self.send_file(head=False)
+
+    def send_file(self, head):
+        """Send the file, or the range of it in the Range header"""
+        self.server.requests.append(self.headers.get("Range"))
+        match = re.fullmatch(r"bytes=(\d+)-(\d+)", self.headers.get("Range", ""))
+
+        if match is None or not self.server.ranges:
+            self.send_body(200, DATA, head)
+            return
+
+        start, end = int(match.group(1)), min(int(match.group(2)), len(DATA) - 1)
+        if start >= len(DATA):
+            self.send_body(416, b"", head, f"bytes */{len(DATA)}")
+            return
+
+        self.send_body(
+            206, DATA[start : end + 1], head, f"bytes {start}-{end}/{len(DATA)}"
+        )
+
+    def send_body(self, status, body, head, content_range=None):
+        """Send a response with the body"""
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        if content_range is not None:
+            self.send_header("Content-Range", content_range)
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        """Keep the test output free of request logs"""
+
+
+class ServerTestCase(unittest.TestCase):
+    """A test case with a local server of one file
+
+    Each test has a server of its own, so no connection is reused from another test.
+    """
+
+    ranges = True
+
+    def setUp(self):
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+        self.server.daemon_threads = True
+        self.server.ranges = self.ranges
+        self.server.connections = 0
+        self.server.heads = 0
+        self.server.requests = []
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/Show-OP1.webm"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+
+class TestHttp(ServerTestCase):
+    """Tests of range reads of remote files over pooled keep-alive connections"""
+
+    def test_partial_read(self):
+        """Test if a range is read with the size of the file"""
+        self.assertEqual(read_range(self.url, 100, 300), (DATA[100:300], len(DATA)))
+
+    def test_read_past_end(self):
+        """Test if a range past the end of the file is empty, with the size of the file"""
+        self.assertEqual(
+            read_range(self.url, len(DATA) + 10, len(DATA) + 20), (b"", len(DATA))
+        )
+
+    def test_keep_alive(self):
+        """Test if consecutive reads reuse one connection"""
+        for start in range(0, 1000, 100):
+            read_range(self.url, start, start + 100)
+        self.assertEqual(self.server.connections, 1)
+
+    def test_range_buffer(self):
+        """Test if slices are fetched once, in aligned blocks"""
+        with RangeBuffer(self.url, block_size=256) as buffer:
+            self.assertEqual(len(buffer), len(DATA))
+            self.assertEqual(buffer[300:1000], DATA[300:1000])
+            self.assertEqual(buffer[10:20], DATA[10:20])
+            self.assertEqual(buffer[len(DATA) - 5 : len(DATA) + 5], DATA[-5:])
+
+        # The first block is read as the buffer opens, blocks 1 to 3 in one request
+        # and the last block on its own, while block 0 is sliced from the cache
+        self.assertEqual(
+            self.server.requests,
+            [
+                "bytes=0-255",
+                "bytes=256-1023",
+                f"bytes={len(DATA) - 256}-{len(DATA) - 1}",
+            ],
+        )
+        self.assertEqual(self.server.connections, 1)
+
+
+class TestHttpCache(ServerTestCase):
+    """Tests of the persistent cache of the sources of test data of remote files"""
+
+    def setUp(self):
+        super().setUp()
+        # pylint: disable-next=consider-using-with
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.cache = os.path.join(self.directory.name, "cache.db")
+        self.loads = 0
+
+        def get_remote_source(file):
+            self.loads += 1
+            return {"file": file}
+            yield  # pylint: disable=unreachable
+
+        for patcher in (
+            mock.patch.object(
+                WebmFormat,
+                "get_remote_source",
+                staticmethod(get_remote_source),
+                create=True,
+            ),
+            mock.patch("test_webm._cache.tool_version", return_value="tools"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def get_sources(self):
+        """Get two sources of test data of the file, through the cache"""
+        webm_format = WebmFormat(self.url, cache=self.cache)
+        for name in ("first", "second"):
+            webm_format.source_loaders[name] = "get_remote_source"
+            self.assertEqual(webm_format.get_source(name), {"file": self.url})
+
+    def test_file_key(self):
+        """Test if the file is identified with one HEAD request per WebmFormat"""
+        self.get_sources()
+        self.assertEqual(self.server.heads, 1)
+
+        # Both sources are read from the cache
+        self.get_sources()
+        self.assertEqual(self.server.heads, 2)
+        self.assertEqual(self.loads, 2)
+
+
+class TestHttpWithoutRanges(ServerTestCase):
+    """Tests of range reads from a server without range requests"""
+
+    ranges = False
+
+    def test_partial_read(self):
+        """Test if a full response to a range request is an error"""
+        with self.assertRaises(HttpError):
+            read_range(self.url, 100, 300)
+
+    def test_range_buffer(self):
+        """Test if a full response is an error when the buffer opens"""
+        with self.assertRaises(HttpError):
+            RangeBuffer(self.url)
+
+
+class TestUnreachableHost(unittest.TestCase):
+    """Tests of remote files on a host that refuses connections"""
+
+    def setUp(self):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}/Show-OP1.webm"
+
+    def test_argument(self):
+        """Test if the URL is accepted as an argument without a request"""
+        self.assertEqual(path_arg_type(self.url), self.url)
+
+    def test_verify_file(self):
+        """Test if the host is reported as an error of the file"""
+        file, _, success, record = verify_file(self.url, ["format"], "error", {})
+        self.assertEqual(file, self.url)
+        self.assertFalse(success)
+        self.assertIn("HttpError", record["error"])
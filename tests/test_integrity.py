@@ -0,0 +1,226 @@
+"""Tests of the segmented full decode of the streams of the file"""
+
+import subprocess
+import unittest
+
+from test_webm._integrity import (
+    MIN_SEGMENT_DURATION,
+    DecodeProgress,
+    decode_segment,
+    first_error,
+    get_integrity_stats,
+    keyframe_segments,
+)
+from test_webm._packets import NOPTS_VALUE
+
+# A cue point every 10 seconds of a 2 minute file
+SEEK_POINTS = [float(time) for time in range(0, 120, 10)]
+
+# The framecrc output of three 41 ms frames from 30 seconds in
+FRAMECRC = [
+    b"#tb 0: 1/1000\n",
+    b"#media_type 0: video\n",
+    b"0,      30000,      30000,       41,   622080, 0x1\n",
+    b"0,      30041,      30041,       41,   622080, 0x2\n",
+    b"0,      30082,      30082,       41,   622080, 0x3\n",
+]
+
+
+def finish(plan, value):
+    """Send the result of the current step to the plan and get its return value"""
+    try:
+        plan.send(value)
+    except StopIteration as stop:
+        return stop.value
+    raise AssertionError("The plan has more steps")
+
+
+def fail_decode(plan, stderr):
+    """Raise a failed decode in the plan and get its return value"""
+    try:
+        plan.throw(subprocess.CalledProcessError(1, ["ffmpeg"], stderr=stderr))
+    except StopIteration as stop:
+        return stop.value
+    raise AssertionError("The plan has more steps")
+
+
+class TestKeyframeSegments(unittest.TestCase):
+    """Tests of the split of the video into segments at cue points"""
+
+    def test_even_split(self):
+        """Test if segments start at the cue points nearest to an even split"""
+        self.assertEqual(
+            keyframe_segments(SEEK_POINTS, 120.0, 4),
+            [(None, 30.0), (30.0, 30.0), (60.0, 30.0), (90.0, None)],
+        )
+
+    def test_no_cue_points(self):
+        """Test if a file without cue points is decoded in one segment"""
+        self.assertEqual(keyframe_segments([], 120.0, 4), [(None, None)])
+
+    def test_cue_points_at_start(self):
+        """Test if splits at the start of the file are dropped"""
+        self.assertEqual(keyframe_segments([0.0], 120.0, 4), [(None, None)])
+
+    def test_shared_cue_points(self):
+        """Test if splits nearest to the same cue point form one segment"""
+        self.assertEqual(
+            keyframe_segments([0.0, 100.0], 120.0, 4), [(None, 100.0), (100.0, None)]
+        )
+
+    def test_short_duration(self):
+        """Test if a file shorter than the shortest segment is decoded in one segment"""
+        self.assertEqual(
+            keyframe_segments(SEEK_POINTS, MIN_SEGMENT_DURATION - 1, 4), [(None, None)]
+        )
+
+    def test_min_duration(self):
+        """Test if the number of segments is limited by the shortest segment"""
+        self.assertEqual(
+            keyframe_segments(SEEK_POINTS, 70.0, 4), [(None, 30.0), (30.0, None)]
+        )
+        self.assertEqual(len(keyframe_segments(SEEK_POINTS, 120.0, 8, 10.0)), 8)
+
+
+class TestFirstError(unittest.TestCase):
+    """Tests of the first error of the log of FFmpeg"""
+
+    def test_context(self):
+        """Test if the context of the component is removed from the error"""
+        self.assertEqual(
+            first_error(
+                b"[vp9 @ 0x5581] Corrupt frame\n[vist#0:0/vp9 @ 0x5582] Decoding error\n"
+            ),
+            "Corrupt frame",
+        )
+        self.assertEqual(
+            first_error(b"[matroska,webm @ 0x1] [vp9 @ 0x2]   Invalid data\n"),
+            "Invalid data",
+        )
+
+    def test_blank_lines(self):
+        """Test if lines without a message are skipped"""
+        self.assertEqual(
+            first_error(b"\n[vp9 @ 0x1]\nTruncated \xff\n"), "Truncated \ufffd"
+        )
+
+    def test_no_error(self):
+        """Test if an empty log has no error"""
+        self.assertIsNone(first_error(b""))
+
+
+class TestDecodeProgress(unittest.TestCase):
+    """Tests of the end time of the decoded frames"""
+
+    def test_end_time(self):
+        """Test if the end time is that of the last frame, counting every frame"""
+        progress = DecodeProgress()
+        for line in FRAMECRC:
+            progress.add_framecrc(line)
+        progress.add_framecrc(f"0, {NOPTS_VALUE}, {NOPTS_VALUE}, 41, 1, 0x4\n".encode())
+
+        self.assertEqual(progress.frames, 4)
+        self.assertAlmostEqual(progress.end_time, 30.123)
+
+    def test_no_frames(self):
+        """Test if nothing decoded has no end time"""
+        progress = DecodeProgress()
+        progress.add_framecrc(b"#tb 0: 1/1000\n")
+        self.assertEqual(progress.frames, 0)
+        self.assertIsNone(progress.end_time)
+
+
+class TestDecodeSegment(unittest.TestCase):
+    """Tests of the decode of a segment and the time of its first error"""
+
+    def decode(self, start=None, duration=None, lines=()):
+        """Start the plan of a segment decode, consuming the framecrc lines"""
+        plan = decode_segment("Show-OP1.webm", "v:0", start, duration)
+        command = next(plan)
+        self.assertIn("framecrc", command.args)
+        for line in lines:
+            command.consume(line)
+        return plan
+
+    def test_success(self):
+        """Test if a clean decode has no error"""
+        result = finish(
+            self.decode(30.0, 30.0, FRAMECRC),
+            subprocess.CompletedProcess(["ffmpeg"], 0, None, b""),
+        )
+
+        self.assertEqual(result["error"], None)
+        self.assertEqual(result["frames"], 3)
+        self.assertAlmostEqual(result["end_time"], 30.123)
+
+    def test_logged_error(self):
+        """Test if an error logged by a decode that didn't fail is reported"""
+        result = finish(
+            self.decode(30.0, 30.0, FRAMECRC),
+            subprocess.CompletedProcess(
+                ["ffmpeg"], 0, None, b"[vp9 @ 0x1] Truncated\n"
+            ),
+        )
+
+        self.assertEqual(result["error"], "Truncated")
+        self.assertEqual(result["error_time"], 30.123)
+
+    def test_error_after_frames(self):
+        """Test if an error is timed at the end of the last decoded frame"""
+        result = fail_decode(
+            self.decode(30.0, 30.0, FRAMECRC), b"[vp9 @ 0x1] Corrupt frame\n"
+        )
+
+        self.assertEqual(result["error"], "Corrupt frame")
+        self.assertEqual(result["error_time"], 30.123)
+
+    def test_error_before_frames(self):
+        """Test if an error before any frame is timed at the start of the segment"""
+        result = fail_decode(self.decode(30.0, 30.0), b"[vp9 @ 0x1] Corrupt frame\n")
+        self.assertEqual(result["error_time"], 30.0)
+
+        result = fail_decode(self.decode(), b"")
+        self.assertEqual(result["error"], "FFmpeg exited with 1")
+        self.assertEqual(result["error_time"], 0.0)
+
+
+class TestIntegrityStats(unittest.TestCase):
+    """Tests of the decode integrity stats of the segments"""
+
+    def test_first_error(self):
+        """Test if the error of the file is the earliest error of its segments"""
+        plan = get_integrity_stats(
+            "Show-OP1.webm", ["video", "audio"], 120.0, SEEK_POINTS, 2
+        )
+        gather = next(plan)
+        self.assertEqual(len(gather.plans), 3)
+
+        stats = finish(
+            plan,
+            [
+                {"error": None, "error_time": None, "frames": 1440, "end_time": 60.0},
+                {
+                    "error": "Corrupt frame",
+                    "error_time": 90.5,
+                    "frames": 720,
+                    "end_time": 90.5,
+                },
+                {
+                    "error": "Invalid data",
+                    "error_time": 95.0,
+                    "frames": 0,
+                    "end_time": None,
+                },
+            ],
+        )
+
+        self.assertEqual(
+            stats,
+            {
+                "segments": 3,
+                "frames": 2160,
+                "decode_error": "Corrupt frame",
+                "decode_error_time": 90.5,
+                "decoded_duration": 90.5,
+            },
+        )
@@ -0,0 +1,181 @@
+"""Tests of the seek index and cluster layout reader on synthetic element layouts"""
+
+import os
+import tempfile
+import unittest
+
+from test_ebml import double, ebml_header, element, uint
+
+from test_webm import _ebml as ebml
+from test_webm._ebml import EbmlError
+from test_webm._layout import (
+    CUE_POINT,
+    CUE_TIME,
+    CUES,
+    cue_times,
+    parse_seek_points,
+    parse_stream_layout,
+    read_stream_layout,
+)
+
+
+def layout(*top_level, duration=5000.0, timestamp_scale=1000000):
+    """Encode a WebM of an Info element followed by the top-level elements"""
+    info = element(
+        ebml.INFO,
+        uint(ebml.TIMESTAMP_SCALE, timestamp_scale),
+        double(ebml.DURATION, duration),
+    )
+    return ebml_header() + element(ebml.SEGMENT, info, *top_level)
+
+
+def seek_head(*element_ids):
+    """Encode a SeekHead that indexes the elements"""
+    return element(
+        ebml.SEEK_HEAD,
+        *(
+            element(
+                ebml.SEEK, uint(ebml.SEEK_ID, element_id), uint(ebml.SEEK_POSITION, 0)
+            )
+            for element_id in element_ids
+        ),
+    )
+
+
+def cues(*times):
+    """Encode a Cues element with a cue point at each timestamp"""
+    return element(CUES, *(element(CUE_POINT, uint(CUE_TIME, time)) for time in times))
+
+
+def cluster(size):
+    """Encode a Cluster with a payload of the size"""
+    return element(ebml.CLUSTER, b"\0" * size)
+
+
+class TestStreamLayout(unittest.TestCase):
+    """Tests of the seek index and cluster layout of synthetic files"""
+
+    def test_no_cues(self):
+        """Test if a file without Cues can only be seeked from the start"""
+        stats = parse_stream_layout(
+            layout(seek_head(ebml.INFO, ebml.CLUSTER), cluster(100), cluster(300))
+        )
+
+        self.assertEqual(
+            stats,
+            {
+                "cue_points": 0,
+                "cues_before_clusters": False,
+                "seek_head_cues": False,
+                "max_cluster_size": len(cluster(300)),
+                "max_cue_interval": 5.0,
+            },
+        )
+
+    def test_cues_after_clusters(self):
+        """Test if Cues written at the end of the file are found after the clusters"""
+        stats = parse_stream_layout(
+            layout(seek_head(ebml.INFO, CUES), cluster(100), cues(0, 2000, 4000))
+        )
+
+        self.assertEqual(stats["cue_points"], 3)
+        self.assertFalse(stats["cues_before_clusters"])
+        self.assertTrue(stats["seek_head_cues"])
+        self.assertEqual(stats["max_cue_interval"], 2.0)
+
+    def test_cues_before_clusters(self):
+        """Test if Cues written at the front of the file are found before the clusters"""
+        stats = parse_stream_layout(
+            layout(seek_head(CUES), cues(0, 2000, 4000), cluster(100))
+        )
+
+        self.assertTrue(stats["cues_before_clusters"])
+        self.assertTrue(stats["seek_head_cues"])
+
+    def test_cues_without_clusters(self):
+        """Test if Cues of a file without clusters are before them"""
+        stats = parse_stream_layout(layout(cues(0)))
+        self.assertTrue(stats["cues_before_clusters"])
+
+    def test_cues_not_in_seek_head(self):
+        """Test if Cues that the SeekHead doesn't index are reported"""
+        stats = parse_stream_layout(
+            layout(seek_head(ebml.INFO, ebml.TRACKS), cues(0, 2000), cluster(100))
+        )
+
+        self.assertEqual(stats["cue_points"], 2)
+        self.assertTrue(stats["cues_before_clusters"])
+        self.assertFalse(stats["seek_head_cues"])
+
+    def test_no_seek_head(self):
+        """Test if Cues of a file without a SeekHead are not indexed"""
+        stats = parse_stream_layout(layout(cues(0), cluster(100)))
+        self.assertFalse(stats["seek_head_cues"])
+
+    def test_max_cue_interval(self):
+        """Test if the intervals run from the start of the file to its duration"""
+        # The first point is 3 seconds in, and the last is 8 seconds from the end
+        stats = parse_stream_layout(
+            layout(cues(3000, 12000, 6000), cluster(100), duration=20000.0)
+        )
+        self.assertEqual(stats["max_cue_interval"], 8.0)
+
+        stats = parse_stream_layout(layout(cues(11000), cluster(100), duration=12000.0))
+        self.assertEqual(stats["max_cue_interval"], 11.0)
+
+    def test_timestamp_scale(self):
+        """Test if cue times and the duration are in units of the timestamp scale"""
+        stats = parse_stream_layout(
+            layout(cues(0, 4000000), duration=10000000.0, timestamp_scale=1000)
+        )
+        self.assertEqual(stats["max_cue_interval"], 6.0)
+
+    def test_no_info(self):
+        """Test if a segment without an Info element is an error"""
+        with self.assertRaises(EbmlError):
+            parse_stream_layout(ebml_header() + element(ebml.SEGMENT, cluster(100)))
+
+
+class TestCueTimes(unittest.TestCase):
+    """Tests of the times of the cue points"""
+
+    def test_seek_points(self):
+        """Test if the cue points of every Cues element are in order"""
+        self.assertEqual(
+            parse_seek_points(layout(cues(4000, 0), cluster(100), cues(2000))),
+            [0.0, 2.0, 4.0],
+        )
+
+    def test_missing_time(self):
+        """Test if a cue point without a time is at the start"""
+        buf = element(
+            CUES, element(CUE_POINT), element(CUE_POINT, uint(CUE_TIME, 1500))
+        )
+        elements = [ebml.read_element(buf, 0)]
+        self.assertEqual(cue_times(buf, elements, 1000000), [0.0, 1.5])
+
+
+class TestReadStreamLayout(unittest.TestCase):
+    """Tests of the stream layout of files on disk"""
+
+    def setUp(self):
+        # pylint: disable-next=consider-using-with
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, data):
+        """Write the bytes to a file of the temporary directory"""
+        path = os.path.join(self.directory.name, "Show-OP1.webm")
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_file(self):
+        """Test if a file is memory-mapped and parsed"""
+        path = self.write(layout(seek_head(CUES), cues(0), cluster(100)))
+        self.assertEqual(read_stream_layout(path)["cue_points"], 1)
+
+    def test_empty_file(self):
+        """Test if an empty file is an error"""
+        with self.assertRaises(EbmlError):
+            read_stream_layout(self.write(b""))
@@ -0,0 +1,82 @@
+"""Tests of the in-process loudness engines against the loudnorm filter"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from test_webm._loudness import get_ebur128_stats, get_segmented_ebur128_stats
+from test_webm._plan import run_plan
+from test_webm._webm_format import WebmFormat
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Two tones whose level swells and fades, so that the gates and the true peak are exercised
+SOURCE = (
+    "aevalsrc=0.4*sin(440*2*PI*t)*(1+0.5*sin(0.7*t))"
+    "|0.2*sin(660*2*PI*t)*(1+0.8*sin(0.3*t)):s=48000:d=40"
+)
+
+# The in-process engines must agree with loudnorm as closely as the cross-check expects
+TOLERANCES = {
+    entry: WebmFormat.loudness_tolerances[entry] for entry in ("input_i", "input_tp")
+}
+
+
+@unittest.skipIf(
+    numpy is None or shutil.which("ffmpeg") is None, "requires NumPy and FFmpeg"
+)
+class TestLoudnessParity(unittest.TestCase):
+    """Tests of the in-process loudness engines against the loudnorm filter"""
+
+    @classmethod
+    def setUpClass(cls):
+        # pylint: disable-next=consider-using-with
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.file = os.path.join(cls.directory.name, "parity.webm")
+        subprocess.run(
+            [
+                "ffmpeg",
+                "-v",
+                "error",
+                "-f",
+                "lavfi",
+                "-i",
+                SOURCE,
+                "-c:a",
+                "libopus",
+                "-b:a",
+                "192k",
+                cls.file,
+            ],
+            check=True,
+        )
+        cls.loudnorm = run_plan(WebmFormat.get_loudness_stats(cls.file))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def assert_parity(self, stats):
+        """Assert that the stats are within the tolerances of those of loudnorm"""
+        for entry, tolerance in TOLERANCES.items():
+            with self.subTest(entry=entry):
+                self.assertAlmostEqual(
+                    float(stats[entry]),
+                    float(self.loudnorm[entry]),
+                    delta=tolerance,
+                )
+
+    def test_numpy_engine(self):
+        """Test if the numpy engine matches loudnorm"""
+        self.assert_parity(run_plan(get_ebur128_stats(self.file)))
+
+    def test_segmented_engine(self):
+        """Test if the segmented engine, split into seeked segments, matches loudnorm"""
+        self.assert_parity(
+            run_plan(get_segmented_ebur128_stats(self.file, 40.0, 4, min_duration=1.0))
+        )
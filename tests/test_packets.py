@@ -0,0 +1,290 @@
+"""Tests of the streaming reader of packet output and the stats of its profiles"""
+
+import unittest
+
+from test_webm._packets import (
+    NOPTS_VALUE,
+    BitrateProfile,
+    FramecrcReader,
+    PacketScan,
+    packet_profile_stats,
+    parse_compact,
+    video_packet_stats,
+)
+
+# The index of the stream of each type in the packet output
+STREAM_INDEXES = {"video": 0, "audio": 1}
+
+
+def compact(codec_type, pts_time, duration_time, size, flags="__"):
+    """Get a line of FFprobe compact packet output"""
+    stream_index = STREAM_INDEXES[codec_type]
+    return (
+        f"codec_type={codec_type}|stream_index={stream_index}|pts_time={pts_time}|"
+        f"duration_time={duration_time}|size={size}|flags={flags}\n"
+    ).encode("utf-8")
+
+
+def scan(*lines):
+    """Get the packet scan of lines of FFprobe compact packet output"""
+    packet_scan = PacketScan()
+    for line in lines:
+        packet_scan.append_line(line)
+    return packet_scan
+
+
+def video_scan(pts_times, keyframes, duration_time="0.040000"):
+    """Get the packet scan of a video stream with the presentation times"""
+    return scan(
+        *(
+            compact(
+                "video",
+                pts,
+                duration_time,
+                1000,
+                "K__" if pts in keyframes else "___",
+            )
+            for pts in pts_times
+        )
+    )
+
+
+class TestParseCompact(unittest.TestCase):
+    """Tests of the parser of lines of FFprobe compact output"""
+
+    def test_entries(self):
+        """Test if the entries of a line are read by name"""
+        self.assertEqual(
+            parse_compact(compact("video", "0.041000", "0.041000", 1234, "K__")),
+            {
+                "codec_type": "video",
+                "stream_index": "0",
+                "pts_time": "0.041000",
+                "duration_time": "0.041000",
+                "size": "1234",
+                "flags": "K__",
+            },
+        )
+
+    def test_value_with_separator(self):
+        """Test if a value is split from its name at the first equals sign"""
+        self.assertEqual(parse_compact(b"tag=a=b|size=5"), {"tag": "a=b", "size": "5"})
+
+    def test_section_name(self):
+        """Test if fields that aren't entries are ignored"""
+        self.assertEqual(parse_compact(b"packet|size=5\r\n"), {"size": "5"})
+        self.assertEqual(parse_compact(b"\n"), {})
+
+
+class TestFramecrcReader(unittest.TestCase):
+    """Tests of the reader of FFmpeg framecrc output"""
+
+    def setUp(self):
+        self.reader = FramecrcReader()
+
+    def test_time_bases(self):
+        """Test if header lines declare the time base of each stream"""
+        self.assertIsNone(self.reader.read_line(b"#tb 0: 1/1000\n"))
+        self.assertIsNone(self.reader.read_line(b"#tb 1: 1/48000\n"))
+        self.assertEqual(self.reader.time_bases, {0: 1 / 1000, 1: 1 / 48000})
+
+        self.assertEqual(
+            self.reader.read_line(
+                b"0,        42,        42,       41,    12345, 0x1\n"
+            ),
+            (12345, 0.042, 0.041),
+        )
+        self.assertEqual(
+            self.reader.read_line(
+                b"1,     48000,     48000,      960,      321, 0x2\n"
+            ),
+            (321, 1.0, 0.02),
+        )
+
+    def test_other_lines(self):
+        """Test if comments, other headers and blank lines are not packets"""
+        for line in (b"#software: Lavf61.7.100\n", b"#stream#, dts, pts\n", b"\n"):
+            self.assertIsNone(self.reader.read_line(line))
+
+    def test_default_time_base(self):
+        """Test if the timestamps of a stream without a time base are in seconds"""
+        self.assertEqual(
+            self.reader.read_line(b"2, 3, 3, 1, 10, 0x0\n"), (10, 3.0, 1.0)
+        )
+
+    def test_priming_samples(self):
+        """Test if Opus packets before zero keep their negative presentation time"""
+        self.reader.read_line(b"#tb 1: 1/48000\n")
+        size, pts_time, duration_time = self.reader.read_line(
+            b"1,       -312,       -312,      960,        3, 0x0\n"
+        )
+        self.assertEqual(size, 3)
+        self.assertAlmostEqual(pts_time, -0.0065)
+        self.assertAlmostEqual(duration_time, 0.02)
+
+    def test_no_pts(self):
+        """Test if a packet without a timestamp has no presentation time"""
+        self.reader.read_line(b"#tb 0: 1/1000\n")
+        self.assertEqual(
+            self.reader.read_line(
+                f"0, {NOPTS_VALUE}, {NOPTS_VALUE}, 41, 10, 0x0\n".encode()
+            ),
+            (10, None, 0.041),
+        )
+
+
+class TestBitrateProfile(unittest.TestCase):
+    """Tests of the per-second bitrate profile of a stream"""
+
+    def test_framecrc(self):
+        """Test if packets are summed into the second of their presentation time"""
+        profile = BitrateProfile()
+        for line in (
+            b"#tb 1: 1/48000\n",
+            b"1, -312, -312, 960, 100, 0x0\n",
+            b"1,  648,  648, 960, 200, 0x0\n",
+            b"1, 48000, 48000, 960, 50, 0x0\n",
+        ):
+            profile.add_framecrc(line)
+
+        # The packet before zero is clamped into the first second
+        self.assertEqual(list(profile.bytes_per_second), [300, 50])
+        self.assertEqual((profile.size, profile.nb_packets), (350, 3))
+        self.assertAlmostEqual(profile.start_time, -0.0065)
+        self.assertAlmostEqual(profile.end_time, 1.02)
+        self.assertAlmostEqual(profile.duration, 1.0265)
+        self.assertAlmostEqual(profile.max_gap, 0.9665)
+
+    def test_no_pts(self):
+        """Test if a packet without a timestamp counts towards the size only"""
+        profile = BitrateProfile()
+        profile.add(100, 0.0, 0.5)
+        profile.add(10, None, 0.0)
+
+        self.assertEqual(list(profile.bytes_per_second), [100])
+        self.assertEqual((profile.size, profile.nb_packets), (110, 2))
+        self.assertEqual(profile.duration, 0.5)
+
+    def test_audio_format(self):
+        """Test if the bitrate is that of the size over the duration of the packets"""
+        profile = BitrateProfile()
+        profile.add(12000, 0.0, 0.5)
+        profile.add(12000, 0.5, 0.5)
+
+        self.assertEqual(
+            profile.audio_format(),
+            {
+                "format": {
+                    "nb_packets": 2,
+                    "size": "24000",
+                    "duration": "1.000000",
+                    "bit_rate": "192000",
+                }
+            },
+        )
+
+    def test_empty(self):
+        """Test if a stream without packets has no duration or bitrate"""
+        audio_format = BitrateProfile().audio_format()["format"]
+        self.assertEqual(audio_format["duration"], "0.000000")
+        self.assertEqual(audio_format["bit_rate"], "0")
+
+
+class TestPacketProfileStats(unittest.TestCase):
+    """Tests of the peak bitrate, drift and gap stats of the packets of a file"""
+
+    def test_stats(self):
+        """Test if the streams are summed per second and compared by duration"""
+        packet_scan = scan(
+            *(
+                compact("video", pts, "0.500000", 1000)
+                for pts in ("0.0", "0.5", "1.0", "1.5")
+            ),
+            *(compact("audio", pts, "0.500000", 100) for pts in ("0.0", "0.5", "2.0")),
+        )
+
+        self.assertEqual(
+            packet_profile_stats(packet_scan),
+            {
+                "seconds": 3,
+                "peak_bit_rate": 2200 * 8,
+                "video_duration": 2.0,
+                "audio_duration": 2.5,
+                "av_drift": 0.5,
+                "max_packet_gap": 1.0,
+            },
+        )
+
+    def test_audio_only(self):
+        """Test if a file without video has no drift"""
+        stats = packet_profile_stats(scan(compact("audio", "0.0", "0.020000", 10)))
+        self.assertEqual(stats["video_duration"], 0.0)
+        self.assertEqual(stats["audio_duration"], 0.02)
+        self.assertEqual(stats["av_drift"], 0.0)
+
+    def test_empty(self):
+        """Test if a file without packets has empty stats"""
+        stats = packet_profile_stats(scan())
+        self.assertEqual(stats["seconds"], 0)
+        self.assertEqual(stats["peak_bit_rate"], 0)
+        self.assertEqual(stats["max_packet_gap"], 0.0)
+
+
+class TestVideoPacketStats(unittest.TestCase):
+    """Tests of the frame timing and keyframe interval stats of the video packets"""
+
+    def test_gap(self):
+        """Test if a dropped frame is both a variable interval and a gap"""
+        packet_scan = video_scan(
+            ("0.000000", "0.040000", "0.080000", "0.120000", "0.200000", "0.240000"),
+            ("0.000000", "0.120000"),
+        )
+
+        self.assertEqual(
+            video_packet_stats(packet_scan.video_columns()),
+            {
+                "nb_packets": 6,
+                "keyframes": 2,
+                "median_frame_interval": 0.04,
+                "max_frame_interval": 0.08,
+                "variable_interval_ratio": 0.2,
+                "frame_gap_ratio": 0.2,
+                # The last keyframe interval runs to the end of the last packet
+                "max_keyframe_interval": 0.16,
+            },
+        )
+
+    def test_rounded_timestamps(self):
+        """Test if millisecond rounding of an NTSC rate is not a variable frame rate"""
+        pts_times = [f"{round(index * 1001 / 24000, 3):.6f}" for index in range(48)]
+        stats = video_packet_stats(
+            video_scan(pts_times, pts_times[:1], "0.042000").video_columns()
+        )
+
+        self.assertEqual(stats["variable_interval_ratio"], 0.0)
+        self.assertEqual(stats["frame_gap_ratio"], 0.0)
+        # The only keyframe interval runs from the first frame to the end of the last
+        self.assertEqual(stats["max_keyframe_interval"], 1.96 + 0.042)
+
+    def test_reordered(self):
+        """Test if frames in decode order are timed in presentation order"""
+        stats = video_packet_stats(
+            video_scan(
+                ("0.000000", "0.120000", "0.040000", "0.080000", "N/A"),
+                ("0.000000",),
+            ).video_columns()
+        )
+
+        self.assertEqual(stats["nb_packets"], 5)
+        self.assertEqual(stats["max_frame_interval"], 0.04)
+        self.assertEqual(stats["variable_interval_ratio"], 0.0)
+        self.assertEqual(stats["max_keyframe_interval"], 0.16)
+
+    def test_no_video(self):
+        """Test if a file without video has empty stats"""
+        stats = video_packet_stats(
+            scan(compact("audio", "0.0", "0.02", 10)).video_columns()
+        )
+        self.assertEqual(stats["nb_packets"], 0)
+        self.assertEqual(stats["keyframes"], 0)
+        self.assertEqual(stats["max_keyframe_interval"], 0.0)
@@ -0,0 +1,36 @@
+"""Tests of the subprocesses run under the resource limits of the run"""
+
+import subprocess
+import sys
+import time
+import unittest
+
+from test_webm._process import popen
+
+# A subprocess that outlives the tests unless it is killed
+SLEEP = [sys.executable, "-c", "import time; time.sleep(60)"]
+
+
+class TestPopen(unittest.TestCase):
+    """Tests of the subprocesses run by popen"""
+
+    def test_error(self):
+        """Test if a process still running when the block raises is killed"""
+        start = time.monotonic()
+        with self.assertRaises(RuntimeError):
+            with popen(SLEEP, "sleep", stdout=subprocess.PIPE) as process:
+                raise RuntimeError("Abandoned")
+
+        self.assertLess(time.monotonic() - start, 30)
+        self.assertIsNotNone(process.returncode)
+        self.assertNotEqual(process.returncode, 0)
+
+    def test_exit(self):
+        """Test if a process is waited for when the block exits normally"""
+        with popen(
+            [sys.executable, "-c", "print('done')"], "print", stdout=subprocess.PIPE
+        ) as process:
+            output = process.stdout.read()
+
+        self.assertEqual(output.strip(), b"done")
+        self.assertEqual(process.returncode, 0)
@@ -0,0 +1,237 @@
+"""Tests of the shared work queue with several worker processes"""
+
+import json
+import os
+import shutil
+import signal
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+from test_webm._queue import WorkQueue
+
+# The root of the repository, so that the workers import the package under test
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The number of files seeded into the queue
+FILES = 6
+
+# Leases expire quickly, so that the lease of the killed worker is reclaimed in the test
+LEASE_TIMEOUT = 2.0
+
+# A probe that never returns, so that the worker holding its lease can be killed mid-job
+HANGING_PROBE = "#!/bin/sh\nexec sleep 60\n"
+
+
+@unittest.skipIf(
+    os.name != "posix" or shutil.which("ffmpeg") is None, "requires POSIX and FFmpeg"
+)
+class TestWorkQueue(unittest.TestCase):
+    """Tests of the shared work queue with several worker processes"""
+
+    @classmethod
+    def setUpClass(cls):
+        # pylint: disable-next=consider-using-with
+        cls.directory = tempfile.TemporaryDirectory()
+        fixture = os.path.join(cls.directory.name, "fixture.webm")
+        # WebM muxes audio as Opus by default
+        subprocess.run(
+            ["ffmpeg", "-v", "error", "-f", "lavfi", "-i", "sine=d=1", fixture],
+            check=True,
+        )
+
+        cls.files = []
+        for index in range(FILES):
+            path = os.path.join(cls.directory.name, f"Show-OP{index + 1}.webm")
+            shutil.copyfile(fixture, path)
+            cls.files.append(path)
+
+        bin_dir = os.path.join(cls.directory.name, "bin")
+        os.mkdir(bin_dir)
+        probe = os.path.join(bin_dir, "ffprobe")
+        with open(probe, "w", encoding="utf-8") as f:
+            f.write(HANGING_PROBE)
+        os.chmod(probe, 0o755)
+        cls.hanging_path = f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def setUp(self):
+        self.queue_path = os.path.join(self.directory.name, f"{self.id()}.db")
+        self.env = dict(os.environ, PYTHONPATH=ROOT)
+
+    def tearDown(self):
+        os.remove(self.queue_path)
+
+    def run_cli(self, *args, path=None, **kwargs):
+        """Start the verifier in a subprocess
+
+        :param args: the command line arguments
+        :type args: str
+
+        :param path: the PATH of the subprocess, if not that of the tests
+        :type path: str
+
+        :return: the subprocess
+        :rtype: subprocess.Popen
+        """
+        env = dict(self.env, PATH=path) if path is not None else self.env
+        return subprocess.Popen(  # pylint: disable=consider-using-with
+            [sys.executable, "-m", "test_webm", *args],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            **kwargs,
+        )
+
+    def seed(self):
+        """Seed the queue with the fixture files"""
+        seeder = self.run_cli(*self.files, "--queue-seed", self.queue_path)
+        self.assertEqual(seeder.wait(timeout=60), 0)
+
+    def kill_worker_with_lease(self):
+        """Start a worker that hangs on its first job, then kill it holding the lease
+
+        :return: the path of the job leased by the killed worker
+        :rtype: str
+        """
+        worker = self.run_cli(
+            "--queue-work",
+            self.queue_path,
+            "--lease-timeout",
+            str(LEASE_TIMEOUT),
+            "--jobs",
+            "1",
+            "--groups",
+            "format",
+            path=self.hanging_path,
+            start_new_session=True,
+        )
+
+        try:
+            deadline = time.monotonic() + 30
+            while time.monotonic() < deadline:
+                leased = self.jobs(f"worker LIKE '%:{worker.pid}'")
+                if leased:
+                    break
+                time.sleep(0.1)
+            else:
+                self.fail("The worker did not lease a job")
+        finally:
+            # The hanging probe is killed along with the worker
+            os.killpg(worker.pid, signal.SIGKILL)
+            worker.wait()
+
+        self.assertEqual(len(leased), 1)
+        return leased[0]["path"]
+
+    def work(self, workers, *args):
+        """Run workers on the queue until every job is finished
+
+        :param workers: the number of workers
+        :type workers: int
+
+        :param args: the extra command line arguments of the workers
+        :type args: str
+
+        :return: the records of the files verified by each worker
+        :rtype: list
+        """
+        reports = [
+            os.path.join(self.directory.name, f"{self.id()}-{index}.jsonl")
+            for index in range(workers)
+        ]
+        processes = [
+            self.run_cli(
+                "--queue-work",
+                self.queue_path,
+                "--lease-timeout",
+                str(LEASE_TIMEOUT),
+                "--jobs",
+                "2",
+                "--probe",
+                "ebml",
+                "--groups",
+                "format",
+                "--report",
+                "jsonl",
+                "--report-file",
+                report,
+                *args,
+            )
+            for report in reports
+        ]
+        for process in processes:
+            process.wait(timeout=120)
+
+        records = []
+        for report in reports:
+            with open(report, encoding="utf-8") as f:
+                records += [
+                    record for record in map(json.loads, f) if record["type"] == "file"
+                ]
+            os.remove(report)
+        return records
+
+    def jobs(self, where="1"):
+        """Get the jobs of the queue
+
+        :param where: the condition on the jobs
+        :type where: str
+
+        :return: the columns of each job by name
+        :rtype: list
+        """
+        with sqlite3.connect(self.queue_path) as connection:
+            connection.row_factory = sqlite3.Row
+            return [
+                dict(row)
+                for row in connection.execute(f"SELECT * FROM jobs WHERE {where}")
+            ]
+
+    def test_work(self):
+        """Test if workers finish every job exactly once"""
+        self.seed()
+        records = self.work(3)
+
+        self.assertEqual(sorted(record["file"] for record in records), self.files)
+        for job in self.jobs():
+            self.assertIn(job["status"], ("passed", "failed"))
+            self.assertEqual(job["attempts"], 1)
+
+    def test_reclaim(self):
+        """Test if the job of a killed worker is reclaimed once its lease expires"""
+        self.seed()
+        reclaimed = self.kill_worker_with_lease()
+        records = self.work(2)
+
+        self.assertEqual(sorted(record["file"] for record in records), self.files)
+        for job in self.jobs():
+            self.assertIn(job["status"], ("passed", "failed"))
+            self.assertEqual(job["attempts"], 2 if job["path"] == reclaimed else 1)
+
+        queue = WorkQueue(self.queue_path)
+        self.assertEqual(queue.counts()["leased"], 0)
+        queue.close()
+
+    def test_max_attempts(self):
+        """Test if a job whose leases keep expiring is given up as an error"""
+        self.seed()
+        abandoned = self.kill_worker_with_lease()
+        records = self.work(2, "--max-attempts", "1")
+
+        self.assertEqual(
+            sorted(record["file"] for record in records),
+            [path for path in self.files if path != abandoned],
+        )
+        for job in self.jobs():
+            if job["path"] == abandoned:
+                self.assertEqual(job["status"], "error")
+                self.assertEqual(json.loads(job["record"])["error"], "Lease expired")
+            else:
+                self.assertIn(job["status"], ("passed", "failed"))
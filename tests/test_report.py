@@ -0,0 +1,211 @@
+"""Tests of the streaming reporters of the results of verified WebM(s)"""
+
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+from xml.etree import ElementTree
+
+from test_webm._report import JsonLinesReporter, JUnitReporter, Reporter
+
+
+def result(rule, status, value=None, message=None):
+    """Get the result of a rule as it's recorded"""
+    return {
+        "rule": rule,
+        "group": "format",
+        "status": status,
+        "value": value,
+        "expected": "== 2",
+        "message": message,
+        "time": 0.000125,
+    }
+
+
+# The file, text report, success and record of each verified file
+FILES = [
+    (
+        "Show-OP1.webm",
+        "Show-OP1.webm: OK\n",
+        True,
+        {
+            "results": [result("stream_count", "pass", 2), result("chapters", "skip")],
+            "time": 1.5,
+            "error": None,
+        },
+    ),
+    (
+        "Show-OP2 & ED2.webm",
+        "Show-OP2 & ED2.webm: FAILED\n",
+        False,
+        {
+            "results": [
+                result(
+                    "stream_count",
+                    "fail",
+                    3,
+                    "Unexpected number of streams: got 3, expected == 2",
+                ),
+                result("chapters", "pass", 0),
+            ],
+            "time": 2.25,
+            "error": None,
+        },
+    ),
+    (
+        "https://example.com/Show-OP3.webm",
+        "Show-OP3.webm: <HttpError>\n",
+        False,
+        {"results": [], "time": 0.5, "error": "HttpError('Connection refused')"},
+    ),
+]
+
+SUMMARY = {
+    "files": 3,
+    "passed": 1,
+    "failed": 2,
+    "rules": {
+        "stream_count": {"pass": 1, "fail": 1},
+        "chapters": {"skip": 1, "pass": 1},
+    },
+}
+
+
+def write_report(reporter_class):
+    """Write the report of the files and get its contents"""
+    stream = io.StringIO()
+    reporter = reporter_class(stream)
+    for file in FILES:
+        reporter.write_file(*file)
+
+    # The stream is only closed for files, so its contents are kept here
+    stream.close = lambda: None
+    reporter.close()
+    return stream.getvalue()
+
+
+class TestReporter(unittest.TestCase):
+    """Tests of the reporter base class"""
+
+    def test_abstract(self):
+        """Test if a reporter must write the records of its format"""
+        with self.assertRaises(TypeError):
+            Reporter(io.StringIO())  # pylint: disable=abstract-class-instantiated
+
+    def test_summary(self):
+        """Test if the files and rule statuses are counted as they're written"""
+        reporter = JsonLinesReporter(io.StringIO())
+        for file in FILES:
+            reporter.write_file(*file)
+        self.assertEqual(reporter.summary(), SUMMARY)
+
+    def test_open_file(self):
+        """Test if a reporter writes to and closes the file at the path"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "report.jsonl")
+            reporter = Reporter.open("jsonl", path)
+            reporter.close()
+
+            self.assertTrue(reporter.stream.closed)
+            with open(path, encoding="utf-8") as f:
+                self.assertEqual(json.loads(f.read())["type"], "summary")
+
+    def test_open_stdout(self):
+        """Test if a reporter of '-' writes to standard output without closing it"""
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            reporter = Reporter.open("text", "-")
+            reporter.write_file(*FILES[0])
+            reporter.close()
+
+        self.assertFalse(stdout.closed)
+        self.assertEqual(stdout.getvalue(), "Show-OP1.webm: OK\n")
+
+
+class TestJsonLinesReporter(unittest.TestCase):
+    """Tests of the JSON Lines report"""
+
+    def test_records(self):
+        """Test if a record is written per file, followed by the summary"""
+        records = [
+            json.loads(line) for line in write_report(JsonLinesReporter).splitlines()
+        ]
+
+        self.assertEqual(len(records), 4)
+        for record, (file, _, success, file_record) in zip(records, FILES):
+            self.assertEqual(
+                record, dict(file_record, type="file", file=file, success=success)
+            )
+        self.assertEqual(records[3], dict(SUMMARY, type="summary"))
+
+
+class TestJUnitReporter(unittest.TestCase):
+    """Tests of the JUnit XML report"""
+
+    def setUp(self):
+        self.testsuites = ElementTree.fromstring(write_report(JUnitReporter))
+
+    def test_testsuites(self):
+        """Test if a suite is written per file, followed by the summary"""
+        self.assertEqual(self.testsuites.tag, "testsuites")
+        self.assertEqual(
+            [suite.get("name") for suite in self.testsuites],
+            [file for file, _, _, _ in FILES] + ["summary"],
+        )
+
+    def test_counts(self):
+        """Test if the suite of each file counts the statuses of its rules"""
+        counts = [
+            {
+                name: suite.get(name)
+                for name in ("tests", "failures", "errors", "skipped")
+            }
+            for suite in self.testsuites[:3]
+        ]
+        self.assertEqual(
+            counts,
+            [
+                {"tests": "2", "failures": "0", "errors": "0", "skipped": "1"},
+                {"tests": "2", "failures": "1", "errors": "0", "skipped": "0"},
+                {"tests": "1", "failures": "0", "errors": "1", "skipped": "0"},
+            ],
+        )
+        self.assertEqual(self.testsuites[1].get("time"), "2.250")
+
+    def test_failure(self):
+        """Test if a failed rule is a testcase with a failure of its message"""
+        testcase = self.testsuites[1].find("testcase[@name='stream_count']")
+        failure = testcase.find("failure")
+
+        self.assertEqual(testcase.get("classname"), "format")
+        self.assertEqual(
+            failure.get("message"), "Unexpected number of streams: got 3, expected == 2"
+        )
+        self.assertEqual(failure.text, "value: 3\nexpected: == 2")
+        self.assertIsNone(self.testsuites[1].find("testcase[@name='chapters']/*"))
+
+    def test_verify_error(self):
+        """Test if a file that couldn't be verified is a single errored testcase"""
+        error = self.testsuites[2].find("testcase[@name='verify']/error")
+        self.assertEqual(error.get("message"), "HttpError('Connection refused')")
+        self.assertEqual(error.text, "Show-OP3.webm: <HttpError>\n")
+
+    def test_summary(self):
+        """Test if the summary suite counts the files and the statuses of each rule"""
+        summary = self.testsuites[3]
+        self.assertEqual(summary.get("tests"), "3")
+        self.assertEqual(summary.get("failures"), "2")
+        self.assertEqual(
+            {
+                prop.get("name"): prop.get("value")
+                for prop in summary.find("properties")
+            },
+            {
+                "stream_count.pass": "1",
+                "stream_count.fail": "1",
+                "chapters.skip": "1",
+                "chapters.pass": "1",
+            },
+        )
@@ -0,0 +1,393 @@
+"""Tests that the rule table gives the same results as the baseline unittest checks"""
+
+import copy
+import unittest
+
+# The test cases are used through their modules, so that they are not collected here
+from test_webm import _test_audio, _test_format, _test_video
+from test_webm._rules import Evaluation, compile_rules
+from test_webm._webm_format import WebmFormat
+
+# The facts of a file that satisfies every standard, by source of test data
+PASSING = {
+    "webm_format": {
+        "streams": [
+            {
+                "codec_type": "video",
+                "codec_name": "vp9",
+                "pix_fmt": "yuv420p",
+                "color_space": "bt709",
+                "color_transfer": "bt709",
+                "color_primaries": "bt709",
+                "avg_frame_rate": "24000/1001",
+                "height": 1080,
+                "tags": {"DURATION": "00:01:30.000000000"},
+            },
+            {
+                "codec_type": "audio",
+                "codec_name": "opus",
+                "sample_rate": "48000",
+                "channels": 2,
+                "channel_layout": "stereo",
+                "tags": {
+                    "ENCODER": "Lavc61.19.100 libopus",
+                    "DURATION": "00:01:30.000000000",
+                },
+            },
+        ],
+        "format": {
+            "format_name": "matroska,webm",
+            "bit_rate": "4000000",
+            "tags": {"ENCODER": "Lavf61.7.100"},
+        },
+        "chapters": [],
+    },
+    "loudness_stats": {"input_i": "-16.02", "input_tp": "-1.50"},
+    "audio_format": {"format": {"bit_rate": "192000"}},
+}
+
+
+def video(sources):
+    """Get the video stream of the facts"""
+    return sources["webm_format"]["streams"][0]
+
+
+def audio(sources):
+    """Get the audio stream of the facts"""
+    return sources["webm_format"]["streams"][1]
+
+
+def file_format(sources):
+    """Get the container format of the facts"""
+    return sources["webm_format"]["format"]
+
+
+# The baseline unittest checks
+TEST_CASES = (
+    _test_format.TestFormat,
+    _test_video.TestVideo,
+    _test_audio.TestAudio,
+)
+
+# Each case changes the passing facts and gives the outcome of the baseline test:
+# 'pass', 'fail' for a failed assertion or 'error' for an exception
+CASES = [
+    (
+        _test_format.TestFormat,
+        "test_video_stream",
+        lambda s: s["webm_format"]["streams"].reverse(),
+        "fail",
+    ),
+    (
+        _test_format.TestFormat,
+        "test_audio_stream",
+        lambda s: audio(s).update(codec_type="subtitle"),
+        "fail",
+    ),
+    (
+        _test_format.TestFormat,
+        "test_audio_stream",
+        lambda s: s["webm_format"]["streams"].pop(),
+        "error",
+    ),
+    (
+        _test_format.TestFormat,
+        "test_stream_count",
+        lambda s: s["webm_format"]["streams"].pop(),
+        "fail",
+    ),
+    (
+        _test_format.TestFormat,
+        "test_stream_count",
+        lambda s: s["webm_format"]["streams"].append({"codec_type": "subtitle"}),
+        "fail",
+    ),
+    (
+        _test_format.TestFormat,
+        "test_encoder_name",
+        lambda s: file_format(s).update(tags={}),
+        "pass",
+    ),
+    (
+        _test_format.TestFormat,
+        "test_encoder_name",
+        lambda s: file_format(s).update(tags={"encoder": "HandBrake 1.8.0"}),
+        "fail",
+    ),
+    (
+        _test_format.TestFormat,
+        "test_encoder_version",
+        lambda s: file_format(s).update(tags={}),
+        "pass",
+    ),
+    (
+        _test_format.TestFormat,
+        "test_encoder_version",
+        lambda s: file_format(s).update(tags={"ENCODER": "Lavf62.3.100"}),
+        "pass",
+    ),
+    (
+        _test_format.TestFormat,
+        "test_encoder_version",
+        lambda s: file_format(s).update(tags={"ENCODER": "Lavf60.16.100"}),
+        "fail",
+    ),
+    (
+        _test_format.TestFormat,
+        "test_file_format",
+        lambda s: file_format(s).update(format_name="matroska"),
+        "fail",
+    ),
+    (
+        _test_format.TestFormat,
+        "test_filesize",
+        lambda s: file_format(s).update(bit_rate="7000000"),
+        "fail",
+    ),
+    (
+        _test_format.TestFormat,
+        "test_filesize",
+        lambda s: video(s).update(height=720),
+        "pass",
+    ),
+    (
+        _test_format.TestFormat,
+        "test_filesize",
+        lambda s: video(s).update(height=480),
+        "fail",
+    ),
+    (
+        _test_format.TestFormat,
+        "test_filesize",
+        lambda s: file_format(s).pop("bit_rate"),
+        "error",
+    ),
+    (
+        _test_format.TestFormat,
+        "test_metadata",
+        lambda s: video(s)["tags"].update(title="Source"),
+        "fail",
+    ),
+    (
+        _test_format.TestFormat,
+        "test_metadata",
+        lambda s: file_format(s)["tags"].update(title="Source"),
+        "fail",
+    ),
+    (_test_format.TestFormat, "test_metadata", lambda s: video(s).pop("tags"), "pass"),
+    (
+        _test_format.TestFormat,
+        "test_chapters",
+        lambda s: s["webm_format"]["chapters"].append(
+            {"id": 1, "tags": {"title": "OP"}}
+        ),
+        "fail",
+    ),
+    (
+        _test_video.TestVideo,
+        "test_video_codec",
+        lambda s: video(s).update(codec_name="vp8"),
+        "fail",
+    ),
+    (
+        _test_video.TestVideo,
+        "test_pix_fmt",
+        lambda s: video(s).update(pix_fmt="yuv420p10le"),
+        "fail",
+    ),
+    (
+        _test_video.TestVideo,
+        "test_color_space",
+        lambda s: video(s).pop("color_space"),
+        "fail",
+    ),
+    (
+        _test_video.TestVideo,
+        "test_color_space",
+        lambda s: video(s).update(color_space="bt470bg"),
+        "pass",
+    ),
+    (
+        _test_video.TestVideo,
+        "test_color_transfer",
+        lambda s: video(s).update(color_transfer="smpte2084"),
+        "fail",
+    ),
+    (
+        _test_video.TestVideo,
+        "test_color_primaries",
+        lambda s: video(s).update(color_primaries="bt2020"),
+        "fail",
+    ),
+    (
+        _test_video.TestVideo,
+        "test_framerate",
+        lambda s: video(s).update(avg_frame_rate="30/1"),
+        "pass",
+    ),
+    (
+        _test_video.TestVideo,
+        "test_framerate",
+        lambda s: video(s).update(avg_frame_rate="60/1"),
+        "fail",
+    ),
+    (
+        _test_audio.TestAudio,
+        "test_audio_codec",
+        lambda s: audio(s).update(codec_name="vorbis"),
+        "fail",
+    ),
+    (
+        _test_audio.TestAudio,
+        "test_loudness_i",
+        lambda s: s["loudness_stats"].update(input_i="-16.25"),
+        "pass",
+    ),
+    (
+        _test_audio.TestAudio,
+        "test_loudness_i",
+        lambda s: s["loudness_stats"].update(input_i="-14.00"),
+        "fail",
+    ),
+    (
+        _test_audio.TestAudio,
+        "test_loudness_i",
+        lambda s: s["loudness_stats"].pop("input_i"),
+        "error",
+    ),
+    (
+        _test_audio.TestAudio,
+        "test_loudness_tp",
+        lambda s: s["loudness_stats"].update(input_tp="-1.00"),
+        "pass",
+    ),
+    (
+        _test_audio.TestAudio,
+        "test_loudness_tp",
+        lambda s: s["loudness_stats"].update(input_tp="-0.50"),
+        "fail",
+    ),
+    (
+        _test_audio.TestAudio,
+        "test_audio_bitrate",
+        lambda s: s["audio_format"]["format"].update(bit_rate="320000"),
+        "pass",
+    ),
+    (
+        _test_audio.TestAudio,
+        "test_audio_bitrate",
+        lambda s: s["audio_format"]["format"].update(bit_rate="256000"),
+        "fail",
+    ),
+    (
+        _test_audio.TestAudio,
+        "test_audio_bitrate",
+        lambda s: s["audio_format"]["format"].clear(),
+        "error",
+    ),
+    (
+        _test_audio.TestAudio,
+        "test_sample_rate",
+        lambda s: audio(s).update(sample_rate="44100"),
+        "fail",
+    ),
+    (
+        _test_audio.TestAudio,
+        "test_channels",
+        lambda s: audio(s).update(channels=6),
+        "fail",
+    ),
+    (
+        _test_audio.TestAudio,
+        "test_layout",
+        lambda s: audio(s).update(channel_layout="5.1(side)"),
+        "fail",
+    ),
+]
+
+
+def load_facts(sources):
+    """Get a WebmFormat whose sources of test data are already loaded
+
+    :param sources: the sources of test data by name
+    :type sources: dict
+
+    :return: the file being tested
+    :rtype: WebmFormat
+    """
+    webm_format = WebmFormat("Show-OP1.webm")
+    for name, source in sources.items():
+        future, _ = webm_format.claim_source(name)
+        future.set_result(source)
+    return webm_format
+
+
+def run_test(test_class, testname, sources):
+    """Get the outcome of a unittest check on the facts
+
+    :param test_class: the test case class
+    :type test_class: type
+
+    :param testname: the name of the test
+    :type testname: str
+
+    :param sources: the sources of test data by name
+    :type sources: dict
+
+    :return: 'pass', 'fail' or 'error'
+    :rtype: str
+    """
+    result = unittest.TestResult()
+    test_class(testname, load_facts(sources)).run(result)
+    if result.failures:
+        return "fail"
+    if result.errors:
+        return "error"
+    return "pass"
+
+
+def run_rules(sources):
+    """Get the status of each compiled rule on the facts
+
+    :param sources: the sources of test data by name
+    :type sources: dict
+
+    :return: the status of each rule by name
+    :rtype: dict
+    """
+    evaluation = Evaluation(
+        compile_rules(("format", "video", "audio")), load_facts(sources)
+    )
+    for _ in evaluation:
+        pass
+    return {result.rule.name: result.status for result in evaluation.results}
+
+
+class TestRuleParity(unittest.TestCase):
+    """Tests that the rule table gives the same results as the baseline unittest checks"""
+
+    def test_passing(self):
+        """Test if every check and rule passes on the facts of a conforming file"""
+        statuses = run_rules(PASSING)
+        for test_class in TEST_CASES:
+            for testname in unittest.TestLoader().getTestCaseNames(test_class):
+                with self.subTest(test=testname):
+                    self.assertEqual(run_test(test_class, testname, PASSING), "pass")
+                    self.assertEqual(statuses[testname.removeprefix("test_")], "pass")
+
+    def test_cases(self):
+        """Test if the checks and the rules give the baseline outcome of each case"""
+        for test_class, testname, change, expected in CASES:
+            sources = copy.deepcopy(PASSING)
+            change(sources)
+            with self.subTest(test=testname, expected=expected):
+                self.assertEqual(run_test(test_class, testname, sources), expected)
+                statuses = run_rules(sources)
+                self.assertEqual(statuses[testname.removeprefix("test_")], expected)
+
+    def test_coverage(self):
+        """Test if every check has a failing case"""
+        failing = {testname for _, testname, _, expected in CASES if expected == "fail"}
+        for test_class in TEST_CASES:
+            for testname in unittest.TestLoader().getTestCaseNames(test_class):
+                self.assertIn(testname, failing)
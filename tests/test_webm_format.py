@@ -0,0 +1,82 @@
+"""Tests of the sources of test data shared by the callers of a WebmFormat"""
+
+import asyncio
+import sys
+import unittest
+from unittest import mock
+
+from test_webm._plan import Command
+from test_webm._webm_format import WebmFormat
+
+# The time the slow source takes to load in seconds
+LOAD_TIME = 0.3
+
+
+class TestSharedSources(unittest.IsolatedAsyncioTestCase):
+    """Tests of the sources of test data shared by the callers of a WebmFormat"""
+
+    def setUp(self):
+        self.loads = 0
+
+        def get_slow_source(file):
+            self.loads += 1
+            yield Command(
+                [sys.executable, "-c", f"import time; time.sleep({LOAD_TIME})"],
+                "slow_source",
+            )
+            return {"file": file}
+
+        patcher = mock.patch.object(
+            WebmFormat, "get_slow_source", staticmethod(get_slow_source), create=True
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.webm_format = WebmFormat("Show-OP1.webm")
+        self.webm_format.source_loaders["slow"] = "get_slow_source"
+
+    async def test_cancelled_owner(self):
+        """Test if a waiter loads the source again once its owner is cancelled"""
+        owner = asyncio.create_task(self.webm_format.aget_source("slow"))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(self.webm_format.aget_source("slow"))
+        await asyncio.sleep(LOAD_TIME / 3)
+
+        owner.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await owner
+
+        source = await asyncio.wait_for(waiter, LOAD_TIME * 10)
+        self.assertEqual(source, {"file": "Show-OP1.webm"})
+        self.assertEqual(self.loads, 2)
+        self.assertTrue(self.webm_format.is_loaded("slow"))
+
+    async def test_cancelled_waiter(self):
+        """Test if a cancelled waiter leaves the source to load for its owner"""
+        owner = asyncio.create_task(self.webm_format.aget_source("slow"))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(self.webm_format.aget_source("slow"))
+        await asyncio.sleep(LOAD_TIME / 3)
+
+        waiter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiter
+
+        source = await asyncio.wait_for(owner, LOAD_TIME * 10)
+        self.assertEqual(source, {"file": "Show-OP1.webm"})
+        self.assertEqual(self.loads, 1)
+
+    async def test_cancelled_prefetch(self):
+        """Test if a cancelled prefetch leaves the source to load for a later caller"""
+        prefetch = asyncio.create_task(self.webm_format.aprefetch(["slow"]))
+        await asyncio.sleep(LOAD_TIME / 3)
+
+        prefetch.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await prefetch
+
+        self.assertFalse(self.webm_format.is_loaded("slow"))
+        source = await asyncio.wait_for(
+            self.webm_format.aget_source("slow"), LOAD_TIME * 10
+        )
+        self.assertEqual(source, {"file": "Show-OP1.webm"})